@@ -31,12 +31,14 @@
 // User-configurable settings:
 #define DEBUG 1                     // Enable or disable serial debugging output
 #define USE_STATIC_IP 0             // Set to 0 to use dhcp, otherwise set to 1 and define your static ip below
+#define USE_SERIAL_SLIP 0           // Set to 1 to also take SLIP framed osc over serial, this disables the log output
 
 // Default settings, classes and variables
 #define INTERNAL_LED LED_BUILTIN            // Indicates if connected with server
 #define OSC_IN_PORT 8888                    // Local osc receive port on the esp
 unsigned int remotePort = 0;                // Once available saves the remote server port we reply to
 unsigned long lastPacketRecv = millis();    // The time in millis when the last valid osc packet was received
+unsigned long packetRecvMicros = 0;         // The time in micros when the current udp packet was received
 unsigned long lastHeartbeatSent = 0;        // The last time in millis when a heartbeat message was sent
 bool hasConnection = false;                 // Keep state if there is an active connection (data coming in)
 bool enableOTA = true;                      // If ota should currently be enabled
@@ -44,8 +46,67 @@ byte mac[6];                                // The wifi mac adress of the device
 char hostname[11];                          // A human-friendly hotname with the 2nd half of the hardware mac
 byte numMotors = 0;                         // The total number of motors attached to this hardware
 
+// Feature flags announced in the discovery reply
+#define FEATURE_COMPACT_FRAME 0x01
+#define FEATURE_FRAME_SEQUENCE 0x02
+#define FEATURES (FEATURE_COMPACT_FRAME | FEATURE_FRAME_SEQUENCE)
+#define COMPACT_FRAME_VERSION 1
+#define COMPACT_FRAME_HEADER 5
+#define COMPACT_FRAME_FLAG_WIDE 0x01
+#define SEQ_RESYNC_WINDOW 1024      // Sequence jumps bigger than this restart the counting
+#define SEQ_REORDER_WINDOW 32       // Frames at most this far back count as reordered
+
+// Frame sequence tracking of /ms and /mc frames, reported in the heartbeat
+bool seqValid = false;              // If lastSeq holds a received sequence number
+uint16_t lastSeq = 0;               // The newest sequence number received
+unsigned long framesLost = 0;       // Sequence gaps since boot
+unsigned long framesReordered = 0;  // Frames older than lastSeq since boot
+
 OSCErrorCode oscError;
 WiFiUDP Udp;
+bool replyOverSerial = false;       // If the server last talked to us over serial, replies and heartbeats go there
+
+#if USE_SERIAL_SLIP
+    // SLIP framing (RFC 1055) of osc packets over serial
+    #define SLIP_END 0xC0
+    #define SLIP_ESC 0xDB
+    #define SLIP_ESC_END 0xDC
+    #define SLIP_ESC_ESC 0xDD
+
+    class SlipPrint : public Print {
+        // Escapes everything written to it, the frame ENDs are written separately
+        public:
+            SlipPrint(Print &out) : out(out) {}
+            size_t write(uint8_t c) override {
+                if (c == SLIP_END) {
+                    out.write(SLIP_ESC);
+                    out.write(SLIP_ESC_END);
+                } else if (c == SLIP_ESC) {
+                    out.write(SLIP_ESC);
+                    out.write(SLIP_ESC_ESC);
+                } else {
+                    out.write(c);
+                }
+                return 1;
+            }
+        private:
+            Print &out;
+    };
+
+    // Serial carries the osc packets, log output would corrupt them
+    class NullPrint : public Print {
+        public:
+            size_t write(uint8_t) override { return 1; }
+    } nullPrint;
+    Print &Log = nullPrint;
+
+    OSCMessage slipMessage;         // The packet currently read from serial
+    unsigned int slipLength = 0;    // Bytes in slipMessage
+    bool slipEscaped = false;       // If the last byte was SLIP_ESC
+    bool slipInvalid = false;       // If the current packet has a bad escape and is dropped
+#else
+    Print &Log = Serial;
+#endif
 
 #if USE_STATIC_IP
     IPAddress staticIP(10,3,1,5);
@@ -100,26 +161,28 @@ void setup() {
         #error "Missing defines WIFI_CREDS_SSID and WIFI_CREDS_PASSWD"
     #endif
 
-    // Wait for wifi connection  
-    Serial.print(F("\n\nConnecting to Wifi "));
+    // Wait for wifi connection, over serial we can work without it
+    #if !USE_SERIAL_SLIP
+    Log.print(F("\n\nConnecting to Wifi "));
     while (WiFi.status() != WL_CONNECTED) {   
         delay(100);
         digitalWrite(INTERNAL_LED, LEDON);
-        Serial.print(".");
+        Log.print(".");
         delay(100);
         digitalWrite(INTERNAL_LED, LEDOFF);
     }
+    #endif
 
     // Once connected, print out some information and create mac and hostname
 
     WiFi.macAddress(mac);
     sprintf(hostname, "ppp-%02x%02x%02x", mac[3], mac[4], mac[5]);
     WiFi.setHostname(hostname);
-    Serial.print(F("\nIP address: "));
-    Serial.println(WiFi.localIP());
-    Serial.print(F("Hostname "));
-    Serial.println(hostname);
-    Serial.println(F("Starting UDP OSC Receiver"));
+    Log.print(F("\nIP address: "));
+    Log.println(WiFi.localIP());
+    Log.print(F("Hostname "));
+    Log.println(hostname);
+    Log.println(F("Starting UDP OSC Receiver"));
 
     // Setup OTA
     ArduinoOTA.setPassword("taptaptap");
@@ -130,21 +193,21 @@ void setup() {
             else // U_SPIFFS
                 type = "filesystem";
 
-            Serial.println("Start OTA updating" + type);
+            Log.println("Start OTA updating" + type);
         });
     ArduinoOTA.onEnd([]() {
-            Serial.println("\nEnd");
+            Log.println("\nEnd");
         });
     ArduinoOTA.onProgress([](unsigned int progress, unsigned int total) {
-            Serial.printf("OTA Progress: %u%%\r", (progress / (total / 100)));
+            Log.printf("OTA Progress: %u%%\r", (progress / (total / 100)));
         });
     ArduinoOTA.onError([](ota_error_t error) {
-            Serial.printf("Error[%u]: ", error);
-            if (error == OTA_AUTH_ERROR) Serial.println("Auth Failed");
-            else if (error == OTA_BEGIN_ERROR) Serial.println("Begin Failed");
-            else if (error == OTA_CONNECT_ERROR) Serial.println("Connect Failed");
-            else if (error == OTA_RECEIVE_ERROR) Serial.println("Receive Failed");
-            else if (error == OTA_END_ERROR) Serial.println("End Failed");
+            Log.printf("Error[%u]: ", error);
+            if (error == OTA_AUTH_ERROR) Log.println("Auth Failed");
+            else if (error == OTA_BEGIN_ERROR) Log.println("Begin Failed");
+            else if (error == OTA_CONNECT_ERROR) Log.println("Connect Failed");
+            else if (error == OTA_RECEIVE_ERROR) Log.println("Receive Failed");
+            else if (error == OTA_END_ERROR) Log.println("End Failed");
         });
     ArduinoOTA.begin();
 
@@ -152,6 +215,24 @@ void setup() {
     Udp.begin(OSC_IN_PORT);
 }
 
+void send_osc(OSCMessage &msg) {
+    // Send to the server over the link it last talked to us on
+    #if USE_SERIAL_SLIP
+    if (replyOverSerial) {
+        SlipPrint slip(Serial);
+        Serial.write(SLIP_END);
+        msg.send(slip);
+        Serial.write(SLIP_END);
+        msg.empty();
+        return;
+    }
+    #endif
+    Udp.beginPacket(Udp.remoteIP(), remotePort);
+    msg.send(Udp);
+    Udp.endPacket();
+    msg.empty();
+}
+
 void sendHeartbeat() {
     // Create heartbeat message
     OSCMessage heartbeatMessage("/patpatpat/heartbeat");
@@ -166,64 +247,119 @@ void sendHeartbeat() {
     #endif
 
     heartbeatMessage.add(WiFi.RSSI());
-    Udp.beginPacket(Udp.remoteIP(), remotePort);
-    heartbeatMessage.send(Udp);
-    Udp.endPacket();
-    heartbeatMessage.empty();
+    heartbeatMessage.add(seqValid ? (int)lastSeq : -1);
+    heartbeatMessage.add((int)framesLost);
+    heartbeatMessage.add((int)framesReordered);
+    send_osc(heartbeatMessage);
 
     #if DEBUG
-    Serial.print("Sent heartbeat. Delta @ ");
-    Serial.println(millis() - lastHeartbeatSent);
+    Log.print("Sent heartbeat. Delta @ ");
+    Log.println(millis() - lastHeartbeatSent);
     #endif
 
     lastHeartbeatSent = millis();
 }
 
-void handle_osc_motors(OSCMessage &msg) {
+bool accept_seq(uint16_t seq) {
+    // Count lost/reordered frames, returns false if the frame is outdated
+    if (seqValid) {
+        int16_t step = (int16_t)(seq - lastSeq);
+        if (step <= 0 && step > -SEQ_REORDER_WINDOW) {
+            framesReordered++;
+            return false;
+        }
+        if (step > 0 && step <= SEQ_RESYNC_WINDOW) {
+            framesLost += step - 1;
+        }
+        // Any bigger jump back is a restarted sequence, e.g. the server
+        // recreated the device, it is followed without counting a loss
+    }
+    seqValid = true;
+    lastSeq = seq;
+    return true;
+}
+
+void write_osc_motors(OSCMessage &msg, byte offset) {
     // Get length of osc message
-    byte msize = msg.size();
+    byte msize = msg.size() - offset;
     for (byte i=0; i<msize; i++) {
         // Safeguard from overwriting into void
         if (i >= numMotors) break;
         // Get value for each pin and write to motors
-        byte val = msg.getInt(i);
+        byte val = msg.getInt(i + offset);
         analogWrite(motorPins[i], val);
         #if DEBUG
-            Serial.print(val);
-            Serial.print(",");
+            Log.print(val);
+            Log.print(",");
         #endif
     }
     hasConnection = true;
     // Enable the onbord led
     digitalWrite(INTERNAL_LED, LEDON);
     #if DEBUG
-    Serial.println();
+    Log.println();
     #endif
 }
 
+void handle_osc_motors(OSCMessage &msg) {
+    write_osc_motors(msg, 0);
+}
+
+void handle_osc_motors_seq(OSCMessage &msg) {
+    // The first argument is the sequence number
+    if (msg.size() < 1 || !accept_seq(msg.getInt(0))) return;
+    write_osc_motors(msg, 1);
+}
+
+void handle_osc_compact(OSCMessage &msg) {
+    // A single blob: version, flags, seq (u16), count, then u8 or u16 values
+    uint8_t frame[COMPACT_FRAME_HEADER + 2*256];
+    if (!msg.isBlob(0)) return;
+    int len = msg.getBlob(0, frame, sizeof(frame));
+    if (len < COMPACT_FRAME_HEADER || frame[0] != COMPACT_FRAME_VERSION) return;
+    bool wide = frame[1] & COMPACT_FRAME_FLAG_WIDE;
+    byte count = frame[4];
+    if (len < COMPACT_FRAME_HEADER + (wide ? 2 : 1)*count) return;
+    if (!accept_seq((frame[2] << 8) | frame[3])) return;
+    for (byte i=0; i<count; i++) {
+        // Safeguard from overwriting into void
+        if (i >= numMotors) break;
+        // Values are big-endian, pwm is 8 bit so wide values are clipped
+        byte val = frame[COMPACT_FRAME_HEADER + i];
+        if (wide) {
+            uint8_t *v = &frame[COMPACT_FRAME_HEADER + 2*i];
+            val = v[0] ? 255 : v[1];
+        }
+        analogWrite(motorPins[i], val);
+    }
+    hasConnection = true;
+    // Enable the onbord led
+    digitalWrite(INTERNAL_LED, LEDON);
+}
+
 void handle_osc_discover(OSCMessage &msg) {
     // If connection was established once, do not send reply
     if (hasConnection) return;
 
-    Serial.println(F("Discovery request received while not connected"));
-    Serial.println(Udp.remoteIP());
-    Serial.println(Udp.remotePort());
+    Log.println(F("Discovery request received while not connected"));
+    if (!replyOverSerial) {
+        Log.println(Udp.remoteIP());
+        Log.println(Udp.remotePort());
 
-    // Save the remote port for use later
-    remotePort = Udp.remotePort() + 1;
+        // Save the remote port for use later
+        remotePort = Udp.remotePort() + 1;
+    }
 
     // Create and send discovery response
     OSCMessage discoverReply("/patpatpat/noticeme/senpai");
     discoverReply.add(WiFi.macAddress().c_str());
     discoverReply.add(hostname);
     discoverReply.add(numMotors);
-    Udp.beginPacket(Udp.remoteIP(), remotePort);
-    discoverReply.send(Udp);
-    Udp.endPacket();
-    discoverReply.empty();
+    discoverReply.add(FEATURES);
+    send_osc(discoverReply);
 
     #if DEBUG
-    Serial.println("Sent discovery reply");
+    Log.println("Sent discovery reply");
     #endif
 
     // Blink LED once
@@ -234,17 +370,81 @@ void handle_osc_discover(OSCMessage &msg) {
     sendHeartbeat();
 }
 
+void handle_osc_ping(OSCMessage &msg) {
+    // Only answer once the server port is known
+    if ((!replyOverSerial && remotePort == 0) || !msg.isInt(0)) return;
+
+    // Reply with the ping id and when it was received/answered
+    OSCMessage pong("/patpatpat/pong");
+    pong.add(WiFi.macAddress().c_str());
+    pong.add(msg.getInt(0));
+    pong.add((int)packetRecvMicros);
+    pong.add((int)micros());
+    send_osc(pong);
+}
+
 void handleOTA() {
     if (enableOTA) {
         // Disable PTA after 5 minutes
         if (millis() > 360000) {
             enableOTA = false;
-            Serial.println("OTA was disabled by timeout.");
+            Log.println("OTA was disabled by timeout.");
         }
         ArduinoOTA.handle();
     }
 }
 
+void dispatch_osc(OSCMessage &msg) {
+    // Check message state
+    if (msg.hasError()) {
+        oscError = msg.getError();
+        Log.print(F("osc message error: "));
+        Log.println(oscError);
+    } else {
+        // Save timestamp of last valid packet
+        lastPacketRecv = millis();
+        // Handle osc message
+        msg.dispatch("/m", handle_osc_motors);
+        msg.dispatch("/ms", handle_osc_motors_seq);
+        msg.dispatch("/mc", handle_osc_compact);
+        msg.dispatch("/patpatpat/discover", handle_osc_discover);
+        msg.dispatch("/patpatpat/ping", handle_osc_ping);
+    }
+}
+
+#if USE_SERIAL_SLIP
+void read_serial_slip() {
+    // Decode SLIP frames, a packet is handled once its END arrived
+    while (Serial.available() > 0) {
+        uint8_t c = Serial.read();
+        if (c == SLIP_END) {
+            if (slipLength > 0 && !slipInvalid) {
+                replyOverSerial = true;
+                dispatch_osc(slipMessage);
+            }
+            slipMessage.empty();
+            slipLength = 0;
+            slipEscaped = slipInvalid = false;
+            continue;
+        }
+        if (slipLength == 0 && !slipEscaped) {
+            packetRecvMicros = micros();
+        }
+        if (slipEscaped) {
+            slipEscaped = false;
+            if (c == SLIP_ESC_END) c = SLIP_END;
+            else if (c == SLIP_ESC_ESC) c = SLIP_ESC;
+            else slipInvalid = true;
+        } else if (c == SLIP_ESC) {
+            slipEscaped = true;
+            continue;
+        }
+        slipMessage.fill(c);
+        slipLength++;
+    }
+}
+#endif
+
 void loop() {
     handleOTA();
 
@@ -253,27 +453,20 @@ void loop() {
 
     // Check if there is data to parse
     if (udpPacketSize > 0) {
+        packetRecvMicros = micros();
         // Create new osc message from buffer
         OSCMessage msg;
         while (udpPacketSize--) {
             msg.fill(Udp.read());
         }
-
-        // Check message state
-        if (msg.hasError()) {
-            oscError = msg.getError();
-            Serial.print(F("osc message error: "));
-            Serial.println(oscError);
-        } else {
-            // Save timestamp of last valid packet
-            lastPacketRecv = millis();
-            // Handle osc message
-            msg.dispatch("/m", handle_osc_motors);
-            msg.dispatch("/patpatpat/discover", handle_osc_discover);
-        }
-
+        replyOverSerial = false;
+        dispatch_osc(msg);
     }
 
+    #if USE_SERIAL_SLIP
+    read_serial_slip();
+    #endif
+
     // Handle heartbeat sending if connection is active and 4 seconds since the last one have passed
     if (hasConnection && millis()-lastHeartbeatSent >= 3997) {
         sendHeartbeat();
@@ -282,6 +475,8 @@ void loop() {
     // Disable led and save state when we got no packets in the last 1000ms
     if (millis()-lastPacketRecv > 1000) {
         hasConnection = false;
+        // The server might restart its sequence numbers
+        seqValid = false;
         digitalWrite(INTERNAL_LED, LEDOFF);
         // Set all motors to stop
         for (byte i=0; i<numMotors; i++) {
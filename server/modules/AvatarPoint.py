@@ -17,6 +17,9 @@ class AvatarPointSphere(Sphere3D):
         self.receiverId: str = settings["receiverId"]
         self.lastValue = 0.0
         self.lastValueTs: float = 0.0
+        # the LivenessHandle of the contact group, the vrc receive thread
+        # refreshes it when data for our receiver id comes in
+        self.liveness = None
 
     def vrcContact(self, time: float, params: list):
         """The callback run by the ContactGroupManager when new data
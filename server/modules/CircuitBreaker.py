@@ -0,0 +1,121 @@
+"""Stops sending to a device that can't be reached.
+
+When sending to a device fails over and over (no route, the serial
+port is gone, ...) there is no point in encoding and sending every
+frame. After FAILURE_THRESHOLD failed sends in a row the breaker opens:
+frames are skipped and only one probe send is let through after a
+backoff that doubles from MIN_BACKOFF up to MAX_BACKOFF. A successful
+probe or a heartbeat from the device closes the breaker again.
+
+Only the opening and the closing are logged, with a summary of what
+happened in between, so a dead device doesn't flood the log.
+"""
+
+import time
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+FAILURE_THRESHOLD = 5
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+
+class CircuitBreaker:
+    """The send circuit breaker of one device.
+
+    allow() and record() are called from the output thread, reset()
+    from the main thread.
+
+    Attributes:
+        name (str): The device name used in log messages
+        isOpen (bool): If sends are currently skipped
+        failures (int): Failed sends in a row
+        skipped (int): Sends skipped since the breaker opened
+        trips (int): How often the breaker opened
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.isOpen = False
+        self.failures = 0
+        self.skipped = 0
+        self.trips = 0
+        self._backoff = MIN_BACKOFF
+        self._nextProbeTime = 0.0
+        self._openedTime = 0.0
+
+    def allow(self) -> bool:
+        """If the next send should happen.
+
+        While open, this lets a single probe through once the backoff
+        has passed. The result of an allowed send has to be passed to
+        record().
+
+        Returns:
+            bool: False if the send has to be skipped
+        """
+        if not self.isOpen:
+            return True
+        now = time.monotonic()
+        if now < self._nextProbeTime:
+            self.skipped += 1
+            return False
+        # wait for the result of this probe before the next one
+        self._nextProbeTime = now + self._backoff
+        return True
+
+    def record(self, success: bool, error: str = "") -> None:
+        """Take the result of a send.
+
+        Args:
+            success (bool): If the send worked
+            error (str, optional): What went wrong. Defaults to "".
+        """
+        if success:
+            if self.isOpen:
+                self._close("a send worked again")
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.isOpen:
+            self._backoff = min(self._backoff*2, MAX_BACKOFF)
+            self._nextProbeTime = time.monotonic() + self._backoff
+        elif self.failures >= FAILURE_THRESHOLD:
+            self.isOpen = True
+            self.trips += 1
+            self.skipped = 0
+            self._backoff = MIN_BACKOFF
+            self._openedTime = time.monotonic()
+            self._nextProbeTime = self._openedTime + self._backoff
+            logger.warning(f"Sending to {self.name} failed {self.failures} "
+                           f"times in a row ({error or 'unknown error'}), "
+                           "backing off")
+
+    def reset(self) -> None:
+        """Close the breaker because the device is back, eg. it sent a
+        heartbeat."""
+        if self.isOpen:
+            self._close("it is sending heartbeats")
+        self.failures = 0
+
+    def _close(self, reason: str) -> None:
+        """Close the breaker and log a summary.
+
+        Args:
+            reason (str): Why it is closed
+        """
+        self.isOpen = False
+        self._backoff = MIN_BACKOFF
+        logger.info(f"Resuming sends to {self.name} because {reason}, "
+                    f"skipped {self.skipped} sends and {self.failures} "
+                    f"failed in {time.monotonic() - self._openedTime:.1f}s")
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
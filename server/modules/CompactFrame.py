@@ -0,0 +1,148 @@
+"""A compact binary motor frame, sent as an osc blob to "/mc".
+
+The "/m" message spends 4 bytes per channel plus a type tag, although
+pwm values fit into 8 or 10 bits. Devices that announce the
+FEATURE_COMPACT_FRAME flag in their discovery reply can instead be sent
+this frame (if enabled for the device):
+
+    offset size  content
+    0      1     version, always COMPACT_FRAME_VERSION
+    1      1     flags, FLAG_WIDE set if values are uint16
+    2      2     sequence number, uint16 big-endian, wraps around
+    4      1     channel count
+    5      n*w   channel values, uint8 or uint16 big-endian
+
+The frame is wrapped into an osc message with a single blob argument so
+the firmware can keep using it's osc parser and dispatcher. The encoder
+picks uint16 values only if a value does not fit into uint8.
+"""
+
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+from modules.OscEncoder import _oscString
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+COMPACT_FRAME_ADDRESS = "/mc"
+COMPACT_FRAME_VERSION = 1
+FLAG_WIDE = 0x01
+
+# feature flags a device can announce in it's discovery reply
+FEATURE_COMPACT_FRAME = 0x01
+
+_HEADER = struct.Struct(">BBHB")
+
+
+@dataclass(frozen=True)
+class CompactFrame:
+    """A decoded compact frame.
+
+    Attributes:
+        seq (int): The sequence number
+        values (list[int]): The pwm of every channel
+    """
+
+    seq: int
+    values: list[int]
+
+
+class _CompactFrameBuffer:
+    """A prebuilt osc message holding a frame with a fixed value width."""
+
+    def __init__(self, count: int, dtype: str) -> None:
+        width = np.dtype(dtype).itemsize
+        frameSize = _HEADER.size + width*count
+        prefix = _oscString(COMPACT_FRAME_ADDRESS) + _oscString(",b") \
+            + struct.pack(">i", frameSize)
+        padding = -frameSize % 4
+        self.buffer = bytearray(prefix) + bytearray(frameSize + padding)
+        self.headerOffset = len(prefix)
+        self.values = np.frombuffer(
+            self.buffer, dtype=dtype, count=count,
+            offset=self.headerOffset + _HEADER.size)
+
+
+class CompactFrameEncoder:
+    """Encodes a fixed number of channels into a compact frame message.
+
+    Works like OscIntArrayEncoder: encode() patches the values into a
+    reused buffer, nothing is allocated per frame.
+
+    Attributes:
+        count (int): The number of channels
+        seq (int): The sequence number of the next frame
+    """
+
+    def __init__(self, count: int) -> None:
+        """Build the message templates.
+
+        Args:
+            count (int): The number of channels, max 255
+        """
+        if not 0 <= count <= 255:
+            raise ValueError("A compact frame holds 0-255 channels")
+        self.count = count
+        self.seq = 0
+        self._narrow = _CompactFrameBuffer(count, "u1")
+        self._wide = _CompactFrameBuffer(count, ">u2")
+
+    def encode(self, values) -> bytearray:
+        """Write the values into a compact frame message.
+
+        The returned buffer is reused, it has to be sent before the next
+        call to encode(). Values are clipped to 0-65535.
+
+        Args:
+            values (np.ndarray | Sequence[int]): Exactly count ints
+
+        Returns:
+            bytearray: The complete osc message
+        """
+        values = np.asarray(values)
+        wide = bool(values.size) and int(values.max()) > 0xFF
+        frame = self._wide if wide else self._narrow
+        np.copyto(frame.values, np.clip(values, 0, 0xFFFF), casting="unsafe")
+        _HEADER.pack_into(frame.buffer, frame.headerOffset,
+                          COMPACT_FRAME_VERSION, FLAG_WIDE if wide else 0,
+                          self.seq, self.count)
+        self.seq = (self.seq + 1) & 0xFFFF
+        return frame.buffer
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+def decodeCompactFrame(payload: bytes) -> CompactFrame:
+    """Decode the blob payload of a compact frame message.
+
+    This is the reference implementation of the firmware side.
+
+    Args:
+        payload (bytes): The blob argument of a "/mc" message
+
+    Raises:
+        ValueError: If the payload is not a valid compact frame
+
+    Returns:
+        CompactFrame: The sequence number and channel values
+    """
+    if len(payload) < _HEADER.size:
+        raise ValueError("Compact frame too short")
+    version, flags, seq, count = _HEADER.unpack_from(payload)
+    if version != COMPACT_FRAME_VERSION:
+        raise ValueError(f"Unknown compact frame version {version}")
+    dtype = ">u2" if flags & FLAG_WIDE else "u1"
+    if len(payload) < _HEADER.size + np.dtype(dtype).itemsize*count:
+        raise ValueError("Compact frame is missing values")
+    values = np.frombuffer(payload, dtype=dtype, count=count,
+                           offset=_HEADER.size)
+    return CompactFrame(seq, values.tolist())
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -2,6 +2,7 @@
 
 import time
 
+import numpy as np
 from PyQt6.QtCore import QObject, Qt, QThread, QTimer
 from PyQt6.QtCore import pyqtSignal as QSignal
 from PyQt6.QtCore import pyqtSlot as QSlot
@@ -9,8 +10,13 @@ from PyQt6.QtGui import QVector3D
 
 from modules.AvatarPoint import AvatarPointSphere
 from modules.GlobalConfig import GlobalConfigSingleton
+from modules.LivenessService import LivenessService
 from modules.Motor import Motor
+from modules.MotorEnvelope import MotorEnvelope
+from modules.OutputFrame import FrameMailbox, OutputFrame, OutputLayout
+from modules.ResponseCurve import ResponseCurveTable
 from modules.Solver import SolverFactory
+from modules.TickProfiler import SEND, SNAPSHOT, TickProfiler
 from utils.ConfigTemplate import ConfigTemplate
 from utils.Logger import LoggerClass
 from utils.threadToStr import threadAsStr
@@ -18,12 +24,14 @@ from utils.threadToStr import threadAsStr
 logger = LoggerClass.getSubLogger(__name__)
 config = GlobalConfigSingleton.getInstance()
 
+# seconds without data for any avatar point until a group has no data
+DATA_TIMEOUT = 0.5
+
 
 class ContactGroup(QObject):
     dataRxStateChanged = QSignal(bool)
     avatarPointAdded = QSignal(object)
     avatarPointRemoved = QSignal(object)
-    motorPwmChanged = QSignal(int, int, int)
     strengthSliderValueChanged = QSignal(int)
     newPointSolved = QSignal(QVector3D, int)
     openSettings = QSignal()
@@ -35,6 +43,8 @@ class ContactGroup(QObject):
 
         self.motors: list[Motor] = []
         self.avatarPoints: list[AvatarPointSphere] = []
+        self.pwm = np.zeros(0, dtype=np.int32)
+        self._outputLayout: OutputLayout | None = None
 
     def setup(self) -> None:
         try:
@@ -43,12 +53,28 @@ class ContactGroup(QObject):
             self._name = self._config["name"]
 
             for motor in self._config["motors"]:
-                newMotor = Motor(motor)
-                newMotor.motorPwmChanged.connect(self.motorPwmChanged)
-                self.motors.append(newMotor)
+                self.motors.append(Motor(motor))
+
+            # compile the response curves of all motors into one table
+            self._responseCurves = ResponseCurveTable(self._config["motors"])
+            self._maxPwm = np.array(
+                [m["maxPwm"] for m in self._config["motors"]], dtype=np.int32)
+            self._lastSpeeds = np.zeros(len(self.motors), dtype=np.float64)
+            self.pwm = np.zeros(len(self.motors), dtype=np.int32)
+            self.envelope = MotorEnvelope(
+                self._maxPwm,
+                self._config.get("envelopeAttackMs", 0),
+                self._config.get("envelopeHoldMs", 0),
+                self._config.get("envelopeReleaseMs", 1000))
+
+            # if data for any avatar point of this group came in recently
+            self._liveness = LivenessService.getInstance().register(
+                f"ContactGroup {self._id}", DATA_TIMEOUT)
+            self._liveness.stateChanged.connect(self.dataRxStateChanged)
 
             for avatarPoint in self._config["avatarPoints"]:
                 newAvatarPoint = AvatarPointSphere(avatarPoint)
+                newAvatarPoint.liveness = self._liveness
                 self.avatarPoints.append(newAvatarPoint)
                 self.avatarPointAdded.emit(newAvatarPoint)
 
@@ -63,28 +89,67 @@ class ContactGroup(QObject):
                 self.solver.setup()
             else:
                 logger.error("Unknown solver type specified")
-
-            self._currentDataState = False
-            self._dataTimer = QTimer()
-            self._dataTimer.timeout.connect(self._checkDataTimeout)
-            self._dataTimer.start(200)
         except Exception as E:
             logger.exception(E)
 
-    def _checkDataTimeout(self) -> None:
-        """Calculate if data for this group has recently come in.
+    def tick(self, dt: float, now: float) -> bool:
+        """Run the solver and update the pwm of all motors.
+
+        Args:
+            dt (float): The real time in seconds since the last tick
+            now (float): The current (unix) time
+
+        Returns:
+            bool: True if the solver solved new speeds from fresh data
+        """
+        solved = self.solver.solve(now)
+        self.updateMotors(dt, solved)
+        return solved
+
+    def updateMotors(self, dt: float, fresh: bool) -> None:
+        """Map the current solver speeds to the pwm of all motors.
+
+        Args:
+            dt (float): The real time in seconds since the last tick
+            fresh (bool): If the solver solved the speeds from fresh
+                data, else they are released by the envelope
         """
-        # TODO: This also needs some rework as all other timeout checkers
-        now = time.time()
-        currentState = any(now - obj.lastValueTs <=
-                           0.5 for obj in self.avatarPoints)
-        if self._currentDataState != currentState:
-            self._currentDataState = currentState
-            self.dataRxStateChanged.emit(self._currentDataState)
+        speeds = self.solver.speeds
+        self.pwm = self.envelope.process(
+            self._responseCurves.lookup(speeds), dt, fresh)
+
+        # the speed is only used by the ui, only send changes
+        for i in np.flatnonzero(speeds != self._lastSpeeds).tolist():
+            self.motors[i].setSpeed(float(speeds[i]))
+        np.copyto(self._lastSpeeds, speeds)
+
+    def writeOutput(self, pwm: np.ndarray, driven: np.ndarray,
+                    layout: OutputLayout) -> None:
+        """Write the pwm of all motors into an output frame buffer.
+
+        If multiple motors drive the same channel the highest pwm wins.
+
+        Args:
+            pwm (np.ndarray): The pwm buffer of the frame
+            driven (np.ndarray): Marks the channels that are driven
+            layout (OutputLayout): The layout of the frame
+        """
+        if layout is not self._outputLayout:
+            index = np.array([layout.index(*motor["espAddr"])
+                              for motor in self._config["motors"]],
+                             dtype=np.intp)
+            self._outputMask = index >= 0
+            self._outputIndex = index[self._outputMask]
+            self._outputLayout = layout
+        index = self._outputIndex
+        pwm[index] = np.maximum(pwm[index], self.pwm[self._outputMask])
+        driven[index] = True
 
     def close(self) -> None:
         """Closes everything we own and care for."""
         logger.debug(f"Stopping {__class__.__name__}({self._configKey})")
+        if hasattr(self, "_liveness"):
+            self._liveness.close()
         for avatarPoint in self.avatarPoints:
             self.avatarPointRemoved.emit(avatarPoint)
         self.avatarPoints = []
@@ -95,19 +160,27 @@ class ContactGroup(QObject):
 
 
 class ContactGroupManager(QObject):
-    registerAvatarPoint = QSignal(str)
-    unregisterAvatarPoint = QSignal(str)
-    tickSkipped = QSignal()  # ??
-    motorPwmChanged = QSignal(int, int, int)
-    solverDone = QSignal()
+    registerAvatarPoint = QSignal(str, object)
+    unregisterAvatarPoint = QSignal(str, object)
+    tickSkipped = QSignal(object)
     contactGroupListChanged = QSignal(dict)
     currentTpsChanged = QSignal(int)
     _tpsSettingChanged = QSignal()
 
-    def __init__(self, parent: QObject | None = None) -> None:
+    def __init__(self, outputMailbox: FrameMailbox | None = None,
+                 parent: QObject | None = None) -> None:
+        """Create the manager and start the solver thread.
+
+        Args:
+            outputMailbox (FrameMailbox | None, optional): Where the
+                solver thread publishes the output frame of every tick.
+                Defaults to None (no output).
+            parent (QObject | None, optional): Defaults to None.
+        """
         logger.debug(f"Creating {__class__.__name__}")
         super().__init__(parent)
         self._configKey = "groups"
+        self.outputMailbox = outputMailbox
         self.contactGroups: dict[int, ContactGroup] = {}
         self._avatarPoints: dict[str, list[AvatarPointSphere]] = {}
 
@@ -134,7 +207,6 @@ class ContactGroupManager(QObject):
 
     def _contactGroupFactory(self, key: str) -> ContactGroup:
         group = ContactGroup(key)
-        group.motorPwmChanged.connect(self.motorPwmChanged)
         group.avatarPointAdded.connect(self.avatarPointAdded)
         group.avatarPointRemoved.connect(self.avatarPointRemoved)
         group.setup()
@@ -147,9 +219,10 @@ class ContactGroupManager(QObject):
             avatarPoint (AvatarPointSphere): The new AvatarPointSphere
         """
         if not avatarPoint.receiverId in self._avatarPoints:
-            self.registerAvatarPoint.emit(avatarPoint.receiverId)
             self._avatarPoints[avatarPoint.receiverId] = []
         self._avatarPoints[avatarPoint.receiverId].append(avatarPoint)
+        self.registerAvatarPoint.emit(
+            avatarPoint.receiverId, avatarPoint.liveness)
 
     def avatarPointRemoved(self, avatarPoint: AvatarPointSphere) -> None:
         """Removes a receiver id from the LUT and unregisters it from
@@ -162,8 +235,9 @@ class ContactGroupManager(QObject):
         if avatarPoint.receiverId in self._avatarPoints and \
                 avatarPoint in self._avatarPoints[avatarPoint.receiverId]:
             self._avatarPoints[avatarPoint.receiverId].remove(avatarPoint)
+            self.unregisterAvatarPoint.emit(
+                avatarPoint.receiverId, avatarPoint.liveness)
             if not len(self._avatarPoints[avatarPoint.receiverId]):
-                self.unregisterAvatarPoint.emit(avatarPoint.receiverId)
                 self._avatarPoints.pop(avatarPoint.receiverId)
 
     @QSlot(float, str, list)
@@ -266,6 +340,9 @@ class ContactGroupSolverWorker(QObject):
         self._manager = manager
         self._skipflag = False
         self._tpsCounter = 1000
+        self._lastTickTime = 0.0
+        self._frameSeq = 0
+        self.profiler = TickProfiler()
 
     @QSlot()
     def startTimer(self):
@@ -290,6 +367,7 @@ class ContactGroupSolverWorker(QObject):
         self.tps = config.get("program.mainTps", 30)
         loopTimeMs: float = 1000/self.tps
         self.tickTimeNs = 1e9/self.tps
+        self._lastTickTime = 0.0
         logger.debug(f"Calculated tick time: "
                      f"{round(loopTimeMs)}ms / {self.tickTimeNs}ns")
         self._timer.start(round(loopTimeMs))
@@ -300,7 +378,11 @@ class ContactGroupSolverWorker(QObject):
         """
         # logger.debug(f"ticks in the last 1000ms: {self._tpsCounter}")
         if self._tpsCounter < self.tps-1:
-            logger.debug(f"TPS below setpoint! {self._tpsCounter} tps")
+            phases = ", ".join(
+                f"{name}={p50:.2f}/{p99:.2f}ms"
+                for name, (p50, p99, _) in self.profiler.summary().items())
+            logger.debug(f"TPS below setpoint! {self._tpsCounter} tps "
+                         f"(p50/p99 {phases})")
         self._manager.currentTpsChanged.emit(self._tpsCounter)
         self._tpsCounter = 0
 
@@ -320,22 +402,53 @@ class ContactGroupSolverWorker(QObject):
             self._skipflag = False
             return
 
+        # Real time since the last tick for the motor envelopes
+        dt = (startTime - self._lastTickTime)/1e9 \
+            if self._lastTickTime else 1/self.tps
+        self._lastTickTime = startTime
+
+        profiler = self.profiler
+        row = profiler.beginTick()
+
+        # Take the groups for this tick, the dict can change meanwhile
+        groups = list(self._manager.contactGroups.items())
+        now = time.time()
+        mailbox = self._manager.outputMailbox
+        layout = mailbox.layout if mailbox else OutputLayout()
+        pwm = np.zeros(layout.size, dtype=np.int32)
+        driven = np.zeros(layout.size, dtype=bool)
+        phaseStart = time.perf_counter_ns()
+        profiler.addPhase(row, SNAPSHOT, phaseStart - startTime)
+
         # Run solver
         try:
-            for group in self._manager.contactGroups.values():
-                group.solver.solve()
+            for slot, (groupId, group) in enumerate(groups):
+                solved = group.solver.solve(now)
+                solveDone = time.perf_counter_ns()
+                group.updateMotors(dt, solved)
+                group.writeOutput(pwm, driven, layout)
+                mapDone = time.perf_counter_ns()
+                profiler.addGroup(row, slot, groupId,
+                                  solveDone - phaseStart, mapDone - solveDone)
+                phaseStart = mapDone
         except Exception as E:
             logger.exception(E)
 
-        self._manager.solverDone.emit()
+        sendStart = time.perf_counter_ns()
+        if mailbox:
+            mailbox.publish(
+                OutputFrame.build(self._frameSeq, now, layout, pwm, driven))
+            self._frameSeq += 1
         self._tpsCounter += 1
         stopTime = time.perf_counter_ns()
+        profiler.addPhase(row, SEND, stopTime - sendStart)
         tickTime = stopTime - startTime
+        profiler.endTick(row, tickTime)
         if tickTime >= self.tickTimeNs:
-            logger.warn("Skipping next tick!")
+            report = profiler.report(row, self.tickTimeNs)
+            logger.warning(f"Skipping next tick! {report}")
             self._skipflag = True
-            self._manager.tickSkipped.emit()
-        # logger.debug(f"Tick time: {tickTime/1e6} ms")
+            self._manager.tickSkipped.emit(report)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,516 @@
+"""Emulates hardware devices running firmware/src/main.cpp over osc.
+
+Every VirtualDevice has it's own udp socket. All sockets are served by a
+single thread, so a lot of devices can run on one machine. A device
+behaves like the firmware:
+
+    - "/patpatpat/discover" is answered with "/patpatpat/noticeme/senpai"
+      [mac, hostname, numMotors, features] to the sender port + 1.
+    - "/m", "/ms" (sequenced) and "/mc" (compact) frames set the motor
+      pwm, sequenced frames older than the newest one are dropped.
+      After the first frame or discovery a "/patpatpat/heartbeat" [mac,
+      uptime, vcc, rssi, lastSeq, framesLost, framesReordered] is sent
+      every heartbeatInterval seconds.
+    - "/patpatpat/ping" [probeId] is answered with "/patpatpat/pong"
+      [mac, probeId, rxTime, txTime] once the device knows the server.
+      A replyDelay holds the pong back to emulate a congested link.
+    - Motors are turned off after 1 second without frames.
+
+Unlike the firmware, every received frame is recorded with it's receive
+time, so the frame rate, inter-arrival jitter and loss per device can be
+reported with stats().
+
+The server always sends to port 8888, so to use the emulator with the
+server every device needs it's own address (127.0.0.2, 127.0.0.3, ...)
+which works on the whole 127.0.0.0/8 range on Linux and Windows. With
+a base port every device gets it's own port on the same address
+instead, eg. for tests that talk to the devices directly.
+
+    with DeviceEmulator(50, announceTo=("127.0.0.1", 8872)) as emulator:
+        time.sleep(10)
+        for stats in emulator.stats():
+            print(stats)
+"""
+
+import heapq
+import ipaddress
+import itertools
+import selectors
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from modules.CompactFrame import (COMPACT_FRAME_ADDRESS,
+                                  FEATURE_COMPACT_FRAME, decodeCompactFrame)
+from modules.FrameSequence import (FEATURE_FRAME_SEQUENCE,
+                                   SEQUENCED_FRAME_ADDRESS)
+from modules.LatencyProbe import PING_ADDRESS, PONG_ADDRESS
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+DEVICE_PORT = 8888
+MOTOR_TIMEOUT = 1.0
+# the features the current firmware announces
+FIRMWARE_FEATURES = FEATURE_COMPACT_FRAME | FEATURE_FRAME_SEQUENCE
+# sequence jumps bigger than this restart the counting, like the firmware
+SEQ_RESYNC_WINDOW = 1024
+# frames at most this far back count as reordered, like the firmware
+SEQ_REORDER_WINDOW = 32
+
+
+def _buildMessage(address: str, *args) -> bytes:
+    """Build an osc message.
+
+    Args:
+        address (str): The osc address
+
+    Returns:
+        bytes: The message
+    """
+    builder = OscMessageBuilder(address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+
+@dataclass(frozen=True)
+class DeviceStats:
+    """What a virtual device received.
+
+    Attributes:
+        name (str): The hostname of the device
+        address (tuple[str, int]): The ip/port the device listens on
+        frames (int): Number of received frames
+        fps (float): Frames per second between the first and last frame
+        meanIntervalMs (float): The mean time between two frames
+        jitterMs (float): The standard deviation of the time between
+            two frames
+        p99IntervalMs (float): 99th percentile time between two frames
+        maxGapMs (float): The longest time without a frame
+        lost (int): Frames missing. Counted from sequence gaps for
+            sequenced and compact frames, otherwise estimated from the
+            expected rate.
+        lossRate (float): lost/(frames + lost)
+        reordered (int): Sequenced frames arriving after a newer one
+        invalid (int): Packets that could not be parsed
+    """
+
+    name: str
+    address: tuple[str, int]
+    frames: int = 0
+    fps: float = 0.0
+    meanIntervalMs: float = 0.0
+    jitterMs: float = 0.0
+    p99IntervalMs: float = 0.0
+    maxGapMs: float = 0.0
+    lost: int = 0
+    lossRate: float = 0.0
+    reordered: int = 0
+    invalid: int = 0
+
+    def __str__(self) -> str:
+        return (f"{self.name} {self.address[0]}:{self.address[1]} "
+                f"{self.frames} frames {self.fps:.1f}/s "
+                f"interval {self.meanIntervalMs:.2f}ms "
+                f"jitter {self.jitterMs:.2f}ms "
+                f"p99 {self.p99IntervalMs:.2f}ms "
+                f"max gap {self.maxGapMs:.2f}ms "
+                f"lost {self.lost} ({self.lossRate:.2%})")
+
+
+@dataclass
+class VirtualDevice:
+    """A single emulated hardware device.
+
+    Attributes:
+        mac (str): The (wifi) mac
+        hostname (str): The hostname, like the firmware's "ppp-xxxxxx"
+        numMotors (int): The number of channels
+        features (int): The feature flags announced in discovery replies
+        address (tuple[str, int]): The ip/port it listens on
+        pwm (list[int]): The current pwm of every channel
+        server (tuple[str, int] | None): Where replies and heartbeats go
+        receiveTimes (list[int]): perf_counter_ns of every frame
+        seqs (list[int]): Sequence numbers of sequenced and compact
+            frames
+        values (list[list[int]]): The pwm of every frame if kept
+        replyDelay (float): Seconds to hold back pongs
+        lastSeq (int | None): The newest sequence number, like the
+            firmware it is forgotten when the motors time out
+        framesLost (int): Sequence gaps as reported in the heartbeat
+        framesReordered (int): Outdated frames as reported in the
+            heartbeat
+    """
+
+    mac: str
+    hostname: str
+    numMotors: int
+    features: int
+    address: tuple[str, int]
+    pwm: list[int] = field(default_factory=list)
+    server: tuple[str, int] | None = None
+    startTime: float = field(default_factory=time.monotonic)
+    lastFrameTime: float = 0.0
+    lastHeartbeatTime: float = 0.0
+    heartbeats: int = 0
+    discoveries: int = 0
+    invalid: int = 0
+    receiveTimes: list[int] = field(default_factory=list)
+    seqs: list[int] = field(default_factory=list)
+    values: list[list[int]] = field(default_factory=list)
+    replyDelay: float = 0.0
+    lastSeq: int | None = None
+    framesLost: int = 0
+    framesReordered: int = 0
+    pongs: int = 0
+    bootNs: int = field(default_factory=time.perf_counter_ns)
+
+    def __post_init__(self) -> None:
+        self.pwm = [0]*self.numMotors
+
+    @property
+    def hasConnection(self) -> bool:
+        """If the device got a frame or discovery, like the firmware."""
+        return self.server is not None
+
+    def heartbeatMessage(self) -> bytes:
+        uptime = int(time.monotonic() - self.startTime)
+        return _buildMessage(
+            "/patpatpat/heartbeat", self.mac, uptime, 3.3, -50,
+            -1 if self.lastSeq is None else self.lastSeq, self.framesLost,
+            self.framesReordered)
+
+    def acceptSeq(self, seq: int) -> bool:
+        """Count lost and reordered frames like the firmware.
+
+        Args:
+            seq (int): The sequence number of a frame
+
+        Returns:
+            bool: False if the frame is outdated and has to be dropped
+        """
+        if self.lastSeq is not None:
+            step = (seq - self.lastSeq + 0x8000) % 0x10000 - 0x8000
+            if -SEQ_REORDER_WINDOW < step <= 0:
+                self.framesReordered += 1
+                return False
+            if 0 < step <= SEQ_RESYNC_WINDOW:
+                self.framesLost += step - 1
+            # a bigger jump back is a restarted sequence
+        self.lastSeq = seq
+        return True
+
+    def micros(self) -> int:
+        """The device clock, a wrapping 32 bit int like micros()."""
+        micros = (time.perf_counter_ns() - self.bootNs)//1000 & 0xFFFFFFFF
+        # osc only has signed ints, the firmware sends it cast as well
+        return micros - 0x100000000 if micros >= 0x80000000 else micros
+
+    def discoveryReply(self) -> bytes:
+        return _buildMessage("/patpatpat/noticeme/senpai", self.mac,
+                             self.hostname, self.numMotors, self.features)
+
+    def clearRecording(self) -> None:
+        """Forget all recorded frames."""
+        self.receiveTimes.clear()
+        self.seqs.clear()
+        self.values.clear()
+        self.invalid = 0
+
+    def stats(self, expectedRate: float | None = None) -> DeviceStats:
+        """Calculate the statistics of the recorded frames.
+
+        Args:
+            expectedRate (float | None, optional): The frames per second
+                the server sends, used to estimate the loss of "/m"
+                frames which have no sequence number. Defaults to None.
+
+        Returns:
+            DeviceStats: The statistics
+        """
+        frames = len(self.receiveTimes)
+        stats = {"name": self.hostname, "address": self.address,
+                 "frames": frames, "invalid": self.invalid}
+        if frames >= 2:
+            times = np.array(self.receiveTimes, dtype=np.int64)
+            intervalsMs = np.diff(times)/1e6
+            stats.update(
+                fps=(frames - 1)/(float(times[-1] - times[0])/1e9),
+                meanIntervalMs=float(intervalsMs.mean()),
+                jitterMs=float(intervalsMs.std()),
+                p99IntervalMs=float(np.percentile(intervalsMs, 99)),
+                maxGapMs=float(intervalsMs.max()))
+            if self.seqs:
+                # unwrap the 16 bit sequence numbers
+                steps = (np.diff(np.array(self.seqs, dtype=np.int64))
+                         + 0x8000) % 0x10000 - 0x8000
+                positions = np.concatenate(([0], np.cumsum(steps)))
+                stats["reordered"] = int((steps < 0).sum())
+                span = int(positions.max() - positions.min()) + 1
+                stats["lost"] = max(0, span - len(self.seqs))
+            elif expectedRate:
+                expected = round(float(times[-1] - times[0])/1e9
+                                 * expectedRate) + 1
+                stats["lost"] = max(0, expected - frames)
+            if stats.get("lost"):
+                stats["lossRate"] = stats["lost"]/(frames + stats["lost"])
+        return DeviceStats(**stats)
+
+
+class DeviceEmulator:
+    """Runs a number of VirtualDevices in one thread.
+
+    Attributes:
+        devices (list[VirtualDevice]): All emulated devices
+    """
+
+    def __init__(self, count: int, numMotors: int = 4,
+                 host: str = "127.0.0.2", basePort: int | None = None,
+                 features: int = FIRMWARE_FEATURES,
+                 heartbeatInterval: float = 4.0,
+                 announceTo: tuple[str, int] | None = None,
+                 keepValues: bool = False) -> None:
+        """Create the devices and their sockets.
+
+        Args:
+            count (int): Number of devices
+            numMotors (int, optional): Channels per device. Defaults to 4.
+            host (str, optional): The address of the first device.
+                Defaults to "127.0.0.2".
+            basePort (int | None, optional): If set every device listens
+                on host with basePort + n, otherwise on host + n with
+                port 8888. Defaults to None.
+            features (int, optional): The announced feature flags.
+                Defaults to FIRMWARE_FEATURES.
+            heartbeatInterval (float, optional): Seconds between
+                heartbeats. Defaults to 4.0.
+            announceTo (tuple[str, int] | None, optional): Send a
+                discovery reply to this server on start, for when
+                discovery broadcasts can't reach the devices.
+                Defaults to None.
+            keepValues (bool, optional): Record the pwm of every frame.
+                Defaults to False.
+        """
+        self.heartbeatInterval = heartbeatInterval
+        self.keepValues = keepValues
+        self._announceTo = announceTo
+        self.devices: list[VirtualDevice] = []
+        self._selector = selectors.DefaultSelector()
+        self._running = False
+        self._thread: threading.Thread | None = None
+        # (send time, tiebreaker, socket, packet, target) of held back pongs
+        self._delayed: list[tuple] = []
+        self._delayedIds = itertools.count()
+
+        firstIp = ipaddress.IPv4Address(host)
+        for n in range(count):
+            if basePort is None:
+                address = (str(firstIp + n), DEVICE_PORT)
+            else:
+                address = (host, basePort + n)
+            mac = f"02:50:50:{n >> 16 & 0xFF:02X}:{n >> 8 & 0xFF:02X}:" \
+                  f"{n & 0xFF:02X}"
+            device = VirtualDevice(
+                mac=mac, hostname=f"ppp-50{n >> 8 & 0xFF:02x}{n & 0xFF:02x}",
+                numMotors=numMotors, features=features, address=address)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.bind(address)
+            except OSError:
+                sock.close()
+                self.close()
+                raise
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ, device)
+            self.devices.append(device)
+
+    def start(self) -> None:
+        """Start serving the devices in a thread."""
+        if self._thread:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run,
+                                        name="DeviceEmulator", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Receive packets and send heartbeats until stopped."""
+        sockets = [(key.data, key.fileobj)
+                   for key in self._selector.get_map().values()]
+        if self._announceTo:
+            for device, sock in sockets:
+                device.server = self._announceTo
+                device.discoveries += 1
+                sock.sendto(device.discoveryReply(), self._announceTo)
+        while self._running:
+            timeout = 0.05
+            if self._delayed:
+                timeout = min(max(self._delayed[0][0] - time.monotonic(), 0),
+                              timeout)
+            for key, _ in self._selector.select(timeout=timeout):
+                self._receive(key.fileobj, key.data)
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, sock, packet, target = heapq.heappop(self._delayed)
+                self._send(sock, packet, target)
+            for device, sock in sockets:
+                if device.lastFrameTime \
+                        and now - device.lastFrameTime > MOTOR_TIMEOUT:
+                    device.pwm = [0]*device.numMotors
+                    device.lastFrameTime = 0.0
+                    device.lastSeq = None
+                if device.hasConnection and now - device.lastHeartbeatTime \
+                        >= self.heartbeatInterval:
+                    self._send(sock, device.heartbeatMessage(),
+                               device.server)
+                    device.lastHeartbeatTime = now
+                    device.heartbeats += 1
+
+    def _send(self, sock: socket.socket, packet: bytes,
+              target: tuple[str, int]) -> None:
+        try:
+            sock.sendto(packet, target)
+        except OSError as E:
+            logger.debug(f"Emulator failed to send to {target}: {E}")
+
+    def _receive(self, sock: socket.socket, device: VirtualDevice) -> None:
+        """Read all pending packets of a device.
+
+        Args:
+            sock (socket.socket): The device's socket
+            device (VirtualDevice): The device
+        """
+        while True:
+            try:
+                packet, sender = sock.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # eg. windows reports icmp port unreachable here
+                continue
+            receiveTime = time.perf_counter_ns()
+            try:
+                msg = OscMessage(packet)
+            except Exception:
+                device.invalid += 1
+                continue
+            if msg.address == "/m":
+                self._frame(device, receiveTime, msg.params, None)
+            elif msg.address == SEQUENCED_FRAME_ADDRESS and msg.params:
+                self._frame(device, receiveTime, msg.params[1:],
+                            msg.params[0])
+            elif msg.address == COMPACT_FRAME_ADDRESS:
+                try:
+                    frame = decodeCompactFrame(msg.params[0])
+                except (ValueError, IndexError):
+                    device.invalid += 1
+                    continue
+                self._frame(device, receiveTime, frame.values, frame.seq)
+            elif msg.address == PING_ADDRESS and msg.params \
+                    and device.hasConnection:
+                self._pong(sock, device, msg.params[0],
+                           (sender[0], device.server[1]))
+            elif msg.address == "/patpatpat/discover" \
+                    and not device.hasConnection:
+                # the firmware only replies while not connected
+                device.server = (sender[0], sender[1] + 1)
+                device.discoveries += 1
+                self._send(sock, device.discoveryReply(), device.server)
+                self._send(sock, device.heartbeatMessage(), device.server)
+                device.lastHeartbeatTime = time.monotonic()
+                device.heartbeats += 1
+
+    def _pong(self, sock: socket.socket, device: VirtualDevice,
+              probeId: int, target: tuple[str, int]) -> None:
+        """Answer a ping, held back by the device's replyDelay.
+
+        Args:
+            sock (socket.socket): The device's socket
+            device (VirtualDevice): The pinged device
+            probeId (int): The id of the ping
+            target (tuple[str, int]): Where the pong goes
+        """
+        rxTime = device.micros()
+        packet = _buildMessage(PONG_ADDRESS, device.mac, probeId, rxTime,
+                               device.micros())
+        device.pongs += 1
+        if device.replyDelay > 0:
+            heapq.heappush(self._delayed, (
+                time.monotonic() + device.replyDelay,
+                next(self._delayedIds), sock, packet, target))
+        else:
+            self._send(sock, packet, target)
+
+    def _frame(self, device: VirtualDevice, receiveTime: int,
+               values: list[int], seq: int | None) -> None:
+        """Record a motor frame.
+
+        Args:
+            device (VirtualDevice): The receiving device
+            receiveTime (int): perf_counter_ns when it was received
+            values (list[int]): The pwm values
+            seq (int | None): The sequence number of sequenced and
+                compact frames
+        """
+        device.receiveTimes.append(receiveTime)
+        if seq is not None:
+            device.seqs.append(seq)
+        if self.keepValues:
+            device.values.append(list(values))
+        device.lastFrameTime = time.monotonic()
+        if seq is None or device.acceptSeq(seq):
+            count = min(len(values), device.numMotors)
+            device.pwm[:count] = values[:count]
+        if device.server is None:
+            # the firmware replies to the last discovery sender, without
+            # a discovery the heartbeats can't go anywhere
+            device.server = self._announceTo
+
+    def stats(self, expectedRate: float | None = None) -> list[DeviceStats]:
+        """Calculate the statistics of every device.
+
+        Args:
+            expectedRate (float | None, optional): The frames per second
+                the server sends. Defaults to None.
+
+        Returns:
+            list[DeviceStats]: One entry per device
+        """
+        return [device.stats(expectedRate) for device in self.devices]
+
+    def clearRecordings(self) -> None:
+        """Forget the recorded frames of all devices."""
+        for device in self.devices:
+            device.clearRecording()
+
+    def close(self) -> None:
+        """Stop the thread and close all sockets."""
+        self._running = False
+        if self._thread:
+            self._thread.join(1)
+            self._thread = None
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fileobj)
+            key.fileobj.close()
+        self._selector.close()
+
+    def __enter__(self) -> "DeviceEmulator":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -0,0 +1,123 @@
+"""Finds hardware devices by id, mac or address without scanning.
+
+HwManager keeps every HardwareDevice in a DeviceRegistry. Incoming
+heartbeats and discovery responses are looked up by mac, so they reach
+exactly one device no matter how many devices exist.
+
+The registry remembers which mac and address every device was indexed
+with, so reindex() after a change only touches that device's entries.
+Devices without a real mac yet are only found by id and address.
+"""
+
+from typing import TYPE_CHECKING
+
+from utils.Logger import LoggerClass
+
+if TYPE_CHECKING:
+    # importing it for real would read the config too early
+    from modules.HardwareDevice import HardwareDevice
+
+logger = LoggerClass.getSubLogger(__name__)
+
+# the mac of manually created devices until they answer a discovery
+PLACEHOLDER_MAC = "FF:FF:FF:FF:FF:FF"
+
+
+class DeviceRegistry:
+    """Indexes HardwareDevices by id, mac and address.
+
+    Attributes:
+        devices (dict[int, HardwareDevice]): All devices by id. This is
+            the same dict for the lifetime of the registry, it can be
+            handed to other objects but must only be changed through
+            add() and remove().
+    """
+
+    def __init__(self) -> None:
+        self.devices: dict[int, "HardwareDevice"] = {}
+        self._byMac: dict[str, "HardwareDevice"] = {}
+        self._byAddress: dict[str, "HardwareDevice"] = {}
+        # the (mac, address) every device id was indexed with
+        self._keys: dict[int, tuple[str, str]] = {}
+
+    def add(self, device: "HardwareDevice") -> "HardwareDevice | None":
+        """Add a device, replacing the one with the same id.
+
+        Args:
+            device (HardwareDevice): The device
+
+        Returns:
+            HardwareDevice | None: The replaced device, if any
+        """
+        oldDevice = self.remove(device.id)
+        self.devices[device.id] = device
+        self._index(device)
+        return oldDevice
+
+    def remove(self, deviceId: int) -> "HardwareDevice | None":
+        """Remove a device.
+
+        Args:
+            deviceId (int): The device id
+
+        Returns:
+            HardwareDevice | None: The removed device, if it existed
+        """
+        device = self.devices.pop(deviceId, None)
+        if device is not None:
+            self._unindex(deviceId)
+        return device
+
+    def reindex(self, device: "HardwareDevice") -> None:
+        """Update the index after the mac or address of a device changed.
+
+        Args:
+            device (HardwareDevice): The changed device
+        """
+        if self.devices.get(device.id) is device:
+            self._unindex(device.id)
+            self._index(device)
+
+    def _index(self, device: "HardwareDevice") -> None:
+        mac, address = device.wifiMac, device.address
+        if mac and mac != PLACEHOLDER_MAC:
+            if mac in self._byMac and self._byMac[mac] is not device:
+                logger.warning(f"Devices {self._byMac[mac].id} and "
+                               f"{device.id} have the same mac {mac}")
+            self._byMac[mac] = device
+        if address:
+            self._byAddress[address] = device
+        self._keys[device.id] = (mac, address)
+
+    def _unindex(self, deviceId: int) -> None:
+        mac, address = self._keys.pop(deviceId, ("", ""))
+        if (device := self._byMac.get(mac)) and device.id == deviceId:
+            del self._byMac[mac]
+        if (device := self._byAddress.get(address)) and device.id == deviceId:
+            del self._byAddress[address]
+
+    def byId(self, deviceId: int) -> "HardwareDevice | None":
+        return self.devices.get(deviceId)
+
+    def byMac(self, mac: str) -> "HardwareDevice | None":
+        return self._byMac.get(mac)
+
+    def byAddress(self, address: str) -> "HardwareDevice | None":
+        """Find a device by ip or serial port.
+
+        Args:
+            address (str): The ip of osc devices, the port name of
+                serial devices
+
+        Returns:
+            HardwareDevice | None: The device
+        """
+        return self._byAddress.get(address)
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
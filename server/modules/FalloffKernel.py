@@ -0,0 +1,119 @@
+"""Spatial falloff kernels used to turn the distance between a contact
+and a motor into the motor's intensity.
+
+All kernels take the normalized distance of every motor as an array
+where 0 means the contact is on the motor and 1 is the edge of the
+motor's range. They return the intensity (0.0-1.0) of every motor and
+are 0 for everything out of range.
+
+The kernel is compiled once with all it's parameters bound, so choosing
+a different kernel does not add any work per tick.
+
+Settings (from the solver config):
+    MLAT_falloffKernel: One of FalloffKernelType
+    MLAT_falloffParam:  Gaussian: sigma (default 0.4)
+                        Inverse Square: steepness k (default 10)
+    MLAT_falloffTable:  Custom Table: [[distance, intensity], ...] with
+                        strictly increasing distances, only settable
+                        in the config file
+"""
+
+from collections.abc import Callable
+
+import numpy as np
+
+from utils.Enums import FalloffKernelType
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+type falloffKernel = Callable[[np.ndarray], np.ndarray]
+
+
+def _linear(distance: np.ndarray) -> np.ndarray:
+    # little deadband near the motors center, invert and clamp
+    return np.maximum(1.0 - np.maximum(distance, 0.1), 0.0)
+
+
+def _smoothstep(distance: np.ndarray) -> np.ndarray:
+    t = np.clip(1.0 - distance, 0.0, 1.0)
+    return t*t*(3.0 - 2.0*t)
+
+
+def _gaussian(sigma: float) -> falloffKernel:
+    factor = -1/(2*sigma*sigma)
+
+    def kernel(distance: np.ndarray) -> np.ndarray:
+        return np.where(distance <= 1.0,
+                        np.exp(distance*distance*factor), 0.0)
+    return kernel
+
+
+def _inverseSquare(k: float) -> falloffKernel:
+    # shifted and scaled so the intensity is 1 at 0 and 0 at the edge
+    edge = 1/(1 + k)
+    scale = 1/(1 - edge)
+
+    def kernel(distance: np.ndarray) -> np.ndarray:
+        value = (1/(1 + k*distance*distance) - edge)*scale
+        return np.maximum(value, 0.0)
+    return kernel
+
+
+def _table(points: list[list[float]]) -> falloffKernel | None:
+    try:
+        x, y = (np.asarray(v, dtype=np.float64) for v in zip(
+            *((float(x), float(y)) for x, y in points or ())))
+    except (TypeError, ValueError):
+        return None
+    # np.interp needs strictly increasing distances
+    if not (np.isfinite(x).all() and np.isfinite(y).all()) \
+            or (np.diff(x) <= 0).any():
+        return None
+    y = np.clip(y, 0.0, 1.0)
+
+    def kernel(distance: np.ndarray) -> np.ndarray:
+        return np.where(distance <= 1.0,
+                        np.interp(distance, x, y, right=0.0), 0.0)
+    return kernel
+
+
+def compileFalloffKernel(settings: dict) -> falloffKernel:
+    """Build the falloff kernel selected in the solver settings.
+
+    Args:
+        settings (dict): The solver settings
+
+    Returns:
+        falloffKernel: A function mapping normalized distances to
+            intensities for all motors at once.
+    """
+    try:
+        kernelType = FalloffKernelType(
+            settings.get("MLAT_falloffKernel", "Linear"))
+    except ValueError:
+        logger.error("Unknown falloff kernel "
+                     f"{settings.get('MLAT_falloffKernel')}, using linear")
+        kernelType = FalloffKernelType.LINEAR
+
+    param = settings.get("MLAT_falloffParam")
+    match kernelType:
+        case FalloffKernelType.SMOOTHSTEP:
+            return _smoothstep
+        case FalloffKernelType.GAUSSIAN:
+            return _gaussian(max(float(param or 0.4), 0.01))
+        case FalloffKernelType.INVERSESQUARE:
+            return _inverseSquare(max(float(param or 10), 0.01))
+        case FalloffKernelType.TABLE:
+            if kernel := _table(settings.get("MLAT_falloffTable")):
+                return kernel
+            logger.warning("Custom falloff table needs [distance, "
+                           "intensity] pairs with increasing distances, "
+                           "using linear")
+            return _linear
+        case _:
+            return _linear
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
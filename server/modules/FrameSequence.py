@@ -0,0 +1,170 @@
+"""Sequence numbered "/m" frames and the frame loss the devices report.
+
+Devices that announce FEATURE_FRAME_SEQUENCE are sent "/ms" instead of
+"/m", the same message with a uint16 sequence number as first argument:
+
+    /ms ,i<n*i> <seq> <value>...
+
+Compact frames always carry a sequence number. The device counts gaps
+in the sequence as lost and frames older than the last one as
+reordered. Reordered frames are dropped because newer values were
+already applied, so they stay counted as lost as well. The counters
+are added to the heartbeat:
+
+    /patpatpat/heartbeat [mac, uptime, vcc, rssi,
+                          lastSeq, framesLost, framesReordered]
+
+lastSeq is -1 until the first sequenced frame arrived. The counters
+count up from the device's boot, the FrameLossTracker turns the
+counters of consecutive heartbeats into loss and reorder rates.
+
+Every new encoder starts at sequence 0 again, for example when a
+device is recreated. Only frames a few sequence numbers back count as
+reordered, the device follows any bigger jump back as a restart.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from modules.OscEncoder import OscIntArrayEncoder
+
+SEQUENCED_FRAME_ADDRESS = "/ms"
+
+# feature flags a device can announce in it's discovery reply
+FEATURE_FRAME_SEQUENCE = 0x02
+
+# how many heartbeats the recent rates are calculated over
+RATE_WINDOW = 15
+
+
+class SequencedFrameEncoder(OscIntArrayEncoder):
+    """Encodes "/ms" messages, a "/m" with a sequence number in front.
+
+    Attributes:
+        count (int): The number of channels
+        seq (int): The sequence number of the next frame
+    """
+
+    def __init__(self, count: int) -> None:
+        """Build the message template.
+
+        Args:
+            count (int): The number of channels
+        """
+        super().__init__(SEQUENCED_FRAME_ADDRESS, count + 1)
+        self.count = count
+        self.seq = 0
+
+    def encode(self, values) -> bytearray:
+        """Write the next sequence number and the values into the message.
+
+        The returned buffer is reused, it has to be sent before the next
+        call to encode().
+
+        Args:
+            values (np.ndarray | Sequence[int]): Exactly count ints
+
+        Returns:
+            bytearray: The complete osc message
+        """
+        self._args[0] = self.seq
+        np.copyto(self._args[1:], values, casting="unsafe")
+        self.seq = (self.seq + 1) & 0xFFFF
+        return self._buffer
+
+
+@dataclass(frozen=True)
+class FrameLossStats:
+    """The frame loss of a device.
+
+    Attributes:
+        reported (bool): If the device reports it's frame loss at all
+        frames (int): Frames the device's sequence advanced by
+        lost (int): Frames the device never got
+        reordered (int): Frames that arrived after a newer one
+        lossRate (float): lost/frames since tracking started
+        reorderRate (float): reordered/frames since tracking started
+        recentLossRate (float): lossRate over the last RATE_WINDOW
+            heartbeats
+        recentReorderRate (float): reorderRate over the last
+            RATE_WINDOW heartbeats
+    """
+
+    reported: bool = False
+    frames: int = 0
+    lost: int = 0
+    reordered: int = 0
+    lossRate: float = 0.0
+    reorderRate: float = 0.0
+    recentLossRate: float = 0.0
+    recentReorderRate: float = 0.0
+
+
+class FrameLossTracker:
+    """Turns the counters of consecutive heartbeats into rates."""
+
+    def __init__(self) -> None:
+        # lastSeq, framesLost, framesReordered of the last heartbeat
+        self._last: tuple[int, int, int] | None = None
+        self._frames = 0
+        self._lost = 0
+        self._reordered = 0
+        # (frames, lost, reordered) between two heartbeats
+        self._recent: deque[tuple[int, int, int]] = deque(maxlen=RATE_WINDOW)
+
+    def update(self, lastSeq: int, framesLost: int,
+               framesReordered: int) -> None:
+        """Take the counters of a heartbeat.
+
+        Args:
+            lastSeq (int): The last sequence number the device got,
+                negative if none yet
+            framesLost (int): The device's lost frame counter
+            framesReordered (int): The device's reordered frame counter
+        """
+        if lastSeq < 0:
+            return
+        current = (lastSeq & 0xFFFF, framesLost, framesReordered)
+        last, self._last = self._last, current
+        if last is None or framesLost < last[1] \
+                or framesReordered < last[2]:
+            # the first heartbeat or the device restarted
+            return
+        frames = (current[0] - last[0]) % 0x10000
+        if frames >= 0x8000:
+            # lastSeq went back, the server restarted the sequence
+            return
+        delta = (frames, framesLost - last[1], framesReordered - last[2])
+        self._frames += delta[0]
+        self._lost += delta[1]
+        self._reordered += delta[2]
+        self._recent.append(delta)
+
+    def stats(self) -> FrameLossStats:
+        """Calculate the rates.
+
+        Returns:
+            FrameLossStats: The statistics
+        """
+        if self._last is None:
+            return FrameLossStats()
+        frames, lost, reordered = map(sum, zip(*self._recent)) \
+            if self._recent else (0, 0, 0)
+        return FrameLossStats(
+            reported=True, frames=self._frames, lost=self._lost,
+            reordered=self._reordered,
+            lossRate=self._lost/self._frames if self._frames else 0.0,
+            reorderRate=self._reordered/self._frames
+            if self._frames else 0.0,
+            recentLossRate=lost/frames if frames else 0.0,
+            recentReorderRate=reordered/frames if frames else 0.0)
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
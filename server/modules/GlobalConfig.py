@@ -5,15 +5,23 @@ Typical usage example:
     config = GlobalConfig("myConfig.json")
     config.set("option", "value")
     value = config.get("option")
+
+    # write once and emit the change signals after all changes are made
+    with config.transaction():
+        config.set("option", "value", True)
+        config.set("other", "value", True)
 """
 
 import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from copy import deepcopy
 from typing import Any, TypeVar
 
-from PyQt6.QtCore import QMutex, QObject, pyqtBoundSignal
+from PyQt6.QtCore import QObject, QRecursiveMutex, pyqtBoundSignal
 from PyQt6.QtCore import pyqtSignal as QSignal
 
-from utils.ConfigHandler import FileHelper
+from utils.ConfigHandler import FileHelper, IConfigHandler
 from utils.Logger import LoggerClass
 from utils.PathReader import PathReader
 
@@ -49,12 +57,12 @@ class GlobalConfigSingleton(QObject):
     def fromFile(cls: type[T], filename: str) -> T:
         return cls(FileHelper(filename))
 
-    def __init__(self, configHandler: FileHelper, *args, **kwargs) -> None:
+    def __init__(self, configHandler: IConfigHandler, *args, **kwargs) -> None:
         """
         Initialize the singleton instance.
 
         Args:
-            configHandler (FileHelper): Config file handler.
+            configHandler (IConfigHandler): Config file handler.
 
         Raises:
             RuntimeError: If multiple singleton instances are initialized.
@@ -65,7 +73,10 @@ class GlobalConfigSingleton(QObject):
         super().__init__()
         logger.debug(f"Creating {__class__.__name__}")
 
-        self._mutex = QMutex()
+        # recursive so set() can be called inside of a transaction
+        self._mutex = QRecursiveMutex()
+        # the changed paths of the running transaction
+        self._transactionPaths: list[str] | None = None
         self._configHandler = configHandler
         self._configHandler.createBackup()
         self._configOptions: dict[str, Any] = {}
@@ -94,6 +105,24 @@ class GlobalConfigSingleton(QObject):
             self._writeOptions()
         self._configOptions = self._configHandler.read()
 
+    def reload(self, configHandler: IConfigHandler | None = None) -> None:
+        """Re-read the whole config, optionally from a new handler.
+
+        No change signals are emitted, this is meant for headless
+        tools that run multiple configs in one process.
+
+        Args:
+            configHandler (IConfigHandler | None, optional): The new
+                config handler. Defaults to None (keep the current one).
+        """
+        try:
+            self._mutex.lock()
+            if configHandler:
+                self._configHandler = configHandler
+            self.parse()
+        finally:
+            self._mutex.unlock()
+
     def set(self, path: str,
             newVal: str | list | dict | int | float,
             wasChanged: bool = False) -> bool:
@@ -111,19 +140,67 @@ class GlobalConfigSingleton(QObject):
         """
         try:
             self._mutex.lock()
-            self._configOptions.update(PathReader.setOption(
-                self._configOptions, path, newVal))
+            if self._transactionPaths is not None:
+                # the transaction has a backup, no need to copy every time
+                PathReader.setOption(
+                    self._configOptions, path, newVal, inPlace=True)
+            else:
+                self._configOptions.update(PathReader.setOption(
+                    self._configOptions, path, newVal))
             # logger.debug(f"changed <{path}> to <{newVal}>")
         except Exception as E:
             logger.exception(E)
             return False
         else:
+            if self._transactionPaths is not None:
+                if wasChanged and path not in self._transactionPaths:
+                    self._transactionPaths.append(path)
+                return True
             if wasChanged:
                 self.configPathHasChanged.emit(path)
             return self._writeOptions()
         finally:
             self._mutex.unlock()
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group multiple set() calls into one commit.
+
+        The changes are visible to get() right away, but the config is
+        only written once at the end and the change signals are emitted
+        after that, once per changed path. Other threads can't change
+        the config meanwhile. If the block raises, all changes are
+        rolled back and nothing is emitted. A transaction inside of a
+        transaction is part of the outer one.
+
+        Yields:
+            None
+        """
+        self._mutex.lock()
+        if self._transactionPaths is not None:
+            try:
+                yield
+            finally:
+                self._mutex.unlock()
+            return
+        backup = deepcopy(self._configOptions)
+        self._transactionPaths = []
+        try:
+            yield
+        except Exception:
+            self._configOptions.clear()
+            self._configOptions.update(backup)
+            raise
+        else:
+            changedPaths = self._transactionPaths
+            self._transactionPaths = None
+            self._writeOptions()
+            for path in changedPaths:
+                self.configPathHasChanged.emit(path)
+        finally:
+            self._transactionPaths = None
+            self._mutex.unlock()
+
     def get(self, path: str,
             fallback: Any = None) -> Any:
         """Return a config option by the given key.
@@ -1,19 +1,39 @@
-import socket
-from datetime import datetime
+import threading
+import time
+from array import array
+from collections.abc import Sequence
 
-from PyQt6.QtCore import QObject, QTimer
+import numpy as np
+from PyQt6.QtCore import QObject
 from PyQt6.QtCore import pyqtSignal as QSignal
 from PyQt6.QtCore import pyqtSlot as QSlot
-from pythonosc.udp_client import SimpleUDPClient
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
 
+from modules.CircuitBreaker import CircuitBreaker
+from modules.CompactFrame import FEATURE_COMPACT_FRAME, CompactFrameEncoder
+from modules.FrameSequence import (FEATURE_FRAME_SEQUENCE, FrameLossTracker,
+                                   SequencedFrameEncoder)
 from modules.GlobalConfig import GlobalConfigSingleton
-from modules.OscMessageTypes import HeartbeatMessage
-from utils.Enums import HardwareConnectionType
+from modules.LatencyProbe import LatencyProbe
+from modules.LinkQuality import DELTA_ONLY_KEEPALIVE, AdaptivePacer
+from modules.LivenessService import LivenessService
+from modules.OscEncoder import OscIntArrayEncoder
+from modules.OscMessageTypes import (DiscoveryResponseMessage,
+                                     HeartbeatMessage, PongMessage)
+from modules.OscOutputSocket import OscOutputSocket
+from modules.SlipSerial import SlipSerialLink
+from utils.Enums import FrameFormat, HardwareConnectionType
 from utils.Logger import LoggerClass
 
 logger = LoggerClass.getSubLogger(__name__)
 config = GlobalConfigSingleton.getInstance()
 
+# the osc port the firmware listens on
+DEVICE_PORT = 8888
+# seconds without a heartbeat until a device counts as disconnected
+HEARTBEAT_TIMEOUT = 6.0
+
 
 class HardwareDevice(QObject):
     """Represents a physical Hardware Device/ESP."""
@@ -21,35 +41,70 @@ class HardwareDevice(QObject):
     uiBatteryStateChanged = QSignal(float)
     uiRssiStateChanged = QSignal(int)
     deviceConnectionChanged = QSignal(bool)
+    deviceAddressChanged = QSignal(str)
     motorDataSent = QSignal(list)
+    # the output thread should send the changed pinStates
+    outputRequested = QSignal()
 
     def __init__(self, key: str) -> None:
         super().__init__()
         self._configKey = f"esps.{key}"
         self.wasDiscovered = False
 
+        self._loadSettingsFromConfig()
+
         # Heartbeat checker
         self.currentConnectionState: bool = False
         self._lastHeartbeat: HeartbeatMessage | None = None
-        self._heartbeatTimer = QTimer()
-        self._heartbeatTimer.timeout.connect(self.updateConnectionStatus)
-        self._heartbeatTimer.start(9000)
+        self._liveness = LivenessService.getInstance().register(
+            f"HardwareDevice {self._id}", HEARTBEAT_TIMEOUT)
+        self._liveness.stateChanged.connect(self._handleConnectionChanged)
+        # held by the output thread while it uses the pin buffers and
+        # the adapter, so they can be replaced when the config changes
+        self._outputLock = threading.Lock()
+        # the adapter that encoded the packet handed to sendEncoded()
+        self._encodedBy: "IHardwareCommunicationAdapter | None" = None
+        # the pwm of every channel, resized by _resizePins()
+        self.pinStates = array("i", bytes(4*self._numMotors))
+        self._pinView = np.frombuffer(self.pinStates, dtype=np.int32)
+
+        # what was sent last, for delta-sending
+        self._lastSentPins = np.zeros_like(self._pinView)
+        self._lastSendTime = 0.0
+        self.packetsSent = 0
+        self.packetsSuppressed = 0
+        # changed values held back by the frame rate limit
+        self.hasPending = False
+        self.framesCoalesced = 0
+        # frame loss reported by the device
+        self.frameLoss = FrameLossTracker()
+        # round trip time measurements
+        self.latency = LatencyProbe(
+            config.get("program.latencyProbeIntervalMs", 2000)/1000)
+        # lowers the output rate if the wifi link is bad
+        self.pacer = AdaptivePacer(self.usesAdaptivePacing)
+        # stops sending if sends keep failing
+        self.breaker = CircuitBreaker(self._name)
+        self.hardwareCommunicationAdapter = self._createAdapter()
+
+    def _createAdapter(self) -> "IHardwareCommunicationAdapter":
+        """Create and set up the adapter for the connection type.
 
-        self._loadSettingsFromConfig()
-        self.pinStates: dict[int, int | float] = {
-            i: 0 for i in range(self._numMotors)}
+        Returns:
+            IHardwareCommunicationAdapter: The new adapter
+        """
         hardwareCommunicationAdapterClass = \
             HardwareCommunicationAdapterFactory.build_adapter(
                 self._connectionType)
-        if hardwareCommunicationAdapterClass:
-            self.hardwareCommunicationAdapter = \
-                hardwareCommunicationAdapterClass()
-        else:
+        if not hardwareCommunicationAdapterClass:
             raise RuntimeError("Unknown hardware connection type.")
-        self.hardwareCommunicationAdapter.setup(config.get(self._configKey))
+        adapter = hardwareCommunicationAdapterClass()
+        adapter.setup(config.get(self._configKey))
 
-        self.hardwareCommunicationAdapter.heartbeat.connect(
-            self.processHeartbeat)
+        adapter.heartbeat.connect(self.processHeartbeat)
+        adapter.discoveryResponse.connect(self.processDiscoveryResponse)
+        adapter.pong.connect(self.processPong)
+        return adapter
 
     def _loadSettingsFromConfig(self) -> None:
         """Load settings from settings file into object."""
@@ -61,11 +116,101 @@ class HardwareDevice(QObject):
         self._wifiMac: str = config.get(f"{self._configKey}.wifiMac")
         self._serialPort: str = config.get(f"{self._configKey}.serialPort", "")
         self._numMotors: int = config.get(f"{self._configKey}.numMotors", 0)
+        self._features: int = config.get(f"{self._configKey}.features", 0)
+        self._frameFormat: str = config.get(
+            f"{self._configKey}.frameFormat", FrameFormat.OSC)
+        maxFrameRate = config.get(f"{self._configKey}.maxFrameRate", 0)
+        self._minFrameInterval: float = 1/maxFrameRate \
+            if maxFrameRate > 0 else 0.0
+
+    def applyConfig(self) -> bool:
+        """Apply a changed config of this device in place.
+
+        Only what changed is updated, the connection state, heartbeat
+        and link statistics are kept. The adapter is only replaced if
+        the connection type changed, a new ip is just a new target.
+
+        Returns:
+            bool: False if the id changed, the device has to be
+                re-created then
+        """
+        if config.get(f"{self._configKey}.id") != self._id:
+            return False
+        oldAddress, oldMac = self.address, self._wifiMac
+        oldConnectionType, oldSerialPort = \
+            self._connectionType, self._serialPort
+        oldFrame = (self._numMotors, self._features, self._frameFormat)
+        self._loadSettingsFromConfig()
+        self.breaker.name = self._name
+        settings = config.get(self._configKey)
+
+        newAdapter = None
+        if self._connectionType != oldConnectionType:
+            logger.debug(f"Device {self._name} changed connection type "
+                         f"from {oldConnectionType} to "
+                         f"{self._connectionType}")
+            newAdapter = self._createAdapter()
+        with self._outputLock:
+            if self._numMotors != oldFrame[0]:
+                self._resizePins()
+            if newAdapter:
+                oldAdapter = self.hardwareCommunicationAdapter
+                self.hardwareCommunicationAdapter = newAdapter
+            elif (self._numMotors, self._features, self._frameFormat) \
+                    != oldFrame:
+                self.hardwareCommunicationAdapter.updateEncoder(settings)
+        if newAdapter:
+            oldAdapter.close()
+        elif self._connectionType == HardwareConnectionType.SLIPSERIAL \
+                and self._serialPort != oldSerialPort:
+            self.hardwareCommunicationAdapter.setup(settings)
+
+        if self._connectionType == HardwareConnectionType.OSC:
+            self.hardwareCommunicationAdapter.retarget(self._lastIp)
+        self.pacer.enabled = self.usesAdaptivePacing
+        if self.address != oldAddress or self._wifiMac != oldMac:
+            self.deviceAddressChanged.emit(self.address)
+        return True
+
+    def _resizePins(self) -> None:
+        """Resize the pin buffers to _numMotors.
+
+        The channels that stay keep their value, the next frame is sent
+        in full. Has to be called with the output lock held.
+        """
+        pinStates = array("i", bytes(4*self._numMotors))
+        pinView = np.frombuffer(pinStates, dtype=np.int32)
+        count = min(len(pinView), len(self._pinView))
+        pinView[:count] = self._pinView[:count]
+        self.pinStates, self._pinView = pinStates, pinView
+        self._lastSentPins = np.zeros_like(pinView)
+        self._lastSendTime = 0.0
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def wifiMac(self) -> str:
+        return self._wifiMac
+
+    @property
+    def usesAdaptivePacing(self) -> bool:
+        """If the output rate should follow the wifi link quality."""
+        return self._connectionType == HardwareConnectionType.OSC \
+            and config.get("program.adaptivePacing", True)
+
+    @property
+    def address(self) -> str:
+        """The ip of osc devices or the port name of serial devices."""
+        if self._connectionType == HardwareConnectionType.SLIPSERIAL:
+            return self._serialPort
+        return self._lastIp
 
     @QSlot()
     def resetAllPinStates(self) -> None:
         """Set all channels to 0 and send update to hardware."""
-        self.pinStates = {i: 0 for i in range(self._numMotors)}
+        self._pinView.fill(0)
         self.sendPinValues()
 
     @QSlot(int, int)
@@ -76,16 +221,150 @@ class HardwareDevice(QObject):
             channelId (int): The channel to set the value for
             value (int): The new PWM value
         """
-        self.pinStates[channelId] = value
+        if 0 <= channelId < len(self.pinStates):
+            self.pinStates[channelId] = value
         self.sendPinValues()
 
+    def applyFrame(self, pwm: np.ndarray, driven: np.ndarray) -> None:
+        """Take the driven channels of an output frame into pinStates.
+
+        Channels not driven by any motor keep their value so they can
+        still be set manually.
+
+        Args:
+            pwm (np.ndarray): The device's part of the frame
+            driven (np.ndarray): The device's driven channels
+        """
+        with self._outputLock:
+            count = min(len(pwm), len(self._pinView))
+            np.copyto(self._pinView[:count], pwm[:count],
+                      where=driven[:count])
+
     def sendPinValues(self) -> None:
-        """Create and send current self.pinStates to hardware."""
-        # logger.debug(f"Sending all pin values for {self._name}")
-        if self.currentConnectionState:
-            motorData = list(self.pinStates.values())[:self._numMotors]
-            self.hardwareCommunicationAdapter.sendPinValues(motorData)
-            self.motorDataSent.emit(motorData)
+        """Have the output thread send the current self.pinStates.
+
+        Only the output thread encodes, the encoder's buffer is reused
+        and might still wait to be sent.
+        """
+        self.hasPending = True
+        self.outputRequested.emit()
+
+    def encodePinValues(self, keepalive: float | None = None,
+                        rateLimited: bool = False) \
+            -> bytes | bytearray | None:
+        """Encode the current self.pinStates for the hardware.
+
+        With a keepalive, pin values that are the same as the last sent
+        ones are only encoded again once keepalive seconds have passed
+        since that send, otherwise the packet is suppressed.
+
+        If rate limited and the device's max frame rate does not allow
+        a send yet, the values are held back and hasPending is set
+        until the next encode after nextSendTime(). Held back values
+        that are replaced by newer ones before that count as coalesced.
+        A bad wifi link lowers the max frame rate further and turns on
+        delta sending even without a keepalive, see AdaptivePacer.
+        While sends keep failing, the CircuitBreaker only lets an
+        occasional probe through.
+
+        Args:
+            keepalive (float | None, optional): Resend unchanged values
+                after this many seconds. Defaults to None (always send).
+            rateLimited (bool, optional): Apply the device's max frame
+                rate. Defaults to False.
+
+        Returns:
+            bytes | bytearray | None: The packet or None if the device
+                is not connected or the packet was suppressed. The
+                packet might be a reused buffer and has to be sent
+                before encoding again.
+        """
+        if not self.currentConnectionState:
+            # nothing is held back, else the output thread would wake up
+            # for it over and over
+            self.hasPending = False
+            return None
+        minFrameInterval = self._minFrameInterval
+        if rateLimited:
+            minFrameInterval = max(minFrameInterval,
+                                   self.pacer.minFrameInterval)
+            if keepalive is None and self.pacer.deltaOnly:
+                keepalive = DELTA_ONLY_KEEPALIVE
+        sinceLastSend = time.monotonic() - self._lastSendTime
+        if keepalive is not None and sinceLastSend < keepalive \
+                and np.array_equal(self._pinView, self._lastSentPins):
+            self.hasPending = False
+            self.packetsSuppressed += 1
+            return None
+        if rateLimited and sinceLastSend < minFrameInterval:
+            if self.hasPending:
+                self.framesCoalesced += 1
+            self.hasPending = True
+            return None
+        self.hasPending = False
+        if not self.breaker.allow():
+            return None
+        with self._outputLock:
+            self._encodedBy = self.hardwareCommunicationAdapter
+            return self._encodedBy.encodePinValues(self._pinView)
+
+    def nextSendTime(self) -> float:
+        """The earliest time the max frame rate allows the next send.
+
+        Returns:
+            float: A time.monotonic() timestamp
+        """
+        return self._lastSendTime + max(self._minFrameInterval,
+                                        self.pacer.minFrameInterval)
+
+    def sendEncoded(self, packet: bytes | bytearray) -> None:
+        """Send a packet created by encodePinValues().
+
+        Args:
+            packet (bytes | bytearray): The encoded pin values
+        """
+        with self._outputLock:
+            adapter = self.hardwareCommunicationAdapter
+            if adapter is not self._encodedBy:
+                # the adapter was replaced after encoding, the next
+                # frame is encoded and sent by the new one
+                return
+            if sent := adapter.sendEncoded(packet):
+                np.copyto(self._lastSentPins, self._pinView)
+        if not sent:
+            self.breaker.record(False, adapter.lastError)
+            return
+        self.breaker.record(True)
+        self._lastSendTime = time.monotonic()
+        self.packetsSent += 1
+        self.motorDataSent.emit(self.pinStates.tolist())
+
+    def sendProbe(self, now: float | None = None) -> bool:
+        """Send a latency probe ping if the device is connected and one
+        is due.
+
+        Args:
+            now (float | None, optional): time.monotonic(). Defaults to
+                None.
+
+        Returns:
+            bool: If a ping was sent
+        """
+        if not self.currentConnectionState or self.breaker.isOpen \
+                or not self.latency.isDue(now):
+            return False
+        self.hardwareCommunicationAdapter.sendControl(self.latency.ping())
+        return True
+
+    def processPong(self, msg: PongMessage) -> None:
+        """Process the answer to a latency probe ping.
+
+        Args:
+            msg (PongMessage): The PongMessage dataclass
+        """
+        if not msg.mac == self._wifiMac:
+            return
+        self.latency.processPong(msg)
 
     def processHeartbeat(self, msg: HeartbeatMessage) -> None:
         """Process an incoming heartbeat message from the comms interface.
@@ -97,43 +376,66 @@ class HardwareDevice(QObject):
         if not msg.mac == self._wifiMac:
             return
         self._lastHeartbeat = msg
+        self.breaker.reset()
+        self.frameLoss.update(msg.lastSeq, msg.framesLost,
+                              msg.framesReordered)
+        if self.pacer.enabled and self.pacer.update(
+                msg.rssi, self.frameLoss.stats(), self.latency.stats()):
+            logger.info(f"Link quality of {self._name} is now "
+                        f"{self.pacer.quality.value} ({msg.rssi}dBm)")
         # Check if the ip addr changed from known config
-        if not msg.sourceAddr == self._lastIp:
+        if self._connectionType == HardwareConnectionType.OSC \
+                and not msg.sourceAddr == self._lastIp:
             logger.debug(f"Device {self._name} changed ip from "
                          f"{self._lastIp} to {msg.sourceAddr}")
-            config.set(f"{self._configKey}.lastIp", msg.sourceAddr, True)
-            return
+            # only the target changes, nothing has to be recreated
+            self._lastIp = msg.sourceAddr
+            self.hardwareCommunicationAdapter.retarget(msg.sourceAddr)
+            config.set(f"{self._configKey}.lastIp", msg.sourceAddr)
+            self.deviceAddressChanged.emit(msg.sourceAddr)
         self.uiBatteryStateChanged.emit(msg.vccBat)
         self.uiRssiStateChanged.emit(msg.rssi)
-        self.updateConnectionStatus()
+        self._liveness.refresh()
 
-    @QSlot()
-    def updateConnectionStatus(self) -> None:
-        """Recalculate the hardware connection status."""
-        # NOTE: This might need some rework some time
-        if not self._lastHeartbeat:
-            return
-        # logger.debug(datetime.now())
-        # logger.debug(self._lastHeartbeat.ts.second)
-        # logger.debug((datetime.now() - self._lastHeartbeat.ts).total_seconds())
-        if not self.currentConnectionState and \
-                (datetime.now() - self._lastHeartbeat.ts).total_seconds() <= 6:
-            self.currentConnectionState = True
-            logger.debug(f"Connection state for HardwareDevice {self._id} "
-                         f"changed to {self.currentConnectionState}")
-            self.deviceConnectionChanged.emit(self.currentConnectionState)
-        elif self.currentConnectionState and \
-                (datetime.now() - self._lastHeartbeat.ts).total_seconds() > 6:
-            self.currentConnectionState = False
-            logger.debug(f"Connection state for HardwareDevice {self._id} "
-                         f"changed to {self.currentConnectionState}")
-            self.deviceConnectionChanged.emit(self.currentConnectionState)
+    def processDiscoveryResponse(self, msg: DiscoveryResponseMessage) -> None:
+        """Process a discovery response that arrived over our own link.
+
+        Only serial devices answer over their own link, the port is
+        known so the response always belongs to this device.
+
+        Args:
+            msg (DiscoveryResponseMessage): The DiscoveryResponseMessage
+        """
+        self.wasDiscovered = True
+        with config.transaction():
+            # learn the mac so heartbeats can be matched
+            if not msg.mac == self._wifiMac:
+                logger.debug(f"Device {self._name} on {msg.sourceAddr} "
+                             f"has mac {msg.mac}")
+                config.set(f"{self._configKey}.wifiMac", msg.mac, True)
+            if config.get(f"{self._configKey}.features", 0) != msg.features:
+                config.set(f"{self._configKey}.features", msg.features, True)
+
+    @QSlot(bool)
+    def _handleConnectionChanged(self, state: bool) -> None:
+        """The first heartbeat came in or the last one is too old.
+
+        Args:
+            state (bool): The new connection state
+        """
+        self.currentConnectionState = state
+        if state:
+            # make sure the next frame is sent in full
+            self._lastSendTime = 0.0
+        logger.debug(f"Connection state for HardwareDevice {self._id} "
+                     f"changed to {self.currentConnectionState}")
+        self.deviceConnectionChanged.emit(self.currentConnectionState)
 
     def close(self) -> None:
         """Closes everything we own and care for."""
         logger.debug(f"Stopping {__class__.__name__}({self._id})")
-        if hasattr(self, "_heartbeatTimer") and self._heartbeatTimer.isActive():
-            self._heartbeatTimer.stop()
+        if hasattr(self, "_liveness"):
+            self._liveness.close()
         if hasattr(self, "hardwareCommunicationAdapter"):
             self.hardwareCommunicationAdapter.close()
 
@@ -143,22 +445,64 @@ class HardwareDevice(QObject):
 
 
 class IHardwareCommunicationAdapter():
-    """The interface for a HardwareDevice to talk to the actual hardware."""
+    """The interface for a HardwareDevice to talk to the actual hardware.
+
+    Attributes:
+        lastError (str): Why the last failed sendEncoded() failed
+    """
+
+    lastError = ""
 
     heartbeat = QSignal(object)
+    discoveryResponse = QSignal(object)
+    pong = QSignal(object)
 
     def setup(self, settings: dict) -> None:
         """A generic setup method to be reimplemented."""
         raise NotImplementedError
 
-    def sendPinValues(self, pinValues: list) -> None:
-        """A generic sendPinValues method to be reimplemented."""
+    def encodePinValues(self, pinValues: Sequence[int]) \
+            -> bytes | bytearray | None:
+        """A generic encodePinValues method to be reimplemented.
+
+        It returns the packet sendEncoded() sends for these values.
+        """
+        raise NotImplementedError
+
+    def sendEncoded(self, packet: bytes | bytearray) -> bool:
+        """A generic sendEncoded method to be reimplemented.
+
+        It returns False and sets lastError if the send failed.
+        """
+        raise NotImplementedError
+
+    def sendControl(self, packet: bytes | bytearray) -> None:
+        """A generic sendControl method to be reimplemented.
+
+        Control packets like pings must not replace motor frames.
+        """
+        raise NotImplementedError
+
+    def updateEncoder(self, settings: dict) -> None:
+        """A generic updateEncoder method to be reimplemented.
+
+        It switches to the frame format and channel count of the
+        settings without touching the connection.
+        """
+        raise NotImplementedError
+
+    def retarget(self, address: str) -> None:
+        """A generic retarget method to be reimplemented."""
         raise NotImplementedError
 
     def receivedExtHeartbeat(self, msg: HeartbeatMessage) -> None:
         """A generic receivedExtHeartbeat method to be reimplemented."""
         raise NotImplementedError
 
+    def receivedExtPong(self, msg: PongMessage) -> None:
+        """A generic receivedExtPong method to be reimplemented."""
+        raise NotImplementedError
+
     def close(self) -> None:
         """A generic close method to be reimplemented."""
         raise NotImplementedError
@@ -175,7 +519,10 @@ class OscCommunicationAdapterImpl(IHardwareCommunicationAdapter, QObject):
         logger.debug(f"Creating {__class__.__name__}")
         super().__init__(*args, **kwargs)
 
-        self._oscClient: SimpleUDPClient | None = None
+        self._socket: OscOutputSocket | None = None
+        self._target: tuple[str, int] = ("", DEVICE_PORT)
+        self._encoder: OscIntArrayEncoder | CompactFrameEncoder = \
+            OscIntArrayEncoder("/m", 0)
 
     def setup(self, settings: dict) -> None:
         """Setup everything required for this communication
@@ -185,23 +532,112 @@ class OscCommunicationAdapterImpl(IHardwareCommunicationAdapter, QObject):
             settings (dict): The settings dict for this HardwareDevice
         """
         try:
-            self.close()
-            self._oscClient = SimpleUDPClient(settings["lastIp"], 8888)
+            if self._socket is None:
+                self._socket = OscOutputSocket.acquire()
+            self._target = (settings["lastIp"], DEVICE_PORT)
+            self._encoder = self._buildEncoder(settings)
         except Exception as E:
             logger.exception(E)
 
-    def sendPinValues(self, pinValues: list) -> None:
-        """Send motor values to device over osc."""
-        try:
-            if self._oscClient:
-                self._oscClient.send_message("/m", pinValues)
-        except OSError as E:
-            if E.errno == 10051:
-                pass
-            else:
-                logger.exception(E)
-        except Exception as E:
-            logger.exception(E)
+    @staticmethod
+    def _buildEncoder(settings: dict) -> OscIntArrayEncoder | CompactFrameEncoder:
+        """Pick the frame format for the device.
+
+        The compact frame is only used if it was enabled for the device
+        and the device announced support for it during discovery.
+        Otherwise "/m" is sent, with a sequence number ("/ms") if the
+        device announced it can count lost frames.
+
+        Args:
+            settings (dict): The settings dict for this HardwareDevice
+
+        Returns:
+            OscIntArrayEncoder | CompactFrameEncoder: The encoder
+        """
+        numMotors = settings["numMotors"]
+        features = settings.get("features", 0)
+        if settings.get("frameFormat") == FrameFormat.COMPACT:
+            if features & FEATURE_COMPACT_FRAME and numMotors <= 255:
+                return CompactFrameEncoder(numMotors)
+            logger.warning(f"{settings.get('name')} does not support "
+                           "compact frames, using osc /m")
+        if features & FEATURE_FRAME_SEQUENCE:
+            return SequencedFrameEncoder(numMotors)
+        return OscIntArrayEncoder("/m", numMotors)
+
+    @staticmethod
+    def _replaceEncoder(encoder, settings: dict) \
+            -> OscIntArrayEncoder | CompactFrameEncoder:
+        """Build the encoder for changed settings.
+
+        The sequence number continues, a device would see a jump back
+        as reordered frames otherwise.
+
+        Args:
+            encoder (OscIntArrayEncoder | CompactFrameEncoder): The
+                current encoder
+            settings (dict): The settings dict for this HardwareDevice
+
+        Returns:
+            OscIntArrayEncoder | CompactFrameEncoder: The new encoder
+        """
+        newEncoder = OscCommunicationAdapterImpl._buildEncoder(settings)
+        if hasattr(encoder, "seq") and hasattr(newEncoder, "seq"):
+            newEncoder.seq = encoder.seq
+        return newEncoder
+
+    def updateEncoder(self, settings: dict) -> None:
+        """Switch to the frame format and channel count of the settings.
+
+        Args:
+            settings (dict): The settings dict for this HardwareDevice
+        """
+        self._encoder = self._replaceEncoder(self._encoder, settings)
+
+    def encodePinValues(self, pinValues: Sequence[int]) -> bytearray:
+        """Build the "/m" or compact frame message for the motor values.
+
+        Args:
+            pinValues (Sequence[int]): The pwm of every channel
+
+        Returns:
+            bytearray: The osc message, the buffer is reused
+        """
+        return self._encoder.encode(pinValues)
+
+    def sendEncoded(self, packet: bytes | bytearray) -> bool:
+        """Send an encoded osc message to the device.
+
+        Args:
+            packet (bytes | bytearray): The message from
+                encodePinValues()
+
+        Returns:
+            bool: False if sending failed
+        """
+        if not self._socket:
+            self.lastError = "no socket"
+            return False
+        if error := self._socket.sendto(packet, self._target):
+            self.lastError = str(error)
+            return False
+        return True
+
+    def sendControl(self, packet: bytes | bytearray) -> None:
+        """Send a control message, osc packets are never coalesced.
+
+        Args:
+            packet (bytes | bytearray): The osc message
+        """
+        self.sendEncoded(packet)
+
+    def retarget(self, address: str) -> None:
+        """Send to a new ip from now on, the socket stays the same.
+
+        Args:
+            address (str): The new ip of the device
+        """
+        self._target = (address, DEVICE_PORT)
 
     @QSlot(object)
     def receivedExtHeartbeat(self, msg: HeartbeatMessage) -> None:
@@ -212,25 +648,161 @@ class OscCommunicationAdapterImpl(IHardwareCommunicationAdapter, QObject):
         """
         self.heartbeat.emit(msg)
 
+    @QSlot(object)
+    def receivedExtPong(self, msg: PongMessage) -> None:
+        """Re-emit the pong message so the interface is consistant.
+
+        Args:
+            msg (PongMessage): The PongMessage dataclass instance
+        """
+        self.pong.emit(msg)
+
     def close(self) -> None:
         """Do everything needed to cleanly close this class."""
-        if self._oscClient:
+        if self._socket:
             logger.debug(f"Stopping {__class__.__name__}")
-            self._oscClient._sock.shutdown(socket.SHUT_RDWR)
-            self._oscClient._sock.close()
-            self._oscClient = None
+            self._socket.release()
+            self._socket = None
 
 
 class SlipSerialCommunicationAdapterImpl(IHardwareCommunicationAdapter, QObject):
-    """Handle communication with a device over Serial."""
+    """Handle communication with a device over a SLIP framed serial port.
+
+    The same osc messages as over udp are sent, the port is handled by
+    a SlipSerialLink so sending never blocks the output thread.
+    Heartbeats and discovery responses are parsed on it's reader thread.
+    """
 
     def __init__(self, *args, **kwargs) -> None:
-        ...
+        logger.debug(f"Creating {__class__.__name__}")
+        super().__init__(*args, **kwargs)
+
+        self._link: SlipSerialLink | None = None
+        self._port = ""
+        self._encoder: OscIntArrayEncoder | CompactFrameEncoder = \
+            OscIntArrayEncoder("/m", 0)
+        self._discoverPacket = OscMessageBuilder(
+            "/patpatpat/discover").build().dgram
+
+    def setup(self, settings: dict) -> None:
+        """Setup everything required for this communication
+        interface to work.
+
+        Args:
+            settings (dict): The settings dict for this HardwareDevice
+        """
+        try:
+            self.close()
+            self._encoder = OscCommunicationAdapterImpl._buildEncoder(
+                settings)
+            self._port = settings.get("serialPort", "")
+            if self._port:
+                self._link = SlipSerialLink(self._port, self._handlePacket,
+                                            self._handleOpen)
+            else:
+                logger.warning(
+                    f"{settings.get('name')} has no serial port set")
+        except Exception as E:
+            logger.exception(E)
+
+    def _handleOpen(self, link: SlipSerialLink) -> None:
+        """Ask the device who it is every time the port (re-)opens.
+
+        Args:
+            link (SlipSerialLink): The link that opened
+        """
+        link.send(self._discoverPacket, coalesce=False)
+
+    def _handlePacket(self, packet: bytes) -> None:
+        """Parse a packet from the device, runs in the reader thread.
+
+        Args:
+            packet (bytes): The osc message
+        """
+        try:
+            msg = OscMessage(packet)
+        except Exception:
+            logger.debug(f"Invalid osc message from {self._port}")
+            return
+        topic, params = msg.address, tuple(msg.params)
+        if HeartbeatMessage.isType(topic, params):
+            self.heartbeat.emit(
+                HeartbeatMessage(*params, sourceAddr=self._port))
+        elif PongMessage.isType(topic, params):
+            self.pong.emit(PongMessage(*params, sourceAddr=self._port))
+        elif DiscoveryResponseMessage.isType(topic, params):
+            self.discoveryResponse.emit(DiscoveryResponseMessage(
+                *params, sourceType=HardwareConnectionType.SLIPSERIAL,
+                sourceAddr=self._port))
+
+    def encodePinValues(self, pinValues: Sequence[int]) -> bytearray:
+        """Build the "/m" or compact frame message for the motor values.
+
+        Args:
+            pinValues (Sequence[int]): The pwm of every channel
+
+        Returns:
+            bytearray: The osc message, the buffer is reused
+        """
+        return self._encoder.encode(pinValues)
+
+    def sendEncoded(self, packet: bytes | bytearray) -> bool:
+        """Queue an encoded osc message, does not block.
+
+        If the port did not finish writing the previous message, that
+        one is replaced.
+
+        Args:
+            packet (bytes | bytearray): The message from
+                encodePinValues()
+
+        Returns:
+            bool: False if the port is not open
+        """
+        if not self._link or not self._link.isOpen:
+            self.lastError = f"{self._port or 'serial port'} is not open"
+            return False
+        self._link.send(packet)
+        return True
+
+    def sendControl(self, packet: bytes | bytearray) -> None:
+        """Queue a control message, it is written before any frame.
+
+        Args:
+            packet (bytes | bytearray): The osc message
+        """
+        if self._link:
+            self._link.send(packet, coalesce=False)
+
+    def updateEncoder(self, settings: dict) -> None:
+        """Switch to the frame format and channel count of the settings,
+        the port stays open.
+
+        Args:
+            settings (dict): The settings dict for this HardwareDevice
+        """
+        self._encoder = OscCommunicationAdapterImpl._replaceEncoder(
+            self._encoder, settings)
+
+    def retarget(self, address: str) -> None:
+        """Not required for this connection type, the port is fixed."""
+        pass
 
     def receivedExtHeartbeat(self, msg: HeartbeatMessage) -> None:
         """Not required for this connection type."""
         pass
 
+    def receivedExtPong(self, msg: PongMessage) -> None:
+        """Not required for this connection type."""
+        pass
+
+    def close(self) -> None:
+        """Do everything needed to cleanly close this class."""
+        if self._link:
+            logger.debug(f"Stopping {__class__.__name__}")
+            self._link.close()
+            self._link = None
+
 
 class HardwareCommunicationAdapterFactory:
     """Factory class to build hardware communication adapters."""
@@ -3,6 +3,7 @@ including discovery
 """
 
 import socket
+import time
 
 from PyQt6.QtCore import QObject, QThread, QTimer
 from PyQt6.QtCore import pyqtSignal as QSignal
@@ -11,16 +12,27 @@ from pythonosc.dispatcher import Dispatcher
 from pythonosc.osc_server import BlockingOSCUDPServer
 from pythonosc.udp_client import SimpleUDPClient
 
+from modules.DeviceRegistry import PLACEHOLDER_MAC, DeviceRegistry
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.HardwareDevice import HardwareDevice
-from modules.OscMessageTypes import DiscoveryResponseMessage, HeartbeatMessage
-from utils.Enums import HardwareConnectionType
+from modules.OscMessageTypes import (DiscoveryResponseMessage,
+                                     HeartbeatMessage, PongMessage)
+from modules.OutputFrame import FrameMailbox, OutputFrame, OutputLayout
+from utils.Enums import (FrameFormat, HardwareConnectionType,
+                         OutputSendPolicy)
 from utils.Logger import LoggerClass
 from utils.threadToStr import threadAsStr
 
 logger = LoggerClass.getSubLogger(__name__)
 config = GlobalConfigSingleton.getInstance()
 
+# With the spread policy the sends are spread over this part of a tick
+SPREAD_WINDOW = 0.5
+# How often to check which devices are due for a latency probe in ms
+PROBE_CHECK_INTERVAL = 100
+# Discovery responses arriving within this many ms are committed at once
+DISCOVERY_BATCH_WINDOW = 250
+
 
 class HwManager(QObject):
     """Handles all hardware related tasks."""
@@ -34,12 +46,44 @@ class HwManager(QObject):
         super().__init__(*args, **kwargs)
         self._configKey = "esps"
 
-        self.hardwareDevices: dict[int, HardwareDevice] = {}
+        # all devices by id, mac and address
+        self.registry = DeviceRegistry()
+        self.hardwareDevices: dict[int, HardwareDevice] = \
+            self.registry.devices
+
+        # Start the output thread sending solver frames to the hardware
+        self.outputMailbox = FrameMailbox()
+        self.hwOutput = HwOutput(self.outputMailbox, self.hardwareDevices)
+        self._handleProgramConfigChange("program.outputSendPolicy")
+        self._handleProgramConfigChange("program.outputKeepaliveMs")
 
         # Start osc receiver for discovery and heartbeat
         self.hwOscRx = HwOscRx()
         self.hwOscRx.onDiscoveryResponseMessage.connect(
             self._handleDiscoveryResponseMessage)
+        self.hwOscRx.onOscHeartbeatMessage.connect(self._routeHeartbeat)
+        self.hwOscRx.onOscPongMessage.connect(self._routePong)
+
+        # Ping every device at a low rate to measure the round trip time
+        self._probeTimer = QTimer(self)
+        self._probeTimer.timeout.connect(self._sendProbes)
+        self._probeTimer.start(PROBE_CHECK_INTERVAL)
+
+        # Discovery responses by mac, committed together when many
+        # devices power up at the same time
+        self._pendingDiscoveries: dict[str, DiscoveryResponseMessage] = {}
+        self._discoveryTimer = QTimer(self)
+        self._discoveryTimer.setSingleShot(True)
+        self._discoveryTimer.setInterval(DISCOVERY_BATCH_WINDOW)
+        self._discoveryTimer.timeout.connect(self._commitDiscoveries)
+
+        # The config keys of changed devices, applied at once after the
+        # current transaction or burst of changes is done
+        self._changedDeviceKeys: set[str] = set()
+        self._applyTimer = QTimer(self)
+        self._applyTimer.setSingleShot(True)
+        self._applyTimer.setInterval(0)
+        self._applyTimer.timeout.connect(self._applyConfigChanges)
 
         self.hwOscDiscoveryTx: HwOscDiscoveryTx | None = None
         self._handleProgramConfigChange("program.enableOscDiscovery")
@@ -52,24 +96,6 @@ class HwManager(QObject):
             r"esps\..*", self._hwConfigRemoved)
         self._hwConfigRemoved.connect(self._handleConfigRemoved)
 
-    def writeSpeed(self, hwId: int = 0, channelId: int = 0,
-                   value: float | int = 0) -> None:
-        """Write speed from motor into HardwareDevice's state buffer
-
-        Args:
-            hwId (int, optional): The destined HardwareDevice.
-                Defaults to 0.
-            channelId (int, optional): The destined HardwareDevice's
-                channel. Defaults to 0.
-            value (float | int, optional): The value to write.
-                Defaults to 0.
-        """
-        if hwId in self.hardwareDevices \
-                and channelId in self.hardwareDevices[hwId].pinStates:
-            self.hardwareDevices[hwId].pinStates[channelId] = value
-        else:
-            logger.debug("Specified HardwareDevice does not exist")
-
     def sendHwUpdateForId(self, hwId: int = 0) -> None:
         """Triggers a sendPinValues() on the destined Hardware.
 
@@ -82,45 +108,86 @@ class HwManager(QObject):
         else:
             logger.debug("Specified HardwareDevice does not exist")
 
-    def sendHwUpdate(self) -> None:
-        """Triggers a sendPinValues() on all hardware."""
-        for device in self.hardwareDevices.values():
-            device.sendPinValues()
+    def _updateOutputLayout(self) -> None:
+        """Rebuild the output frame layout from the configured devices."""
+        devices: dict = config.get(self._configKey, {})
+        self.outputMailbox.layout = OutputLayout.fromDevices(
+            {device["id"]: device["numMotors"] for device in devices.values()})
 
     def createAllHardwareDevicesFromConfig(self) -> None:
         """Creates all HardwareDevice objects from the config file."""
         logger.debug("(Re-)creating all HardwareDevice objects")
         devices = config.get(self._configKey)
-        for key, device in devices.items():
-            newDevice = self._deviceFactory(key)
-            self.hardwareDevices[device["id"]] = newDevice
+        for key in devices:
+            if oldDevice := self.registry.add(self._deviceFactory(key)):
+                oldDevice.close()
+        self._updateOutputLayout()
         self.hwListChanged.emit(self.hardwareDevices)
 
     @QSlot(str)
     def _handleConfigChange(self, key: str) -> None:
         """Handle config change events.
-        (Re-)creates the HardwareDevice objects as needed
+        Remembers the changed device, all changes that come in before
+        the event loop runs again are applied together.
 
         Args:
             key (str): The key of the config parameter that was changed.
         """
         if key.startswith(f"{self._configKey}.esp"):
-            keys = key.split(".")
-            id = config.get(f"{".".join(keys[:2])}.id")
-            if id in self.hardwareDevices:
-                # The device already exits, close first
-                self.hardwareDevices[id].close()
-            self.hardwareDevices[id] = self._deviceFactory(keys[1])
-            self.hwListChanged.emit(self.hardwareDevices)
+            self._changedDeviceKeys.add(key.split(".")[1])
+            self._applyTimer.start()
+
+    @QSlot()
+    def _applyConfigChanges(self) -> None:
+        """Applies the changes of all changed devices and updates the
+        output layout and the ui once.
+
+        Existing devices are updated in place, only new devices and
+        devices whose id changed are (re-)created.
+        """
+        keys, self._changedDeviceKeys = self._changedDeviceKeys, set()
+        for key in sorted(keys, key=lambda k: int(k.removeprefix("esp"))):
+            if not config.has(f"{self._configKey}.{key}"):
+                # removed since it was changed
+                continue
+            device = self.registry.byId(int(key.removeprefix("esp")))
+            if device and device.applyConfig():
+                continue
+            if device:
+                # it's id changed, the new one doesn't replace it
+                self.registry.remove(device.id)
+            replaced = self.registry.add(self._deviceFactory(key))
+            # close after creating the new one so the shared output
+            # socket stays open
+            for oldDevice in (replaced, device):
+                if oldDevice:
+                    oldDevice.close()
+        self._updateOutputLayout()
+        self.hwListChanged.emit(self.hardwareDevices)
 
     def _handleConfigRemoved(self, path: str) -> None:
         if path.startswith("esps.esp"):
             deviceId = int(path.removeprefix("esps.esp"))
-            self.hardwareDevices[deviceId].close()
-            del self.hardwareDevices[deviceId]
+            if device := self.registry.remove(deviceId):
+                device.close()
+            self._updateOutputLayout()
             self.hwListChanged.emit(self.hardwareDevices)
 
     def _handleProgramConfigChange(self, path: str) -> None:
+        if path in ("program.outputSendPolicy", "program.mainTps"):
+            self.hwOutput.worker.setPolicy(
+                config.get("program.outputSendPolicy", OutputSendPolicy.BURST),
+                config.get("program.mainTps", 30))
+        if path == "program.outputKeepaliveMs":
+            self.hwOutput.worker.setKeepalive(
+                config.get("program.outputKeepaliveMs", 500))
+        if path == "program.adaptivePacing":
+            for device in self.hardwareDevices.values():
+                device.pacer.enabled = device.usesAdaptivePacing
+        if path == "program.latencyProbeIntervalMs":
+            interval = config.get("program.latencyProbeIntervalMs", 2000)
+            for device in self.hardwareDevices.values():
+                device.latency.interval = interval/1000
         if path == "program.enableOscDiscovery":
             """Handle start/stop of the osc discovery sender"""
             if config.get("program.enableOscDiscovery"):
@@ -144,24 +211,82 @@ class HwManager(QObject):
             HardwareDevice: The new HardwareDevice instance
         """
         device = HardwareDevice(key)
-        self.hwOscRx.onOscHeartbeatMessage.connect(
-            device.hardwareCommunicationAdapter.receivedExtHeartbeat)
+        device.deviceAddressChanged.connect(
+            lambda _: self.registry.reindex(device))
+        # manual changes are sent by the output thread
+        device.outputRequested.connect(self.outputMailbox.wakeUp)
         return device
 
+    @QSlot(object)
+    def _routeHeartbeat(self, msg: HeartbeatMessage) -> None:
+        """Hand a heartbeat to the device with it's mac.
+
+        Args:
+            msg (HeartbeatMessage): The heartbeat
+        """
+        if device := self.registry.byMac(msg.mac):
+            device.hardwareCommunicationAdapter.receivedExtHeartbeat(msg)
+
+    @QSlot(object)
+    def _routePong(self, msg: PongMessage) -> None:
+        """Hand a latency probe pong to the device with it's mac.
+
+        Args:
+            msg (PongMessage): The pong
+        """
+        if device := self.registry.byMac(msg.mac):
+            device.hardwareCommunicationAdapter.receivedExtPong(msg)
+
+    @QSlot()
+    def _sendProbes(self) -> None:
+        """Send a latency probe to every device that is due for one."""
+        now = time.monotonic()
+        for device in list(self.hardwareDevices.values()):
+            device.sendProbe(now)
+
+    @QSlot(object)
     def _handleDiscoveryResponseMessage(self, msg: DiscoveryResponseMessage) -> None:
-        """Handle discovery response messages.
+        """Queue a discovery response message.
+
+        When many devices power up together their responses arrive in a
+        burst, they are committed together after DISCOVERY_BATCH_WINDOW.
+        A device answering more than once in that window counts once.
+
+        Args:
+            msg (DiscoveryResponseMessage): The discovery response message.
+        """
+        self._pendingDiscoveries[msg.mac] = msg
+        if not self._discoveryTimer.isActive():
+            self._discoveryTimer.start()
+
+    @QSlot()
+    def _commitDiscoveries(self) -> None:
+        """Commit all queued discovery responses in one config
+        transaction."""
+        messages = list(self._pendingDiscoveries.values())
+        self._pendingDiscoveries.clear()
+        with config.transaction():
+            for msg in messages:
+                self._processDiscoveryResponse(msg)
+
+    def _processDiscoveryResponse(self, msg: DiscoveryResponseMessage) -> None:
+        """Handle a discovery response message.
 
-        If the device already exists, it returns. If not, it creates a new
-        device from scratch.
+        If the device already exists, only it's announced features are
+        updated. If not, it creates a new device from scratch.
 
         Args:
             msg (DiscoveryResponseMessage): The discovery response message.
         """
         # Check if device already exists and return if it does so
-        if (id := self._checkDeviceExistance(msg.mac)) is not None:
+        if (device := self.registry.byMac(msg.mac)) is not None:
+            id = device.id
             logger.debug(f"Device with {msg.mac=} already exists in config "
                          f"as {id=} . Not creating a new one.")
-            self.hardwareDevices[id].wasDiscovered = True
+            device.wasDiscovered = True
+            # a firmware update can change what the device supports
+            if config.get(f"esps.esp{id}.features", 0) != msg.features:
+                config.set(f"esps.esp{id}.features", msg.features, True)
             return
         # If not this means it's a brand new device, create from scratch
         # Get a new device id
@@ -177,7 +302,10 @@ class HwManager(QObject):
             "wifiMac": msg.mac,
             "serialPort": msg.sourceAddr if
             msg.sourceType == HardwareConnectionType.SLIPSERIAL else "",
-            "numMotors": msg.numMotors
+            "numMotors": msg.numMotors,
+            "features": msg.features,
+            "frameFormat": FrameFormat.OSC,
+            "maxFrameRate": 0
         }
         # Save new device to config
         config.set(f"esps.{newDeviceKey}", newDeviceData, wasChanged=True)
@@ -192,27 +320,17 @@ class HwManager(QObject):
             "name": f"Unnamed Hardware {newDeviceId}",
             "connectionType": HardwareConnectionType.OSC,
             "lastIp": "169.254.1.50",
-            "wifiMac": "FF:FF:FF:FF:FF:FF",
+            "wifiMac": PLACEHOLDER_MAC,
             "serialPort": "",
-            "numMotors": 1
+            "numMotors": 1,
+            "features": 0,
+            "frameFormat": FrameFormat.OSC,
+            "maxFrameRate": 0
         }
         # Save new device to config
         config.set(f"esps.{newDeviceKey}", newDeviceData, wasChanged=True)
         # handle device "re"-creation through existing config change signal
 
-    def _checkDeviceExistance(self, mac: str) -> int | None:
-        """Checks config if given mac adress already exists.
-
-        Args:
-            mac (str): The mac adress to look for
-
-        Returns:
-            int | None: If mac is found in config, it's id, otherwise None
-        """
-        hardwareDevices: dict = config.get("esps")
-        return next((device["id"] for device in hardwareDevices.values()
-                     if device["wifiMac"] == mac), None)
-
     def _getNewHardwareId(self) -> int:
         """Calculates an available index for a new device
 
@@ -226,15 +344,178 @@ class HwManager(QObject):
     def close(self) -> None:
         """Closes everything hardware related."""
         logger.debug(f"Stopping {__class__.__name__}")
+        if hasattr(self, "_probeTimer"):
+            self._probeTimer.stop()
+        if hasattr(self, "_discoveryTimer"):
+            self._discoveryTimer.stop()
+        if hasattr(self, "_applyTimer"):
+            self._applyTimer.stop()
         if hasattr(self, "hwOscDiscoveryTx") and self.hwOscDiscoveryTx:
             self.hwOscDiscoveryTx.stop()
         if hasattr(self, "hwOscRx"):
             self.hwOscRx.close()
+        if hasattr(self, "hwOutput"):
+            self.hwOutput.close()
 
         for device in self.hardwareDevices.values():
             device.close()
 
 
+class HwOutputWorker(QObject):
+    """The thread sending the newest output frame to all devices.
+
+    For every frame the packets of all devices are encoded first and
+    then sent in one tight loop, so all devices get their update at
+    nearly the same time. With the spread policy the sends are instead
+    spaced evenly over the first half of a tick. Devices whose pin
+    values did not change are skipped until their keepalive is due.
+
+    Devices with a max frame rate only keep the newest values while
+    they are not allowed to send. The worker wakes up when the first of
+    them is due again, so they don't have to wait for the next frame.
+
+    Attributes:
+        lastSendSpanNs (int): Time between the first and the last send
+            of the last frame.
+    """
+
+    def __init__(self, mailbox: FrameMailbox,
+                 devices: dict[int, HardwareDevice], *args, **kwargs) -> None:
+        logger.debug(f"Creating {__class__.__name__}")
+        super().__init__(*args, **kwargs)
+        self._mailbox = mailbox
+        self._devices = devices
+        self._running = False
+        self._packets: list[tuple[HardwareDevice, bytes]] = []
+        self._spreadNs = 0
+        self._keepalive: float | None = None
+        self.lastSendSpanNs = 0
+
+    def setPolicy(self, policy: OutputSendPolicy | str, tps: int) -> None:
+        """Set how the sends of a frame are timed.
+
+        Args:
+            policy (OutputSendPolicy | str): Burst or spread
+            tps (int): The solver ticks per second
+        """
+        self._spreadNs = int(1e9/tps*SPREAD_WINDOW) \
+            if policy == OutputSendPolicy.SPREAD and tps > 0 else 0
+
+    def setKeepalive(self, keepaliveMs: int) -> None:
+        """Set the delta-send keepalive.
+
+        Unchanged frames are not sent to a device again until the
+        keepalive time since the last send has passed. It has to stay
+        below the hardware's own 1000ms timeout.
+
+        Args:
+            keepaliveMs (int): The keepalive in ms, 0 to send every
+                frame to every device.
+        """
+        self._keepalive = keepaliveMs/1000 if keepaliveMs > 0 else None
+
+    @QSlot()
+    def startOutput(self) -> None:
+        """Send every frame published to the mailbox until stopped."""
+        logger.debug(
+            f"startOutput pid={threadAsStr(QThread.currentThread())}")
+        self._running = True
+        timeout = 0.5
+        while self._running:
+            frame = self._mailbox.take(timeout)
+            try:
+                if frame is not None:
+                    self._encode(frame)
+                else:
+                    self._encodePending()
+                self._send()
+                timeout = self._pendingTimeout()
+            except Exception as E:
+                logger.exception(E)
+        logger.debug("startOutput done")
+
+    def _encode(self, frame: OutputFrame) -> None:
+        """Apply the frame to all devices and encode their packets.
+
+        Args:
+            frame (OutputFrame): The frame to send
+        """
+        packets = self._packets
+        packets.clear()
+        # the dict is changed by the main thread, take a copy
+        for deviceId, device in list(self._devices.items()):
+            device.applyFrame(*frame.device(deviceId))
+            if (packet := device.encodePinValues(self._keepalive, True)) \
+                    is not None:
+                packets.append((device, packet))
+
+    def _encodePending(self) -> None:
+        """Encode the packets of devices with held back values."""
+        packets = self._packets
+        packets.clear()
+        for device in list(self._devices.values()):
+            if device.hasPending and (packet := device.encodePinValues(
+                    self._keepalive, True)) is not None:
+                packets.append((device, packet))
+
+    def _pendingTimeout(self) -> float:
+        """How long to wait for a frame before sending held back values.
+
+        Returns:
+            float: The seconds until the first held back device is due,
+                at most 0.5
+        """
+        due = [device.nextSendTime() for device in
+               list(self._devices.values()) if device.hasPending]
+        if not due:
+            return 0.5
+        return min(max(min(due) - time.monotonic(), 0.0), 0.5)
+
+    def _send(self) -> None:
+        """Send all encoded packets."""
+        packets = self._packets
+        if not packets:
+            return
+        gapNs = self._spreadNs//len(packets)
+        startTime = time.perf_counter_ns()
+        for i, (device, packet) in enumerate(packets):
+            if gapNs and i:
+                delay = startTime + i*gapNs - time.perf_counter_ns()
+                if delay > 0:
+                    time.sleep(delay/1e9)
+            device.sendEncoded(packet)
+        self.lastSendSpanNs = time.perf_counter_ns() - startTime
+
+    def stop(self) -> None:
+        """Make startOutput() return."""
+        self._running = False
+        self._mailbox.wakeUp()
+
+
+class HwOutput(QObject):
+    """The Thread Manager for the hardware output."""
+
+    def __init__(self, mailbox: FrameMailbox,
+                 devices: dict[int, HardwareDevice], *args, **kwargs) -> None:
+        logger.debug(f"Creating {__class__.__name__}")
+        super().__init__(*args, **kwargs)
+
+        self.worker = HwOutputWorker(mailbox, devices)
+        self.workerThread = QThread()
+        self.workerThread.started.connect(self.worker.startOutput)
+        self.worker.moveToThread(self.workerThread)
+
+        logger.debug("Starting hardware output thread")
+        self.workerThread.start(QThread.Priority.HighestPriority)
+
+    def close(self) -> None:
+        """Stops the output thread."""
+        logger.debug("Closing hardware output")
+        self.worker.stop()
+        self.workerThread.quit()
+        self.workerThread.wait()
+
+
 class HwOscDiscoveryTx(QObject):
     """Sends out hardware discovery broadcasts on all interfaces
     """
@@ -294,6 +575,7 @@ class HwOscRxWorker(QObject):
 
     onDiscoveryResponseMessage = QSignal(object)
     onOscHeartbeatMessage = QSignal(object)
+    onOscPongMessage = QSignal(object)
 
     def __init__(self, *args, **kwargs) -> None:
         logger.debug(f"Creating {__class__.__name__}")
@@ -306,6 +588,9 @@ class HwOscRxWorker(QObject):
         self.dispatcher.map("/patpatpat/heartbeat",
                             self._handleHeartbeatMessage,
                             needs_reply_address=True)
+        self.dispatcher.map("/patpatpat/pong",
+                            self._handlePongMessage,
+                            needs_reply_address=True)
         self.dispatcher.set_default_handler(self._defaultHandler)
 
     def _defaultHandler(self, topic: str, *args) -> None:
@@ -326,6 +611,12 @@ class HwOscRxWorker(QObject):
             # logger.debug(msg)
             self.onOscHeartbeatMessage.emit(msg)
 
+    def _handlePongMessage(self, client: tuple, topic: str, *args) -> None:
+        if PongMessage.isType(topic, args):
+            # stamped here, the signal might wait for the main thread
+            self.onOscPongMessage.emit(
+                PongMessage(*args, sourceAddr=client[0]))
+
     @QSlot()
     def startOscServer(self) -> None:
         logger.debug(
@@ -361,6 +652,7 @@ class HwOscRx(QObject):
 
     onDiscoveryResponseMessage = QSignal(object)
     onOscHeartbeatMessage = QSignal(object)
+    onOscPongMessage = QSignal(object)
 
     def __init__(self, *args, **kwargs) -> None:
         logger.debug(f"Creating {__class__.__name__}")
@@ -376,6 +668,7 @@ class HwOscRx(QObject):
             self.onDiscoveryResponseMessage)
         self.worker.onOscHeartbeatMessage.connect(
             self.onOscHeartbeatMessage)
+        self.worker.onOscPongMessage.connect(self.onOscPongMessage)
 
         logger.debug("Starting heartbeat osc server and client")
         self.workerThread.start(QThread.Priority.HighestPriority)
@@ -0,0 +1,237 @@
+"""Measures the round trip time to a hardware device.
+
+The server sends "/patpatpat/ping" [probeId] to the device, which
+answers with "/patpatpat/pong" [mac, probeId, rxTime, txTime] to the
+server's receive port. rxTime and txTime are the device's micros() when
+the ping arrived and when the pong was sent, so the time the device
+needed to answer can be taken out of the round trip time and the
+offset between the device's and the server's clock can be estimated
+like NTP does:
+
+    t1  server sends ping       t2  device receives ping
+    t4  server receives pong    t3  device sends pong
+
+    rtt    = (t4 - t1) - (t3 - t2)
+    offset = ((t2 - t1) + (t3 - t4))/2    (error at most rtt/2)
+
+The offset of the sample with the lowest rtt is the most accurate one,
+so that one is reported. Pings are tiny and sent at a low rate, a
+device whose rtt goes up while the others stay low is congested or has
+a bad link.
+"""
+
+import itertools
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from modules.OscMessageTypes import PongMessage
+
+PING_ADDRESS = "/patpatpat/ping"
+PONG_ADDRESS = "/patpatpat/pong"
+# upper bucket edges of the rtt histogram in ms, the last bucket is open
+RTT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+# pings without a pong after this many seconds count as lost
+PROBE_TIMEOUT = 2.0
+# the number of recent samples percentiles and the offset are taken from
+SAMPLE_WINDOW = 64
+# the drift is only estimated from samples spanning at least this long
+MIN_DRIFT_SPAN = 30.0
+# the number of samples the recent rtt is the median of
+RECENT_SAMPLES = 5
+
+
+@dataclass(frozen=True)
+class LatencyStats:
+    """The round trip times of a device.
+
+    Attributes:
+        sent (int): Pings sent
+        received (int): Pongs received in time
+        lost (int): Pings without a pong in time
+        lastMs (float): The last rtt
+        minMs (float): The lowest rtt of the recent samples
+        p50Ms (float): The median rtt of the recent samples
+        p99Ms (float): The 99th percentile rtt of the recent samples
+        recentMs (float): The median rtt of the last RECENT_SAMPLES
+        histogram (tuple[int, ...]): Count of all rtts per
+            RTT_BUCKETS_MS bucket, plus one for everything above
+        offsetMs (float | None): Device clock minus server clock
+            (time.perf_counter) from the most accurate recent sample
+        offsetErrorMs (float): The max error of offsetMs
+        driftPpm (float | None): How much faster the device clock runs
+    """
+
+    sent: int = 0
+    received: int = 0
+    lost: int = 0
+    lastMs: float = 0.0
+    minMs: float = 0.0
+    p50Ms: float = 0.0
+    p99Ms: float = 0.0
+    recentMs: float = 0.0
+    histogram: tuple[int, ...] = (0,)*(len(RTT_BUCKETS_MS) + 1)
+    offsetMs: float | None = None
+    offsetErrorMs: float = 0.0
+    driftPpm: float | None = None
+
+
+class LatencyProbe:
+    """Sends pings to one device and keeps statistics of it's pongs.
+
+    Not thread safe, ping() and processPong() have to be called from
+    the same thread.
+    """
+
+    def __init__(self, interval: float = 2.0) -> None:
+        """Initialize the probe.
+
+        Args:
+            interval (float, optional): Seconds between two pings.
+                Defaults to 2.0.
+        """
+        self.interval = interval
+        # start at a random point so the devices don't ping in lockstep
+        self._nextPingTime = time.monotonic() + random.uniform(0, interval)
+        self._ids = itertools.count(1)
+        # probeId -> perf_counter_ns when sent
+        self._pending: dict[int, int] = {}
+        self._sent = 0
+        self._lost = 0
+        self._received = 0
+        self._lastRttUs = 0.0
+        self._histogram = [0]*(len(RTT_BUCKETS_MS) + 1)
+        # (server time us, rtt us, offset us) of the recent samples
+        self._samples: deque[tuple[float, float, float]] = \
+            deque(maxlen=SAMPLE_WINDOW)
+        # the device's 32 bit micros() unwrapped
+        self._lastDeviceUs: int | None = None
+
+    def isDue(self, now: float | None = None) -> bool:
+        """If the next ping should be sent.
+
+        Args:
+            now (float | None, optional): time.monotonic(). Defaults to
+                None.
+
+        Returns:
+            bool: If ping() should be called
+        """
+        if now is None:
+            now = time.monotonic()
+        return self.interval > 0 and now >= self._nextPingTime
+
+    def ping(self) -> bytes:
+        """Create the next ping and remember when it was sent.
+
+        The message has to be sent right away.
+
+        Returns:
+            bytes: The osc message
+        """
+        now = time.perf_counter_ns()
+        self._expire(now)
+        probeId = next(self._ids) & 0x7FFFFFFF
+        self._pending[probeId] = now
+        self._sent += 1
+        self._nextPingTime = time.monotonic() + self.interval
+        builder = OscMessageBuilder(PING_ADDRESS)
+        builder.add_arg(probeId)
+        return builder.build().dgram
+
+    def _expire(self, now: int) -> None:
+        """Count pings that timed out as lost.
+
+        Args:
+            now (int): perf_counter_ns
+        """
+        timeout = int(PROBE_TIMEOUT*1e9)
+        for probeId, sendTime in list(self._pending.items()):
+            if now - sendTime > timeout:
+                del self._pending[probeId]
+                self._lost += 1
+
+    def _unwrap(self, deviceTime: int) -> int:
+        """Turn the device's wrapping 32 bit micros() into a steady clock.
+
+        Args:
+            deviceTime (int): micros() as a signed or unsigned 32 bit int
+
+        Returns:
+            int: The unwrapped time in us
+        """
+        deviceTime &= 0xFFFFFFFF
+        if self._lastDeviceUs is None:
+            self._lastDeviceUs = deviceTime
+        else:
+            step = (deviceTime - self._lastDeviceUs + 0x80000000) \
+                % 0x100000000 - 0x80000000
+            self._lastDeviceUs += step
+        return self._lastDeviceUs
+
+    def processPong(self, msg: PongMessage) -> float | None:
+        """Take the timing of a pong.
+
+        Args:
+            msg (PongMessage): The pong of one of our pings
+
+        Returns:
+            float | None: The rtt in ms, None if the ping is unknown or
+                timed out
+        """
+        sendTime = self._pending.pop(msg.probeId, None)
+        if sendTime is None or \
+                msg.receivedNs - sendTime > int(PROBE_TIMEOUT*1e9):
+            if sendTime is not None:
+                self._lost += 1
+            return None
+        t1, t4 = sendTime/1000, msg.receivedNs/1000
+        t2 = self._unwrap(msg.rxTime)
+        t3 = t2 + ((msg.txTime - msg.rxTime) & 0xFFFFFFFF)
+        rttUs = max(0.0, (t4 - t1) - (t3 - t2))
+        offsetUs = ((t2 - t1) + (t3 - t4))/2
+        self._received += 1
+        self._lastRttUs = rttUs
+        self._histogram[np.searchsorted(RTT_BUCKETS_MS, rttUs/1000)] += 1
+        self._samples.append(((t1 + t4)/2, rttUs, offsetUs))
+        return rttUs/1000
+
+    def stats(self) -> LatencyStats:
+        """Calculate the statistics.
+
+        Returns:
+            LatencyStats: The statistics
+        """
+        self._expire(time.perf_counter_ns())
+        stats = {"sent": self._sent, "received": self._received,
+                 "lost": self._lost, "lastMs": self._lastRttUs/1000,
+                 "histogram": tuple(self._histogram)}
+        if self._samples:
+            times, rtts, offsets = np.array(self._samples).T
+            best = int(rtts.argmin())
+            stats.update(
+                minMs=float(rtts[best])/1000,
+                p50Ms=float(np.percentile(rtts, 50))/1000,
+                p99Ms=float(np.percentile(rtts, 99))/1000,
+                recentMs=float(np.median(rtts[-RECENT_SAMPLES:]))/1000,
+                offsetMs=float(offsets[best])/1000,
+                offsetErrorMs=float(rtts[best])/2000)
+            # queued samples have a worse offset, only use the fast ones
+            good = rtts <= 2*rtts[best] + 500
+            if np.ptp(times[good]) >= MIN_DRIFT_SPAN*1e6:
+                slope = np.polyfit(times[good] - times[0],
+                                   offsets[good] - offsets[best], 1)[0]
+                stats["driftPpm"] = float(slope)*1e6
+        return LatencyStats(**stats)
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
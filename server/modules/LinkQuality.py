@@ -0,0 +1,140 @@
+"""Lowers the output rate of devices with a bad wifi link.
+
+A device with a weak signal needs a lot more airtime for every packet
+and retransmits often, which slows down every other device on the same
+channel. The AdaptivePacer of a device rates it's link on every
+heartbeat from the rssi, the frame loss the device reports and the
+round trip time of the latency probe:
+
+    Good: full rate
+    Fair: at most FAIR_MAX_FRAME_RATE and only changed values are sent
+          (with a keepalive), even if the keepalive is turned off
+    Poor: at most POOR_MAX_FRAME_RATE, also delta only
+
+A worse rating is applied right away. To step back up, the link has to
+be rated better RECOVER_HEARTBEATS times in a row, so a link right at
+a threshold doesn't flip back and forth.
+"""
+
+from dataclasses import dataclass
+
+from modules.FrameSequence import FrameLossStats
+from modules.LatencyProbe import LatencyStats
+from utils.Enums import LinkQuality
+
+# (fair, poor) thresholds
+RSSI_THRESHOLDS = (-70, -80)
+LOSS_THRESHOLDS = (0.02, 0.10)
+RTT_THRESHOLDS_MS = (30.0, 100.0)
+
+FAIR_MAX_FRAME_RATE = 20
+POOR_MAX_FRAME_RATE = 10
+# the keepalive of delta only devices if the keepalive is turned off
+DELTA_ONLY_KEEPALIVE = 0.5
+# better ratings in a row needed to step up one level
+RECOVER_HEARTBEATS = 3
+
+_LEVELS = (LinkQuality.GOOD, LinkQuality.FAIR, LinkQuality.POOR)
+
+
+@dataclass(frozen=True)
+class LinkRating:
+    """The inputs and result of the last rating.
+
+    Attributes:
+        quality (LinkQuality): The applied link quality
+        rssi (int): The last rssi in dBm
+        lossRate (float): The recent frame loss, 0 if not reported
+        rttMs (float | None): The recent round trip time
+    """
+
+    quality: LinkQuality = LinkQuality.GOOD
+    rssi: int = 0
+    lossRate: float = 0.0
+    rttMs: float | None = None
+
+
+class AdaptivePacer:
+    """Rates the link of one device and limits it's output accordingly.
+
+    Attributes:
+        enabled (bool): If the link rating limits the output at all
+        rating (LinkRating): The last rating
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.rating = LinkRating()
+        self._betterCount = 0
+
+    @property
+    def quality(self) -> LinkQuality:
+        return self.rating.quality if self.enabled else LinkQuality.GOOD
+
+    @property
+    def minFrameInterval(self) -> float:
+        """The shortest time between two frames the link allows."""
+        match self.quality:
+            case LinkQuality.FAIR:
+                return 1/FAIR_MAX_FRAME_RATE
+            case LinkQuality.POOR:
+                return 1/POOR_MAX_FRAME_RATE
+        return 0.0
+
+    @property
+    def deltaOnly(self) -> bool:
+        """If unchanged values must not be sent every frame."""
+        return self.quality != LinkQuality.GOOD
+
+    @staticmethod
+    def _level(value: float, thresholds: tuple, higherIsWorse: bool = True) \
+            -> int:
+        fair, poor = thresholds
+        if not higherIsWorse:
+            value, fair, poor = -value, -fair, -poor
+        return 2 if value > poor else 1 if value > fair else 0
+
+    def update(self, rssi: int, loss: FrameLossStats,
+               latency: LatencyStats) -> bool:
+        """Rate the link with the values of a new heartbeat.
+
+        Args:
+            rssi (int): The rssi from the heartbeat
+            loss (FrameLossStats): The frame loss of the device
+            latency (LatencyStats): The round trip times of the device
+
+        Returns:
+            bool: If the applied link quality changed
+        """
+        rttMs = latency.recentMs if latency.received else None
+        levels = [self._level(rssi, RSSI_THRESHOLDS, False)
+                  if rssi < 0 else 0]
+        if loss.reported:
+            levels.append(self._level(loss.recentLossRate, LOSS_THRESHOLDS))
+        if rttMs is not None:
+            levels.append(self._level(rttMs, RTT_THRESHOLDS_MS))
+        rated = max(levels)
+        current = _LEVELS.index(self.rating.quality)
+        if rated > current:
+            level = rated
+            self._betterCount = 0
+        elif rated < current:
+            self._betterCount += 1
+            level = current
+            if self._betterCount >= RECOVER_HEARTBEATS:
+                level = current - 1
+                self._betterCount = 0
+        else:
+            level = current
+            self._betterCount = 0
+        self.rating = LinkRating(_LEVELS[level], rssi,
+                                 loss.recentLossRate, rttMs)
+        return level != current
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
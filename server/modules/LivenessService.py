@@ -0,0 +1,240 @@
+"""Detects when a data source goes silent, for all objects on one thread.
+
+Hardware devices, contact groups and the vrc connection all have to
+know if data is still coming in. Instead of each of them polling a
+timestamp with it's own QTimer, they register a LivenessHandle with
+the LivenessService and call refresh() whenever data arrives:
+
+    handle = LivenessService.getInstance().register("vrc", 3.0)
+    handle.stateChanged.connect(self._handleConnectionChanged)
+    ...
+    handle.refresh()    # on every incoming packet
+
+stateChanged only fires on edges: True on the first refresh after
+silence, False once timeout seconds passed without one.
+
+The deadlines are kept in a hashed timer wheel: WHEEL_SIZE slots of
+WHEEL_RESOLUTION seconds each, a handle sits in the slot of it's
+deadline tick. A refresh only moves the deadline of the handle, it is
+not moved to another slot. When the slot comes up the handle is either
+expired or put into the slot of it's new deadline, so a source sending
+a lot of data causes one wakeup per timeout instead of one per packet.
+The thread sleeps until the next occupied slot and not at all while
+no handle is alive.
+"""
+
+import math
+import threading
+import time
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtCore import pyqtSignal as QSignal
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+WHEEL_RESOLUTION = 0.05
+WHEEL_SIZE = 256
+
+
+class LivenessHandle(QObject):
+    """The liveness of one data source.
+
+    Attributes:
+        name (str): A name for debugging
+        timeout (float): Seconds without refresh() until it is dead
+        alive (bool): If data came in within the timeout
+    """
+
+    stateChanged = QSignal(bool)
+
+    def __init__(self, service: "LivenessService", name: str,
+                 timeout: float) -> None:
+        super().__init__()
+        self.name = name
+        self.timeout = timeout
+        self.alive = False
+        self._service = service
+        self._deadline = 0.0
+        # the wheel tick it is scheduled for, None if not in the wheel
+        self._tick: int | None = None
+
+    def refresh(self) -> None:
+        """Data came in, can be called from any thread."""
+        self._service._refresh(self)
+
+    def close(self) -> None:
+        """Stop watching, no more edges are emitted."""
+        self._service._remove(self)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name}, alive={self.alive})"
+
+
+class LivenessService:
+    """A hashed timer wheel on one thread firing LivenessHandle edges."""
+
+    __instance = None
+    __lock = threading.Lock()
+
+    @classmethod
+    def getInstance(cls) -> "LivenessService":
+        """Get the shared service, creating it if needed.
+
+        Returns:
+            LivenessService: The service
+        """
+        with cls.__lock:
+            if cls.__instance is None:
+                cls.__instance = cls()
+            return cls.__instance
+
+    def __init__(self) -> None:
+        logger.debug(f"Creating {__class__.__name__}")
+        # reentrant, a slot connected directly to an edge may refresh
+        self._condition = threading.Condition(threading.RLock())
+        self._slots: list[dict[LivenessHandle, None]] = \
+            [{} for _ in range(WHEEL_SIZE)]
+        self._count = 0
+        self._start = time.monotonic()
+        self._currentTick = 0
+        self._running = True
+        self.wakeups = 0
+        self._thread = threading.Thread(
+            target=self._run, name="LivenessService", daemon=True)
+        self._thread.start()
+
+    def register(self, name: str, timeout: float) -> LivenessHandle:
+        """Create a handle for a data source, it starts out dead.
+
+        Args:
+            name (str): A name for debugging
+            timeout (float): Seconds without refresh() until it is dead
+
+        Returns:
+            LivenessHandle: The handle
+        """
+        return LivenessHandle(self, name, timeout)
+
+    def _tickAt(self, t: float) -> int:
+        return math.ceil((t - self._start)/WHEEL_RESOLUTION)
+
+    def _refresh(self, handle: LivenessHandle) -> None:
+        """Move the deadline of a handle and emit the alive edge.
+
+        Args:
+            handle (LivenessHandle): The refreshed handle
+        """
+        with self._condition:
+            handle._deadline = time.monotonic() + handle.timeout
+            if handle._tick is None:
+                self._insert(handle)
+            if not handle.alive:
+                handle.alive = True
+                handle.stateChanged.emit(True)
+
+    def _insert(self, handle: LivenessHandle) -> None:
+        """Put a handle into the slot of it's deadline.
+
+        Args:
+            handle (LivenessHandle): The handle, not in the wheel
+        """
+        if not self._count:
+            # nothing was scheduled, the wheel did not turn meanwhile
+            self._currentTick = self._tickAt(time.monotonic()) - 1
+        tick = max(self._tickAt(handle._deadline), self._currentTick + 1)
+        self._slots[tick % WHEEL_SIZE][handle] = None
+        handle._tick = tick
+        self._count += 1
+        self._condition.notify()
+
+    def _remove(self, handle: LivenessHandle) -> None:
+        """Take a handle out of the wheel without an edge.
+
+        Args:
+            handle (LivenessHandle): The handle
+        """
+        with self._condition:
+            if handle._tick is not None:
+                del self._slots[handle._tick % WHEEL_SIZE][handle]
+                handle._tick = None
+                self._count -= 1
+            handle.alive = False
+
+    def _nextTick(self) -> int:
+        """Find the next tick a handle is due.
+
+        Returns:
+            int: The tick
+        """
+        for tick in range(self._currentTick + 1,
+                          self._currentTick + WHEEL_SIZE + 1):
+            if any(handle._tick <= tick
+                   for handle in self._slots[tick % WHEEL_SIZE]):
+                return tick
+        # everything is more than a wheel turn away
+        return min(handle._tick for slot in self._slots for handle in slot)
+
+    def _advance(self, targetTick: int) -> None:
+        """Expire or reschedule all handles due up to a tick.
+
+        Args:
+            targetTick (int): The tick to turn the wheel to
+        """
+        now = time.monotonic()
+        refreshed = []
+        # every slot has to be looked at once at most
+        for tick in range(max(self._currentTick + 1,
+                              targetTick - WHEEL_SIZE + 1), targetTick + 1):
+            slot = self._slots[tick % WHEEL_SIZE]
+            for handle in [h for h in slot if h._tick <= targetTick]:
+                del slot[handle]
+                handle._tick = None
+                self._count -= 1
+                if handle._deadline > now:
+                    # refreshed since it was put into this slot
+                    refreshed.append(handle)
+                else:
+                    handle.alive = False
+                    handle.stateChanged.emit(False)
+        self._currentTick = targetTick
+        # only now, else a deadline up to targetTick would land in a slot
+        # behind the wheel and only be seen again a whole turn later
+        for handle in refreshed:
+            self._insert(handle)
+
+    def _run(self) -> None:
+        """Sleep until the next handle is due and process it."""
+        with self._condition:
+            while self._running:
+                if not self._count:
+                    self._condition.wait()
+                    continue
+                delay = self._start + self._nextTick()*WHEEL_RESOLUTION \
+                    - time.monotonic()
+                if delay > 0:
+                    # an insert wakes us up early, then we recalculate
+                    self._condition.wait(delay)
+                    continue
+                self.wakeups += 1
+                self._advance(self._tickAt(time.monotonic()))
+
+    def close(self) -> None:
+        """Stop the thread, getInstance() creates a new service after."""
+        logger.debug(f"Stopping {__class__.__name__}")
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(1)
+        with self.__lock:
+            if LivenessService.__instance is self:
+                LivenessService.__instance = None
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
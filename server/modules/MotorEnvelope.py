@@ -0,0 +1,113 @@
+"""A time based envelope stage that shapes the pwm of many motors at once.
+
+The envelope works like a simple synth envelope where a motor is "gated
+on" as long as it's target is above 0:
+
+    attack:  How long (ms) a motor needs to ramp up from 0 to full scale.
+             Decreasing targets while gated on are followed immediately.
+    hold:    How long (ms) the last value is kept after the gate closed.
+    release: How long (ms) a motor needs to fade from full scale to 0
+             once the hold time is over, if the data went stale. A
+             fresh target of 0 (the contact left the motor's range)
+             stops the motor at once after the hold time.
+
+All times are converted to steps using the real elapsed time of a tick,
+so the result looks the same no matter how many ticks per second run.
+"""
+
+import numpy as np
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+
+class MotorEnvelope:
+    """Applies attack, hold and release to an array of motor pwm values.
+
+    Attributes:
+        current (np.ndarray): The current (float) pwm of every motor.
+    """
+
+    def __init__(self, fullScale: np.ndarray | list[int],
+                 attackMs: float = 0, holdMs: float = 0,
+                 releaseMs: float = 1000) -> None:
+        """Create a new envelope for a set of motors.
+
+        Args:
+            fullScale (np.ndarray | list[int]): The max pwm of every
+                motor. Attack and release rates are relative to it.
+            attackMs (float, optional): Attack time in ms. Defaults to 0.
+            holdMs (float, optional): Hold time in ms. Defaults to 0.
+            releaseMs (float, optional): Release time in ms.
+                Defaults to 1000.
+        """
+        self._fullScale = np.asarray(fullScale, dtype=np.float64)
+        self.current = np.zeros_like(self._fullScale)
+        self._holdLeft = np.zeros_like(self._fullScale)
+        self._output = np.zeros(self._fullScale.shape, dtype=np.int32)
+        self.setTimes(attackMs, holdMs, releaseMs)
+
+    def setTimes(self, attackMs: float, holdMs: float,
+                 releaseMs: float) -> None:
+        """Update the envelope times.
+
+        Args:
+            attackMs (float): Attack time in ms, 0 for instant.
+            holdMs (float): Hold time in ms.
+            releaseMs (float): Release time in ms, 0 for instant.
+        """
+        self._attackS = max(attackMs, 0)/1000
+        self._holdS = max(holdMs, 0)/1000
+        self._releaseS = max(releaseMs, 0)/1000
+
+    def reset(self) -> None:
+        """Set all motors to 0 immediately."""
+        self.current.fill(0)
+        self._holdLeft.fill(0)
+        self._output.fill(0)
+
+    def process(self, targets: np.ndarray, dt: float,
+                fresh: bool = True) -> np.ndarray:
+        """Advance the envelope of all motors by one tick.
+
+        Args:
+            targets (np.ndarray): The target pwm of every motor.
+            dt (float): The real time in seconds since the last tick.
+            fresh (bool, optional): If the targets were solved from
+                fresh data, only stale data is released slowly.
+                Defaults to True.
+
+        Returns:
+            np.ndarray: The new integer pwm of every motor. The array is
+                reused between calls.
+        """
+        current = self.current
+        gate = targets > 0
+
+        # the maximum change of every motor during this tick
+        attackStep = self._fullScale*(dt/self._attackS) \
+            if self._attackS else np.inf
+        releaseStep = self._fullScale*(dt/self._releaseS) \
+            if self._releaseS and not fresh else np.inf
+
+        # gated motors restart their hold time, others count it down
+        held = self._holdLeft > 0
+        np.subtract(self._holdLeft, dt, out=self._holdLeft)
+        np.maximum(self._holdLeft, 0, out=self._holdLeft)
+        self._holdLeft[gate] = self._holdS
+
+        sustain = np.minimum(targets, current + attackStep)
+        release = np.where(held, current,
+                           np.maximum(current - releaseStep, 0))
+        np.copyto(current, np.where(gate, sustain, release))
+        np.rint(current, out=self._output, casting="unsafe")
+        return self._output
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -1,7 +1,7 @@
 from typing import Any, cast
 
-from PyQt6.QtWidgets import (QCheckBox, QComboBox, QLineEdit, QRadioButton,
-                             QSlider, QSpinBox)
+from PyQt6.QtWidgets import (QCheckBox, QComboBox, QDoubleSpinBox, QLineEdit,
+                             QRadioButton, QSlider, QSpinBox)
 
 from utils.Logger import LoggerClass
 
@@ -65,6 +65,8 @@ class OptionAdapter():
                 method = cast(QLineEdit, element).setText
             case "QSpinBox":
                 method = cast(QSpinBox, element).setValue
+            case "QDoubleSpinBox":
+                method = cast(QDoubleSpinBox, element).setValue
             case "QComboBox":
                 method = cast(QComboBox, element).setCurrentText
             case "QRadioButton":
@@ -103,6 +105,8 @@ class OptionAdapter():
                 method = cast(QLineEdit, element).text
             case "QSpinBox":
                 method = cast(QSpinBox, element).value
+            case "QDoubleSpinBox":
+                method = cast(QDoubleSpinBox, element).value
             case "QComboBox":
                 method = cast(QComboBox, element).currentText
             case "QRadioButton":
@@ -163,7 +167,11 @@ class OptionAdapter():
         for path, (uiElem, dataType) in self._uiElems.items():
             path = f"{configKey}.{path}"
             newValue = self._getUiOpt(uiElem, dataType)
-            keyChanged = newValue != dataType(config.get(path))
+            try:
+                keyChanged = newValue != dataType(config.get(path))
+            except TypeError:
+                # option does not exist in config yet (eg. older config)
+                keyChanged = True
             if keyChanged:
                 changedKeys.append(path)
             if not onlyDiff:
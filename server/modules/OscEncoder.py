@@ -0,0 +1,75 @@
+"""A cached encoder for osc messages with a fixed number of int arguments.
+
+The motor update sent to the hardware is always the same address with
+the same amount of int32 arguments, only the values change. So the
+address and type tag string are built once and every update only writes
+the big-endian values into a reusable buffer:
+
+    /m\\0\\0 ,iiii\\0\\0\\0 <int32><int32><int32><int32>
+"""
+
+import numpy as np
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+
+def _oscString(value: str) -> bytes:
+    """Encode an osc string, null terminated and padded to 4 bytes.
+
+    Args:
+        value (str): The string
+
+    Returns:
+        bytes: The encoded string
+    """
+    data = value.encode() + b"\0"
+    return data + b"\0"*(-len(data) % 4)
+
+
+class OscIntArrayEncoder:
+    """Encodes a fixed amount of ints into a prebuilt osc message.
+
+    Attributes:
+        address (str): The osc address
+        count (int): The number of int arguments
+    """
+
+    def __init__(self, address: str, count: int) -> None:
+        """Build the message template.
+
+        Args:
+            address (str): The osc address, eg. "/m"
+            count (int): The number of int arguments
+        """
+        self.address = address
+        self.count = count
+        header = _oscString(address) + _oscString("," + "i"*count)
+        self._buffer = bytearray(header) + bytearray(4*count)
+        # a big-endian view of the argument slots inside the buffer
+        self._args = np.frombuffer(
+            self._buffer, dtype=">i4", count=count, offset=len(header))
+
+    def encode(self, values) -> bytearray:
+        """Write the values into the message.
+
+        The returned buffer is reused, it has to be sent before the next
+        call to encode().
+
+        Args:
+            values (np.ndarray | Sequence[int]): Exactly count ints
+
+        Returns:
+            bytearray: The complete osc message
+        """
+        np.copyto(self._args, values, casting="unsafe")
+        return self._buffer
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -2,6 +2,7 @@
 This module houses all possibel OSC connection messages as dataclasses
 """
 
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 
@@ -17,6 +18,10 @@ class HeartbeatMessage:
         uptime (int): The uptime of the hardware device in seconds
         vccBat (int): The current battery voltage
         rssi (int): The wifi rssi
+        lastSeq (int): The last frame sequence number the device got,
+            -1 if none yet or the firmware does not report it
+        framesLost (int): Frames missing in the sequence since boot
+        framesReordered (int): Frames that arrived late since boot
         sourceAddr (list[str, int]): The ip/port of the osc socket
         ts (int): The time the object was created (aka received)
     """
@@ -25,12 +30,15 @@ class HeartbeatMessage:
     uptime: int = 0
     vccBat: float = 0
     rssi: int = 0
+    lastSeq: int = -1
+    framesLost: int = 0
+    framesReordered: int = 0
     sourceAddr: str = ""
     ts: datetime = field(default_factory=datetime.now)
 
     @staticmethod
     def isType(topic: str, params: tuple) -> bool:
-        return topic == "/patpatpat/heartbeat" and len(params) == 4
+        return topic == "/patpatpat/heartbeat" and len(params) in (4, 7)
 
 
 @dataclass(frozen=True)
@@ -42,6 +50,8 @@ class DiscoveryResponseMessage:
         hostname (str): The hardware devices hostname
         numMotors (int): The max amount of output channels
             as configured in the hardware device
+        features (int): Feature flags of the firmware, eg.
+            FEATURE_COMPACT_FRAME. 0 for firmware that does not send them
         sourceType (str): The origin of the message, "OSC" or "SlipSerial"
         sourceAddr (str): The osc device ip or serial port name
         ts (int): The time the object was created (aka received)
@@ -50,13 +60,41 @@ class DiscoveryResponseMessage:
     mac: str = "00:00:00:00:00:00"
     hostname: str = ""
     numMotors: int = 0
+    features: int = 0
     sourceType: str | HardwareConnectionType = ""
     sourceAddr: str = ""
     ts: datetime = field(default_factory=datetime.now)
 
     @staticmethod
     def isType(topic: str, params: tuple) -> bool:
-        return topic == "/patpatpat/noticeme/senpai" and len(params) == 3
+        return topic == "/patpatpat/noticeme/senpai" \
+            and len(params) in (3, 4)
+
+
+@dataclass(frozen=True)
+class PongMessage:
+    """An incoming answer to a latency probe ping.
+
+    Attributes:
+        mac (str): The (wifi) mac of the sending hardware device
+        probeId (int): The id of the answered ping
+        rxTime (int): The device's micros() when the ping arrived
+        txTime (int): The device's micros() when the pong was sent
+        sourceAddr (str): The osc device ip or serial port name
+        receivedNs (int): time.perf_counter_ns() when the object was
+            created (aka received)
+    """
+
+    mac: str = "00:00:00:00:00:00"
+    probeId: int = 0
+    rxTime: int = 0
+    txTime: int = 0
+    sourceAddr: str = ""
+    receivedNs: int = field(default_factory=time.perf_counter_ns)
+
+    @staticmethod
+    def isType(topic: str, params: tuple) -> bool:
+        return topic == "/patpatpat/pong" and len(params) == 4
 
 
 if __name__ == "__main__":
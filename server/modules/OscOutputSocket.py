@@ -0,0 +1,111 @@
+"""The udp socket all osc hardware devices are sent to through.
+
+Instead of one socket per device, every OscCommunicationAdapterImpl
+holds a reference to the shared OscOutputSocket and sends to it's
+device with sendto(). Changing a device's address only changes the
+target the adapter passes in, no socket has to be rebuilt.
+
+The socket is non-blocking so the output thread never waits on it. If
+the kernel buffer is full the packet is dropped and counted, the next
+frame will carry newer values anyway. Other errors are returned to the
+caller, whose CircuitBreaker decides what to log.
+
+    sock = OscOutputSocket.acquire()
+    sock.sendto(packet, ("10.0.0.5", 8888))
+    sock.release()
+"""
+
+import socket
+import threading
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+# enough for a burst to a lot of devices without running into EAGAIN
+SEND_BUFFER_SIZE = 1024*1024
+
+
+class OscOutputSocket:
+    """A reference counted, shared non-blocking udp send socket.
+
+    Attributes:
+        packetsSent (int): Packets handed to the kernel
+        packetsDropped (int): Packets dropped because the send buffer
+            was full
+        sendErrors (int): Packets that failed for any other reason
+    """
+
+    __instance = None
+    __lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls) -> "OscOutputSocket":
+        """Get the shared socket, creating it if needed.
+
+        Every acquire() needs a matching release().
+
+        Returns:
+            OscOutputSocket: The shared socket
+        """
+        with cls.__lock:
+            if cls.__instance is None:
+                cls.__instance = cls()
+            cls.__instance._users += 1
+            return cls.__instance
+
+    def release(self) -> None:
+        """Give up a reference, closes the socket after the last one."""
+        with self.__lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if OscOutputSocket.__instance is self:
+                OscOutputSocket.__instance = None
+        logger.debug(f"Closing {__class__.__name__}")
+        self._sock.close()
+
+    def __init__(self) -> None:
+        logger.debug(f"Creating {__class__.__name__}")
+        self._users = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                                  SEND_BUFFER_SIZE)
+        except OSError as E:
+            logger.debug(f"Could not enlarge the send buffer: {E}")
+        self.packetsSent = 0
+        self.packetsDropped = 0
+        self.sendErrors = 0
+
+    def sendto(self, packet: bytes | bytearray,
+               target: tuple[str, int]) -> OSError | None:
+        """Send a packet without blocking.
+
+        Args:
+            packet (bytes | bytearray): The osc message
+            target (tuple[str, int]): The ip/port of the device
+
+        Returns:
+            OSError | None: The error if sending failed. A packet
+                dropped because of a full send buffer is no error.
+        """
+        try:
+            self._sock.sendto(packet, target)
+        except BlockingIOError:
+            self.packetsDropped += 1
+            return None
+        except OSError as E:
+            self.sendErrors += 1
+            return E
+        self.packetsSent += 1
+        return None
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
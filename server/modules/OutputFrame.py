@@ -0,0 +1,195 @@
+"""The hand-over of motor pwm values from the solver to the hardware.
+
+Once per tick the solver thread builds one OutputFrame, a flat array
+with the pwm of every channel of every hardware device, and publishes
+it into a FrameMailbox. The output stage takes the newest frame from the
+mailbox in it's own thread. Frames are never modified after they have
+been published, so they can be read without any further locking.
+
+Where a device's channels are inside the flat array is described by an
+OutputLayout, which is rebuilt whenever the hardware devices change:
+
+    layout = OutputLayout.fromDevices({0: 4, 1: 2})
+    layout.index(1, 1)  # -> 5
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutputLayout:
+    """Where the channels of every device are in an OutputFrame.
+
+    Attributes:
+        devices (dict[int, tuple[int, int]]): (offset, channel count)
+            by device id
+        size (int): The total number of channels
+    """
+
+    devices: dict[int, tuple[int, int]] = field(default_factory=dict)
+    size: int = 0
+
+    @classmethod
+    def fromDevices(cls, numChannels: dict[int, int]) -> "OutputLayout":
+        """Build a layout with the devices sorted by id.
+
+        Args:
+            numChannels (dict[int, int]): The channel count by device id
+
+        Returns:
+            OutputLayout: The new layout
+        """
+        devices = {}
+        offset = 0
+        for deviceId in sorted(numChannels):
+            devices[deviceId] = (offset, numChannels[deviceId])
+            offset += numChannels[deviceId]
+        return cls(devices, offset)
+
+    def index(self, deviceId: int, channel: int) -> int:
+        """Return the position of a device channel.
+
+        Args:
+            deviceId (int): The device id
+            channel (int): The device channel
+
+        Returns:
+            int: The index in the frame or -1 if the device or channel
+                does not exist.
+        """
+        offset, count = self.devices.get(deviceId, (0, 0))
+        return offset + channel if 0 <= channel < count else -1
+
+    def slice(self, deviceId: int) -> slice:
+        """Return the range of a device's channels.
+
+        Args:
+            deviceId (int): The device id
+
+        Returns:
+            slice: The channels of the device, empty if unknown
+        """
+        offset, count = self.devices.get(deviceId, (0, 0))
+        return slice(offset, offset + count)
+
+
+@dataclass(frozen=True)
+class OutputFrame:
+    """The pwm of every hardware channel for one tick.
+
+    Attributes:
+        seq (int): Increments with every frame
+        ts (float): The (unix) time the frame was solved for
+        layout (OutputLayout): The layout the frame was built with
+        pwm (np.ndarray): The read-only pwm of every channel
+        driven (np.ndarray): Read-only, True for channels that are
+            driven by a motor. All other channels are left untouched
+            so they can still be set manually.
+    """
+
+    seq: int
+    ts: float
+    layout: OutputLayout
+    pwm: np.ndarray
+    driven: np.ndarray
+
+    @classmethod
+    def build(cls, seq: int, ts: float, layout: OutputLayout,
+              pwm: np.ndarray, driven: np.ndarray) -> "OutputFrame":
+        """Create a frame, taking ownership of the arrays.
+
+        Args:
+            seq (int): The frame number
+            ts (float): The (unix) time
+            layout (OutputLayout): The layout
+            pwm (np.ndarray): The pwm of every channel
+            driven (np.ndarray): Which channels are driven
+
+        Returns:
+            OutputFrame: The frame
+        """
+        pwm.flags.writeable = False
+        driven.flags.writeable = False
+        return cls(seq, ts, layout, pwm, driven)
+
+    def device(self, deviceId: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the pwm and driven channels of a device.
+
+        Args:
+            deviceId (int): The device id
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Views of pwm and driven
+        """
+        deviceSlice = self.layout.slice(deviceId)
+        return self.pwm[deviceSlice], self.driven[deviceSlice]
+
+
+class FrameMailbox:
+    """A single slot, thread safe hand-over for OutputFrames.
+
+    Publishing replaces a frame that was not taken yet, the output
+    stage always gets the newest one.
+
+    Attributes:
+        layout (OutputLayout): The layout producers have to use. It is
+            replaced as a whole whenever the hardware changes.
+        published (int): Number of published frames
+        dropped (int): Number of frames replaced before they were taken
+    """
+
+    def __init__(self) -> None:
+        self.layout = OutputLayout()
+        self._frame: OutputFrame | None = None
+        self._condition = threading.Condition()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, frame: OutputFrame) -> None:
+        """Hand over a new frame, replacing one that was not taken.
+
+        Args:
+            frame (OutputFrame): The new frame
+        """
+        with self._condition:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.published += 1
+            self._condition.notify()
+
+    def take(self, timeout: float | None = None) -> OutputFrame | None:
+        """Take the newest frame, waiting for one if there is none.
+
+        Args:
+            timeout (float | None, optional): Max seconds to wait.
+                Defaults to None (wait forever).
+
+        Returns:
+            OutputFrame | None: The frame or None on timeout
+        """
+        with self._condition:
+            if self._frame is None:
+                self._condition.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+    def wakeUp(self) -> None:
+        """Wake up a waiting take() without a frame, eg. to stop."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -0,0 +1,132 @@
+"""Compiles the speed -> pwm response curve of motors into lookup tables.
+
+Cheap motors rarely react linearly to their pwm value. Every motor can
+have it's own curve which is compiled once into a table with a fixed
+resolution. Converting the speed of all motors of a group to pwm is
+then a single array index operation per tick.
+
+Supported curves (motor setting "curve"):
+    Linear:  The old behaviour, pwm = speed * maxPwm
+    Gamma:   pwm = speed^curveGamma * maxPwm
+    S-Curve: A smoothstep shaped curve, blended with linear by
+             curveGamma (0 = linear, 1 = full smoothstep)
+    Points:  Linear interpolation between the [speed, level] pairs in
+             curvePoints, both 0.0-1.0. There is no editor for the
+             points, they can only be set in the config file.
+"""
+
+import numpy as np
+
+from utils.Enums import ResponseCurveType
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+LUT_RESOLUTION = 1024
+
+
+def _curveLevels(settings: dict, speeds: np.ndarray) -> np.ndarray:
+    """Evaluate the normalized output level (0.0-1.0) of a curve.
+
+    Args:
+        settings (dict): The motor settings
+        speeds (np.ndarray): The normalized speeds to evaluate
+
+    Returns:
+        np.ndarray: The normalized output level for every speed
+    """
+    try:
+        curveType = ResponseCurveType(settings.get("curve", "Linear"))
+    except ValueError:
+        logger.error(f"Unknown response curve {settings.get('curve')} "
+                     f"for motor {settings.get('name')}, using linear")
+        curveType = ResponseCurveType.LINEAR
+
+    match curveType:
+        case ResponseCurveType.GAMMA:
+            gamma = max(float(settings.get("curveGamma", 1.0)), 0.01)
+            return speeds**gamma
+        case ResponseCurveType.SCURVE:
+            blend = min(max(float(settings.get("curveGamma", 1.0)), 0), 1)
+            smooth = speeds*speeds*(3 - 2*speeds)
+            return speeds + (smooth - speeds)*blend
+        case ResponseCurveType.POINTS:
+            try:
+                x, y = zip(*sorted(
+                    (float(x), float(y))
+                    for x, y in settings.get("curvePoints") or ()))
+            except (TypeError, ValueError):
+                x = ()
+            if not x:
+                logger.warning(f"Motor {settings.get('name')} has no valid "
+                               "curvePoints, using linear")
+                return speeds
+            return np.interp(speeds, x, y)
+        case _:
+            return speeds
+
+
+def compileResponseCurve(settings: dict,
+                         resolution: int = LUT_RESOLUTION) -> np.ndarray:
+    """Compile a motor's response curve into a lookup table.
+
+    Index i of the table holds the pwm for speed i/(resolution-1).
+    Every speed above 0 is lifted to at least minPwm (dead-band) and
+    the result is limited to maxPwm, so 8 and 10 bit channels both work.
+
+    Args:
+        settings (dict): The motor settings with minPwm, maxPwm and the
+            optional curve settings.
+        resolution (int, optional): The number of table entries.
+            Defaults to LUT_RESOLUTION.
+
+    Returns:
+        np.ndarray: The lookup table as int32 array
+    """
+    minPwm: int = settings["minPwm"]
+    maxPwm: int = settings["maxPwm"]
+    speeds = np.linspace(0.0, 1.0, resolution)
+    levels = np.clip(_curveLevels(settings, speeds), 0.0, 1.0)
+    pwm = np.minimum(np.ceil(maxPwm*levels), maxPwm)
+    pwm = np.where((pwm < minPwm) & (speeds > 0), minPwm, pwm)
+    return pwm.astype(np.int32)
+
+
+class ResponseCurveTable:
+    """The compiled response curves of a set of motors."""
+
+    def __init__(self, motorSettings: list[dict],
+                 resolution: int = LUT_RESOLUTION) -> None:
+        """Compile the curves of all motors.
+
+        Args:
+            motorSettings (list[dict]): The settings of every motor
+            resolution (int, optional): The number of table entries
+                per motor. Defaults to LUT_RESOLUTION.
+        """
+        self._scale = resolution - 1
+        self._rows = np.arange(len(motorSettings))
+        self.table = np.zeros((len(motorSettings), resolution), np.int32)
+        for i, settings in enumerate(motorSettings):
+            self.table[i] = compileResponseCurve(settings, resolution)
+        self._index = np.zeros(len(motorSettings), dtype=np.intp)
+
+    def lookup(self, speeds: np.ndarray) -> np.ndarray:
+        """Convert normalized speeds (0.0-1.0) of all motors to pwm.
+
+        Speeds are rounded up to the next table entry so even the
+        smallest speed above 0 turns a motor on.
+
+        Args:
+            speeds (np.ndarray): The speed of every motor
+
+        Returns:
+            np.ndarray: The pwm of every motor
+        """
+        np.ceil(np.clip(speeds, 0.0, 1.0)*self._scale,
+                out=self._index, casting="unsafe")
+        return self.table[self._rows, self._index]
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -5,6 +5,7 @@ from PyQt6.QtCore import QObject, QThread
 from modules.ContactGroup import ContactGroupManager
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.HwManager import HwManager
+from modules.LivenessService import LivenessService
 from modules.VrcConnector import VrcConnectorImpl
 from utils.Logger import LoggerClass
 from utils.threadToStr import threadAsStr
@@ -41,7 +42,8 @@ class ServerSingleton(QObject):
 
         self.hwManager = HwManager()
 
-        self.contactGroupManager = ContactGroupManager()
+        self.contactGroupManager = ContactGroupManager(
+            self.hwManager.outputMailbox)
 
         self.vrcOscConnector.onVrcContact.connect(
             self.contactGroupManager.onVrcContact)
@@ -49,10 +51,6 @@ class ServerSingleton(QObject):
             self.vrcOscConnector.addToFilter)
         self.contactGroupManager.unregisterAvatarPoint.connect(
             self.vrcOscConnector.removeFromFilter)
-        self.contactGroupManager.motorPwmChanged.connect(
-            self.hwManager.writeSpeed)
-        self.contactGroupManager.solverDone.connect(
-            self.hwManager.sendHwUpdate)
 
         self.hwManager.createAllHardwareDevicesFromConfig()
         self.contactGroupManager.createAllContactGroupsFromConfig()
@@ -72,6 +70,8 @@ class ServerSingleton(QObject):
         if hasattr(self, "hwManager"):
             self.hwManager.close()
 
+        LivenessService.getInstance().close()
+
 
 if __name__ == "__main__":
     print("There is no point running this file directly")
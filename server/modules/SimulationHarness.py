@@ -0,0 +1,276 @@
+"""Runs the solve pipeline offline against a virtual clock.
+
+The harness loads a config and a contact trace recorded with
+tools/oscRecReplayer.py, then advances a virtual clock tick by tick:
+
+    trace -> AvatarPoints (ingest) -> ContactGroup solvers
+          -> response curves/envelope -> motor pwm
+
+The pwm of every motor for every tick is collected into a PwmMatrix
+which can be written to and read from a csv file and diffed against
+another (golden) matrix. No sockets, timers or threads are involved so
+it runs as fast as the solvers allow and gives the same result on
+every run.
+
+Typical usage example:
+
+    harness = SimulationHarness(configData, tps=40)
+    matrix = harness.run(loadContactTrace("recording.json"))
+    matrix.write("out.csv")
+"""
+
+import csv
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication
+
+from modules.GlobalConfig import GlobalConfigSingleton
+from utils.ConfigHandler import MemoryConfigHandler
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+# The virtual unix time the simulation starts at. It only has to be far
+# enough from 0 so points that never received data count as stale.
+VIRTUAL_EPOCH = 1_000_000.0
+VRC_PARAMETER_PREFIX = "/avatar/parameters/"
+
+type contactTrace = list[tuple[float, str, float]]
+
+
+def loadContactTrace(file: str | Path) -> contactTrace:
+    """Load a recording made with tools/oscRecReplayer.py.
+
+    Args:
+        file (str | Path): The json recording
+
+    Returns:
+        contactTrace: (time since start, osc address, value) sorted
+            by time.
+    """
+    with open(file, mode="r") as f:
+        data = json.load(f)
+    trace = [(float(t), str(addr), float(value)) for t, addr, value in data]
+    return sorted(trace, key=lambda event: event[0])
+
+
+@dataclass(frozen=True)
+class PwmMatrix:
+    """The pwm of every motor for every simulated tick.
+
+    Attributes:
+        tps (int): The simulated ticks per second
+        columns (tuple[str, ...]): One name per motor,
+            "<group id>.<motor index>:<esp id>.<esp channel>"
+        rows (np.ndarray): ticks x motors pwm values
+    """
+
+    tps: int
+    columns: tuple[str, ...]
+    rows: np.ndarray
+
+    def write(self, file: str | Path) -> None:
+        """Write the matrix into a csv file.
+
+        Args:
+            file (str | Path): The file to write
+        """
+        with open(file, mode="w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow([f"tick@{self.tps}", *self.columns])
+            for tick, row in enumerate(self.rows.tolist()):
+                writer.writerow([tick, *row])
+
+    @classmethod
+    def read(cls, file: str | Path) -> "PwmMatrix":
+        """Read a matrix written by write().
+
+        Args:
+            file (str | Path): The file to read
+
+        Returns:
+            PwmMatrix: The matrix
+        """
+        with open(file, mode="r", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = [[int(v) for v in row[1:]] for row in reader]
+        tps = int(header[0].removeprefix("tick@"))
+        return cls(tps, tuple(header[1:]),
+                   np.array(rows, dtype=np.int32).reshape(-1, len(header)-1))
+
+    def diff(self, other: "PwmMatrix", maxLines: int = 20) -> list[str]:
+        """Compare with another matrix.
+
+        Args:
+            other (PwmMatrix): The matrix to compare with (eg. golden)
+            maxLines (int, optional): Limit the number of reported
+                differing ticks. Defaults to 20.
+
+        Returns:
+            list[str]: Human readable differences, empty if identical.
+        """
+        if self.tps != other.tps:
+            return [f"tps differ: {self.tps} != {other.tps}"]
+        if self.columns != other.columns:
+            return [f"motors differ: {self.columns} != {other.columns}"]
+
+        result = []
+        if len(self.rows) != len(other.rows):
+            result.append(f"tick count differs: {len(self.rows)} != "
+                          f"{len(other.rows)}")
+        numTicks = min(len(self.rows), len(other.rows))
+        ticks, cols = np.nonzero(
+            self.rows[:numTicks] != other.rows[:numTicks])
+        for tick in np.unique(ticks)[:maxLines].tolist():
+            changes = ", ".join(
+                f"{self.columns[c]}: {other.rows[tick, c]} -> "
+                f"{self.rows[tick, c]}" for c in cols[ticks == tick].tolist())
+            result.append(f"tick {tick}: {changes}")
+        if len(np.unique(ticks)) > maxLines:
+            result.append(f"... {len(np.unique(ticks))} ticks differ in total")
+        return result
+
+
+class SimulationHarness:
+    """Drives ContactGroups headless with a virtual clock."""
+
+    def __init__(self, configData: dict, tps: int | None = None,
+                 tail: float = 2.0) -> None:
+        """Prepare a new simulation.
+
+        Args:
+            configData (dict): The full program config
+            tps (int | None, optional): Ticks per second to simulate.
+                Defaults to None (program.mainTps from the config).
+            tail (float, optional): Seconds to keep simulating after
+                the last contact event so fades can finish.
+                Defaults to 2.0.
+        """
+        self._app = QCoreApplication.instance() or QCoreApplication([])
+        self._configData = configData
+        self.tps: int = tps or configData.get(
+            "program", {}).get("mainTps", 40)
+        self.tail = tail
+        self.groups: list = []
+        self.columns: tuple[str, ...] = ()
+
+    def _loadConfig(self) -> None:
+        """Point the global config at an in-memory copy of our config."""
+        handler = MemoryConfigHandler(self._configData)
+        if config := GlobalConfigSingleton.getInstance():
+            config.reload(handler)
+        else:
+            GlobalConfigSingleton(handler)
+
+    def setup(self) -> None:
+        """Load the config and create all contact groups.
+
+        Groups are created sorted by id for a stable column order.
+        """
+        self._loadConfig()
+        # imported late so the modules pick up the global config
+        from modules.ContactGroup import ContactGroup
+
+        self.groups = []
+        self._receivers: dict[str, list] = {}
+        groupConfigs = sorted(self._configData.get("groups", {}).items(),
+                              key=lambda item: item[1]["id"])
+        for key, _ in groupConfigs:
+            group = ContactGroup(f"groups.{key}")
+            group.avatarPointAdded.connect(
+                lambda p: self._receivers.setdefault(
+                    p.receiverId, []).append(p))
+            group.setup()
+            self.groups.append(group)
+
+        self.columns = tuple(
+            f"{groupConfig['id']}.{i}:{motor['espAddr'][0]}."
+            f"{motor['espAddr'][1]}"
+            for _, groupConfig in groupConfigs
+            for i, motor in enumerate(groupConfig["motors"]))
+
+    def close(self) -> None:
+        """Close all contact groups created by setup()."""
+        for group in self.groups:
+            group.close()
+        self.groups = []
+
+    def numTicks(self, trace: contactTrace,
+                 duration: float | None = None) -> int:
+        """Return how many ticks a simulation of the trace runs.
+
+        Args:
+            trace (contactTrace): The sorted contact events
+            duration (float | None, optional): Seconds to simulate.
+                Defaults to None (last event + tail).
+
+        Returns:
+            int: The number of ticks
+        """
+        if duration is None:
+            lastEvent = trace[-1][0] if trace else 0.0
+            return int(np.ceil((lastEvent + self.tail)*self.tps))
+        return round(duration*self.tps)
+
+    def ticks(self, trace: contactTrace,
+              numTicks: int) -> Iterator[tuple[int, float]]:
+        """Advance the virtual clock and feed the contact events.
+
+        All events up to a tick are delivered to the avatar points
+        before the tick is yielded, the caller then runs the groups.
+
+        Args:
+            trace (contactTrace): The sorted contact events
+            numTicks (int): The number of ticks to run
+
+        Yields:
+            tuple[int, float]: The tick index and it's virtual time
+        """
+        event = 0
+        for tick in range(numTicks):
+            tickTime = tick/self.tps
+            # ingest everything that happened up to this tick
+            while event < len(trace) and trace[event][0] <= tickTime:
+                t, addr, value = trace[event]
+                if addr.startswith(VRC_PARAMETER_PREFIX):
+                    for point in self._receivers.get(
+                            addr[len(VRC_PARAMETER_PREFIX):], []):
+                        point.vrcContact(VIRTUAL_EPOCH + t, [value])
+                event += 1
+            yield tick, VIRTUAL_EPOCH + tickTime
+
+    def run(self, trace: contactTrace,
+            duration: float | None = None) -> PwmMatrix:
+        """Simulate the given contact trace.
+
+        Args:
+            trace (contactTrace): The sorted contact events
+            duration (float | None, optional): Seconds to simulate.
+                Defaults to None (last event + tail).
+
+        Returns:
+            PwmMatrix: The pwm of every motor for every tick
+        """
+        self.setup()
+        numTicks = self.numTicks(trace, duration)
+        rows = np.zeros((numTicks, len(self.columns)), dtype=np.int32)
+        dt = 1/self.tps
+
+        for tick, now in self.ticks(trace, numTicks):
+            col = 0
+            for group in self.groups:
+                group.tick(dt, now)
+                rows[tick, col:col + len(group.pwm)] = group.pwm
+                col += len(group.pwm)
+
+        self.close()
+        return PwmMatrix(self.tps, self.columns, rows)
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
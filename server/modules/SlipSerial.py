@@ -0,0 +1,291 @@
+"""SLIP framed osc packets over a serial port.
+
+Osc over a stream needs framing, SLIP as described in RFC 1055 is used
+(the firmware takes it when built with USE_SERIAL_SLIP). Every packet
+is sent as END + escaped packet + END, so a receiver that got a partial
+packet resyncs on the next END.
+
+A SlipSerialLink owns the serial port and two threads:
+
+    writer: Writes the newest packet handed over with send(). When the
+            port is slower than the packets come in, older packets that
+            were not written yet are replaced (coalesced). Control
+            packets like discovery or pings are never replaced, they
+            are queued and written first.
+    reader: Opens (and reopens) the port, decodes incoming packets and
+            passes them to a callback.
+
+send() never blocks, it can be called from the output thread.
+"""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+import serial
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+END = 0xC0
+ESC = 0xDB
+# control packets queued at most, older ones are dropped
+CONTROL_QUEUE_SIZE = 16
+ESC_END = 0xDC
+ESC_ESC = 0xDD
+
+SERIAL_BAUDRATE = 115200
+
+
+def slipEncode(packet: bytes | bytearray) -> bytes:
+    """Frame a packet with SLIP.
+
+    Args:
+        packet (bytes | bytearray): The raw packet
+
+    Returns:
+        bytes: END + escaped packet + END
+    """
+    data = bytes(packet)
+    if END in data or ESC in data:
+        data = data.replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc")
+    return b"\xc0" + data + b"\xc0"
+
+
+class SlipDecoder:
+    """Splits a SLIP framed byte stream back into packets.
+
+    Empty packets (two END in a row) are skipped, an invalid escape
+    sequence drops the packet it appears in.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._escaped = False
+        self._invalid = False
+        self.droppedPackets = 0
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Decode received bytes.
+
+        Args:
+            data (bytes): The bytes read from the stream
+
+        Returns:
+            list[bytes]: All packets completed by these bytes
+        """
+        packets = []
+        for byte in data:
+            if byte == END:
+                if self._invalid:
+                    self.droppedPackets += 1
+                elif self._buffer:
+                    packets.append(bytes(self._buffer))
+                self._buffer.clear()
+                self._escaped = self._invalid = False
+            elif self._escaped:
+                self._escaped = False
+                if byte == ESC_END:
+                    self._buffer.append(END)
+                elif byte == ESC_ESC:
+                    self._buffer.append(ESC)
+                else:
+                    self._invalid = True
+            elif byte == ESC:
+                self._escaped = True
+            else:
+                self._buffer.append(byte)
+        return packets
+
+
+class SlipSerialLink:
+    """A serial port sending and receiving SLIP framed packets.
+
+    Attributes:
+        port (str): The serial port name, eg. "COM3" or "/dev/ttyACM0"
+        isOpen (bool): If the port is currently open
+        packetsWritten (int): Packets written to the port
+        packetsCoalesced (int): Packets replaced by a newer one before
+            they could be written
+        writeTimeouts (int): Writes that did not finish in time
+    """
+
+    def __init__(self, port: str, onPacket: Callable[[bytes], None],
+                 onOpen: Callable[["SlipSerialLink"], None] | None = None,
+                 baudrate: int = SERIAL_BAUDRATE,
+                 writeTimeout: float = 0.1,
+                 reopenInterval: float = 1.0) -> None:
+        """Start the reader and writer threads.
+
+        Args:
+            port (str): The serial port name
+            onPacket (Callable[[bytes], None]): Called from the reader
+                thread with every received packet
+            onOpen (Callable[[SlipSerialLink], None] | None, optional):
+                Called with the link from the reader thread every time
+                the port was (re-)opened. Defaults to None.
+            baudrate (int, optional): Defaults to SERIAL_BAUDRATE.
+            writeTimeout (float, optional): Max seconds a single write
+                may block the writer thread. Defaults to 0.1.
+            reopenInterval (float, optional): Seconds between attempts to
+                open the port. Defaults to 1.0.
+        """
+        self.port = port
+        self._onPacket = onPacket
+        self._onOpen = onOpen
+        self._baudrate = baudrate
+        self._writeTimeout = writeTimeout
+        self._reopenInterval = reopenInterval
+
+        self._serial: serial.Serial | None = None
+        self._pending: bytes | None = None
+        self._control: deque[bytes] = deque(maxlen=CONTROL_QUEUE_SIZE)
+        self._condition = threading.Condition()
+        self._running = True
+        self.packetsWritten = 0
+        self.packetsCoalesced = 0
+        self.writeTimeouts = 0
+        self._decoder = SlipDecoder()
+
+        self._reader = threading.Thread(
+            target=self._readLoop, name=f"SlipSerialReader({port})",
+            daemon=True)
+        self._writer = threading.Thread(
+            target=self._writeLoop, name=f"SlipSerialWriter({port})",
+            daemon=True)
+        self._reader.start()
+        self._writer.start()
+
+    @property
+    def isOpen(self) -> bool:
+        return self._serial is not None
+
+    def send(self, packet: bytes | bytearray, coalesce: bool = True) -> None:
+        """Queue a packet, replacing one that was not written yet.
+
+        Does not block. The packet is copied, so reused buffers like
+        the ones from the encoders can be passed in.
+
+        Args:
+            packet (bytes | bytearray): The raw (unframed) packet
+            coalesce (bool, optional): If False the packet is a control
+                packet which neither replaces nor is replaced by other
+                packets. Defaults to True.
+        """
+        framed = slipEncode(packet)
+        with self._condition:
+            if self._serial is None:
+                return
+            if not coalesce:
+                self._control.append(framed)
+            else:
+                if self._pending is not None:
+                    self.packetsCoalesced += 1
+                self._pending = framed
+            self._condition.notify()
+
+    def _open(self) -> bool:
+        """Try to open the port.
+
+        Returns:
+            bool: If the port is open now
+        """
+        try:
+            port = serial.Serial(self.port, self._baudrate, timeout=0.1,
+                                 write_timeout=self._writeTimeout)
+        except (serial.SerialException, ValueError) as E:
+            logger.debug(f"Failed to open {self.port}: {E}")
+            return False
+        with self._condition:
+            self._serial = port
+            self._condition.notify()
+        logger.info(f"Opened serial port {self.port}")
+        if self._onOpen:
+            self._onOpen(self)
+        return True
+
+    def _lost(self, port: serial.Serial, reason: Exception) -> None:
+        """Close the port after an error so the reader reopens it.
+
+        Args:
+            port (serial.Serial): The port that failed
+            reason (Exception): What went wrong
+        """
+        with self._condition:
+            if self._serial is not port:
+                return
+            self._serial = None
+            self._pending = None
+            self._control.clear()
+        if self._running:
+            logger.warning(f"Lost serial port {self.port}: {reason}")
+        port.close()
+
+    def _readLoop(self) -> None:
+        """Open the port and decode incoming packets until closed."""
+        while self._running:
+            port = self._serial
+            if port is None:
+                if not self._open():
+                    time.sleep(self._reopenInterval)
+                continue
+            try:
+                data = port.read(max(1, port.in_waiting))
+            except (serial.SerialException, OSError, TypeError) as E:
+                # pyserial raises TypeError when the port is closed
+                # from another thread during a read
+                self._lost(port, E)
+                continue
+            for packet in self._decoder.feed(data):
+                try:
+                    self._onPacket(packet)
+                except Exception as E:
+                    logger.exception(E)
+
+    def _writeLoop(self) -> None:
+        """Write the newest pending packet whenever there is one."""
+        while True:
+            with self._condition:
+                while self._running and (self._serial is None or (
+                        self._pending is None and not self._control)):
+                    self._condition.wait()
+                if not self._running:
+                    return
+                if self._control:
+                    packet = self._control.popleft()
+                else:
+                    packet, self._pending = self._pending, None
+                port = self._serial
+            try:
+                port.write(packet)
+                self.packetsWritten += 1
+            except serial.SerialTimeoutException:
+                # the END at the start of the next packet lets the
+                # device drop what was written of this one
+                self.writeTimeouts += 1
+            except (serial.SerialException, OSError) as E:
+                self._lost(port, E)
+
+    def close(self) -> None:
+        """Stop both threads and close the port."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+            port, self._serial = self._serial, None
+        if port is not None:
+            port.cancel_read()
+            port.cancel_write()
+        self._writer.join(1)
+        self._reader.join(1)
+        if port is not None:
+            port.close()
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
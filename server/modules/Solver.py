@@ -1,6 +1,6 @@
-import time
 from statistics import mean
 
+import numpy as np
 from multilateration import Engine, Point
 from PyQt6.QtCore import QObject
 from PyQt6.QtCore import pyqtSignal as QSignal
@@ -8,8 +8,10 @@ from PyQt6.QtCore import pyqtSlot as QSlot
 from PyQt6.QtGui import QVector3D
 
 from modules.AvatarPoint import AvatarPointSphere
+from modules.FalloffKernel import compileFalloffKernel
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.Motor import Motor
+from modules.SpatialLookupCache import SpatialLookupCache
 from utils.Enums import SolverType, VisualizerType
 from utils.Logger import LoggerClass
 
@@ -28,6 +30,8 @@ class ISolver(QObject):
         self._avatarPoints = avatarPoints
         self._motors = motors
         self._configKey = configKey
+        # the target speed (0.0-1.0) of every motor, written by solve()
+        self.speeds = np.zeros(len(motors), dtype=np.float64)
         self._loadConfig()
 
     def _loadConfig(self) -> None:
@@ -53,8 +57,15 @@ class ISolver(QObject):
         config.set(f"{self._configKey}.solver.strength", strength)
         self._loadConfig()
 
-    def solve(self) -> None:
-        """A generic solve method to be reimplemented."""
+    def solve(self, now: float) -> bool:
+        """A generic solve method to be reimplemented.
+
+        now is the current (unix) time, passed in so solvers can
+        also run against a virtual clock.
+        It has to update self.speeds in-place. Setting a speed to 0
+        lets the motor fade out through the ContactGroup's envelope.
+        It returns True if new speeds were solved from fresh data.
+        """
         raise NotImplementedError
 
     def __repr__(self) -> str:
@@ -80,11 +91,10 @@ class SingleN2NSolver(ISolver):
     def getType(self) -> SolverType:
         return SolverType.SINGLEN2N
 
-    def solve(self) -> None:
-        if not self._validatePointDataAge():
-            for motor in self._motors:
-                motor.fadeOut()
-            return
+    def solve(self, now: float) -> bool:
+        if not self._validatePointDataAge(now):
+            self.speeds.fill(0)
+            return False
 
         # Get min or max value of all contact receiver points
         distance = self._modeModule(
@@ -97,13 +107,13 @@ class SingleN2NSolver(ISolver):
         else:
             speed = max(1.0-distance, 0)*strengthFactor
 
-        # Write speed to motors
-        for motor in self._motors:
-            motor.setSpeed(speed)
+        # Write speed for all motors
+        self.speeds.fill(speed)
+        return True
 
-    def _validatePointDataAge(self) -> bool:
+    def _validatePointDataAge(self, now: float) -> bool:
         """Check that all received points are fresh"""
-        maxAge = time.time()-0.2
+        maxAge = now-0.2
         return all(p.lastValueTs > maxAge for p in self._avatarPoints)
 
 
@@ -120,6 +130,7 @@ class MlatSolver(ISolver):
     def setup(self) -> None:
         self.mlatEngine = Engine()
         self._contactOnly = self._config.get("contactOnly", False)
+        self._falloff = compileFalloffKernel(self._config)
 
         # Create anchor points
         for avatarPoint in self._avatarPoints:
@@ -128,14 +139,30 @@ class MlatSolver(ISolver):
         # find center point for validation
         self._centerPoint = min(self._avatarPoints, key=lambda p: p.y())
 
+        # motor geometry as arrays so all motors are computed at once
+        self._motorXyz = np.array([motor.point.xyz for motor in self._motors],
+                                  dtype=np.float64).reshape(-1, 3)
+        self._motorRadius = np.array(
+            [motor.point.radius for motor in self._motors], dtype=np.float64)
+
+        # optional lookup cache, the resolution is configured in mm.
+        # The cache belongs to this solver instance, any change to the
+        # motors or solver settings rebuilds the solver and with it the
+        # cache which then gets filled up again on demand.
+        self._lookupCache: SpatialLookupCache | None = None
+        if cacheResolution := self._config.get(
+                "MLAT_lookupCacheResolution", 0):
+            self._lookupCache = SpatialLookupCache(
+                cacheResolution/1000,
+                self._config.get("MLAT_lookupCacheSize", 4096))
+
     def getType(self) -> SolverType:
         return SolverType.MLAT
 
-    def solve(self) -> None:
-        if not self._validatePointDataAge():
-            for motor in self._motors:
-                motor.fadeOut()
-            return
+    def solve(self, now: float) -> bool:
+        if not self._validatePointDataAge(now):
+            self.speeds.fill(0)
+            return False
 
         # Add inverted and scaled point measures to solver
         for avatarPoint in self._avatarPoints:
@@ -146,7 +173,7 @@ class MlatSolver(ISolver):
         # Try to solve
         if not (solveResult := self.mlatEngine.solve()):
             logger.debug("Could not solve")
-            return
+            return False
 
         # logger.debug(f"Sucessfully solved to {str(solveResult)}")
 
@@ -157,35 +184,57 @@ class MlatSolver(ISolver):
         if self._config.get("MLat_enableHalfSphereCheck", False) \
                 and not self._runHalfSphereCheck(solvedPoint):
             logger.debug(f"Validation failed for {solvedPoint}")
-            return
+            return False
 
         self.newPointSolved.emit(solvedPoint, 0)
         logger.debug(solvedPoint)
 
+        if self._lookupCache is not None:
+            speeds = self._lookupCache.lookup(
+                solvedPoint.x(), solvedPoint.y(), solvedPoint.z(),
+                self._computeSpeeds)
+        else:
+            speeds = self._computeSpeeds(
+                (solvedPoint.x(), solvedPoint.y(), solvedPoint.z()))
+
         strengthFactor = self._config.get("strength", 100)/100.0
-        for motor in self._motors:
-            # calculate the distance and normalize it
-            distance = solvedPoint.distanceToPoint(
-                motor.point)/motor.point.radius
-            # at this point we have a %(0-1) for how far the contact is
-            # from the motor where:
-            # 0=both points touching, 1=edge of range, >1 out of range
-
-            if self._contactOnly:
-                # full speed ahead on contact if configured
-                speed = strengthFactor if distance <= 1.0 else 0
-            else:
-                # little deadband near the motors center
-                distance = max(distance, 0.1)
-
-                # invert value, clamp it and apply strength factor
-                speed = max(1.0-distance, 0)*strengthFactor
-
-            motor.setSpeed(speed)
-
-    def _validatePointDataAge(self) -> bool:
+        np.multiply(speeds, strengthFactor, out=self.speeds)
+        return True
+
+    def _computeSpeeds(self, xyz: tuple[float, float, float]) -> np.ndarray:
+        """Calculate the speed for all motors for a contact position.
+
+        The strength factor is not applied here so the result only
+        depends on the motor geometry and the solver settings.
+
+        Args:
+            xyz (tuple[float, float, float]): The contact position
+
+        Returns:
+            np.ndarray: The speed (0.0-1.0) of every motor
+        """
+        # calculate the distance and normalize it
+        # at this point we have a %(0-1) for how far the contact is
+        # from the motor where:
+        # 0=both points touching, 1=edge of range, >1 out of range
+        distance = np.linalg.norm(
+            self._motorXyz - np.asarray(xyz), axis=1)/self._motorRadius
+
+        if self._contactOnly:
+            # full speed ahead on contact if configured
+            return (distance <= 1.0).astype(np.float64)
+
+        # map the distance to an intensity with the configured falloff
+        return self._falloff(distance)
+
+    @property
+    def lookupCache(self) -> SpatialLookupCache | None:
+        """The lookup cache if enabled, mostly to read it's stats."""
+        return self._lookupCache
+
+    def _validatePointDataAge(self, now: float) -> bool:
         """Check that all received points are fresh"""
-        maxAge = time.time()-0.15
+        maxAge = now-0.15
         return all(p.lastValueTs > maxAge for p in self._avatarPoints)
 
     def _QVector3DfromMlatPoint(self, point: Point):
@@ -0,0 +1,142 @@
+"""A small LRU cache that maps quantized 3d positions to precomputed
+motor speed vectors.
+
+For a given contact group the speed of every motor only depends on the
+solved contact position and on static settings (motor geometry, falloff
+and so on). Snapping the solved position onto a grid lets us reuse the
+whole speed vector for every position that falls into the same cell.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable
+from math import floor
+
+import numpy as np
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+type cellKey = tuple[int, int, int]
+
+
+class SpatialLookupCache:
+    """A bounded LRU cache over quantized positions.
+
+    Every entry stores the full motor speed vector computed for the
+    center of the cell. Because values are always computed at the cell
+    center, the result for a position does not depend on which position
+    happened to fill the cell first.
+
+    Attributes:
+        resolution (float): The edge length of a cell.
+        maxEntries (int): The maximum number of cells kept in memory.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to be computed.
+    """
+
+    def __init__(self, resolution: float, maxEntries: int = 4096) -> None:
+        """Create a new cache.
+
+        Args:
+            resolution (float): The edge length of a grid cell in the
+                same unit as the positions. Must be > 0.
+            maxEntries (int, optional): The maximum amount of cells to
+                keep. Defaults to 4096.
+
+        Raises:
+            ValueError: If resolution or maxEntries are not positive.
+        """
+        if resolution <= 0 or maxEntries <= 0:
+            raise ValueError("resolution and maxEntries must be positive")
+        self.resolution = resolution
+        self.maxEntries = maxEntries
+        self._entries: OrderedDict[cellKey, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, x: float, y: float, z: float) -> cellKey:
+        """Return the cell a position falls into.
+
+        Args:
+            x (float): X
+            y (float): Y
+            z (float): Z
+
+        Returns:
+            cellKey: The integer cell coordinates.
+        """
+        res = self.resolution
+        return (floor(x/res + 0.5), floor(y/res + 0.5), floor(z/res + 0.5))
+
+    def cellCenter(self, key: cellKey) -> tuple[float, float, float]:
+        """Return the position of a cell's center.
+
+        Args:
+            key (cellKey): The cell.
+
+        Returns:
+            tuple[float, float, float]: The cell center as x, y, z.
+        """
+        res = self.resolution
+        return (key[0]*res, key[1]*res, key[2]*res)
+
+    def lookup(self, x: float, y: float, z: float,
+               compute: Callable[[tuple[float, float, float]], np.ndarray]) \
+            -> np.ndarray:
+        """Return the speed vector for a position.
+
+        If the cell is not cached yet, compute is called with the cell
+        center and the result is stored.
+
+        Args:
+            x (float): X
+            y (float): Y
+            z (float): Z
+            compute (Callable): Computes the speed vector for a
+                given (x, y, z) position.
+
+        Returns:
+            np.ndarray: The (read-only) speed vector of the cell.
+        """
+        key = self.quantize(x, y, z)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = np.array(compute(self.cellCenter(key)), dtype=np.float64)
+        entry.flags.writeable = False
+        self._entries[key] = entry
+        if len(self._entries) > self.maxEntries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        """Drop all cached cells and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hitRate(self) -> float:
+        """The ratio of lookups answered from the cache (0.0-1.0)."""
+        total = self.hits + self.misses
+        return self.hits/total if total else 0.0
+
+    @property
+    def size(self) -> int:
+        """The number of cached cells, not __len__ so an empty cache
+        isn't falsy."""
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()
+                   if key != "_entries"])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -0,0 +1,236 @@
+"""Measures every solver tick per phase and per contact group.
+
+A tick is split into these phases:
+
+    snapshot: Taking the list of groups and the current time.
+    solve:    Running the solver of every group.
+    map:      Mapping the solver speeds of every group to motor pwm
+              and writing them into the output frame.
+    send:     Publishing the output frame to the output stage.
+
+The durations are kept in preallocated ring buffers so measuring does
+not allocate anything per tick. When a tick overruns it's budget a
+TickReport tells which group or phase used up the time.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+PHASES = ("snapshot", "solve", "map", "send")
+SNAPSHOT, SOLVE, MAP, SEND = range(len(PHASES))
+
+
+@dataclass(frozen=True)
+class TickReport:
+    """What a single (overrun) tick spent it's time on.
+
+    Attributes:
+        tick (int): The number of the tick since the profiler started
+        totalMs (float): The duration of the whole tick
+        budgetMs (float): The time one tick is allowed to take
+        phasesMs (dict[str, float]): The duration of every phase
+        groupsMs (dict[int, tuple[float, float]]): The solve and map
+            duration of every group by group id
+        culprit (str): The group or phase that took the longest
+        culpritMs (float): The time the culprit took in this tick
+        culpritTypicalMs (float): The median time of the culprit
+    """
+
+    tick: int
+    totalMs: float
+    budgetMs: float
+    phasesMs: dict[str, float] = field(default_factory=dict)
+    groupsMs: dict[int, tuple[float, float]] = field(default_factory=dict)
+    culprit: str = ""
+    culpritMs: float = 0.0
+    culpritTypicalMs: float = 0.0
+
+    def __str__(self) -> str:
+        phases = ", ".join(f"{k}={v:.2f}" for k, v in self.phasesMs.items())
+        return (f"tick {self.tick} took {self.totalMs:.2f}ms of "
+                f"{self.budgetMs:.2f}ms, mostly {self.culprit} with "
+                f"{self.culpritMs:.2f}ms (typically "
+                f"{self.culpritTypicalMs:.2f}ms) [{phases}]")
+
+
+class TickProfiler:
+    """Keeps rolling per phase and per group tick timings.
+
+    Usage per tick:
+
+        row = profiler.beginTick()
+        profiler.addPhase(row, SNAPSHOT, ns)
+        profiler.addGroup(row, slot, groupId, solveNs, mapNs)
+        profiler.addPhase(row, SEND, ns)
+        profiler.endTick(row, totalNs)
+    """
+
+    def __init__(self, historySize: int = 1024, maxGroups: int = 16) -> None:
+        """Preallocate the history.
+
+        Args:
+            historySize (int, optional): Number of ticks to keep.
+                Defaults to 1024.
+            maxGroups (int, optional): Initial number of group slots,
+                grows when more groups are added. Defaults to 16.
+        """
+        self.historySize = historySize
+        self._phaseNs = np.zeros((historySize, len(PHASES)), dtype=np.int64)
+        self._totalNs = np.zeros(historySize, dtype=np.int64)
+        self._tickNumbers = np.zeros(historySize, dtype=np.int64)
+        self._allocateGroups(maxGroups)
+        self.ticks = 0
+
+    def _allocateGroups(self, maxGroups: int) -> None:
+        """(Re-)allocate the per group buffers, keeping the history.
+
+        Args:
+            maxGroups (int): The number of group slots
+        """
+        solveNs = np.zeros((self.historySize, maxGroups), dtype=np.int64)
+        mapNs = np.zeros_like(solveNs)
+        groupIds = np.full((self.historySize, maxGroups), -1, dtype=np.int32)
+        if hasattr(self, "_solveNs"):
+            keep = self._solveNs.shape[1]
+            solveNs[:, :keep] = self._solveNs
+            mapNs[:, :keep] = self._mapNs
+            groupIds[:, :keep] = self._groupIds
+        self._solveNs, self._mapNs, self._groupIds = solveNs, mapNs, groupIds
+
+    def beginTick(self) -> int:
+        """Start a new tick and clear it's row.
+
+        Returns:
+            int: The row to record this tick into
+        """
+        row = self.ticks % self.historySize
+        self._tickNumbers[row] = self.ticks
+        self._phaseNs[row] = 0
+        self._solveNs[row] = 0
+        self._mapNs[row] = 0
+        self._groupIds[row] = -1
+        return row
+
+    def addPhase(self, row: int, phase: int, ns: int) -> None:
+        """Add time to a phase of the current tick.
+
+        Args:
+            row (int): The row from beginTick()
+            phase (int): One of SNAPSHOT, SOLVE, MAP or SEND
+            ns (int): The duration
+        """
+        self._phaseNs[row, phase] += ns
+
+    def addGroup(self, row: int, slot: int, groupId: int,
+                 solveNs: int, mapNs: int) -> None:
+        """Record the solve and map time of a group.
+
+        Args:
+            row (int): The row from beginTick()
+            slot (int): The position of the group in this tick
+            groupId (int): The id of the group
+            solveNs (int): The solve duration
+            mapNs (int): The motor mapping duration
+        """
+        if slot >= self._solveNs.shape[1]:
+            self._allocateGroups(max(slot + 1, self._solveNs.shape[1]*2))
+        self._solveNs[row, slot] = solveNs
+        self._mapNs[row, slot] = mapNs
+        self._groupIds[row, slot] = groupId
+        self._phaseNs[row, SOLVE] += solveNs
+        self._phaseNs[row, MAP] += mapNs
+
+    def endTick(self, row: int, totalNs: int) -> None:
+        """Finish the current tick.
+
+        Args:
+            row (int): The row from beginTick()
+            totalNs (int): The duration of the whole tick
+        """
+        self._totalNs[row] = totalNs
+        self.ticks += 1
+
+    def _history(self) -> slice:
+        """The rows that contain recorded ticks."""
+        return slice(0, min(self.ticks, self.historySize))
+
+    def report(self, row: int, budgetNs: float) -> TickReport:
+        """Build a report of a recorded tick.
+
+        The culprit is the group (solve or map) or remaining phase that
+        took the longest in this tick.
+
+        Args:
+            row (int): The row of the tick
+            budgetNs (float): The time a tick is allowed to take
+
+        Returns:
+            TickReport: The report
+        """
+        history = self._history()
+        candidates = []
+        groupsMs = {}
+        for slot in np.flatnonzero(self._groupIds[row] >= 0).tolist():
+            groupId = int(self._groupIds[row, slot])
+            groupsMs[groupId] = (float(self._solveNs[row, slot])/1e6,
+                                 float(self._mapNs[row, slot])/1e6)
+            for name, buffer in (("solve", self._solveNs),
+                                 ("map", self._mapNs)):
+                # the typical time of this group, wherever it's slot was
+                typical = buffer[history][
+                    self._groupIds[history] == groupId]
+                candidates.append((
+                    f"group {groupId} {name}", buffer[row, slot],
+                    np.median(typical) if len(typical) else 0))
+        for phase in (SNAPSHOT, SEND):
+            candidates.append((PHASES[phase], self._phaseNs[row, phase],
+                               np.median(self._phaseNs[history, phase])))
+
+        culprit, culpritNs, typicalNs = max(
+            candidates, key=lambda c: c[1], default=("", 0, 0))
+        return TickReport(
+            tick=int(self._tickNumbers[row]),
+            totalMs=float(self._totalNs[row])/1e6,
+            budgetMs=budgetNs/1e6,
+            phasesMs={name: float(self._phaseNs[row, i])/1e6
+                      for i, name in enumerate(PHASES)},
+            groupsMs=groupsMs,
+            culprit=culprit,
+            culpritMs=float(culpritNs)/1e6,
+            culpritTypicalMs=float(typicalNs)/1e6)
+
+    def summary(self) -> dict[str, tuple[float, float, float]]:
+        """The rolling statistics of every phase and the whole tick.
+
+        Returns:
+            dict[str, tuple[float, float, float]]: p50, p99 and max in
+                ms for every phase and "total"
+        """
+        history = self._history()
+        if not self.ticks:
+            return {}
+        result = {}
+        for name, samples in (*((n, self._phaseNs[history, i])
+                                for i, n in enumerate(PHASES)),
+                              ("total", self._totalNs[history])):
+            p50, p99 = np.percentile(samples, (50, 99)).tolist()
+            result[name] = (p50/1e6, p99/1e6, float(samples.max())/1e6)
+        return result
+
+    def clear(self) -> None:
+        """Forget all recorded ticks."""
+        self.ticks = 0
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + ":" + ";"\
+            .join([f"{key}={str(val)}" for key, val in self.__dict__.items()
+                   if not key.startswith("_")])
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -1,7 +1,6 @@
-from datetime import datetime
 from time import time
 
-from PyQt6.QtCore import QObject, QThread, QTimer
+from PyQt6.QtCore import QObject, QThread
 from PyQt6.QtCore import pyqtSignal as QSignal
 from PyQt6.QtCore import pyqtSlot as QSlot
 from pythonosc import osc_packet
@@ -11,12 +10,16 @@ from pythonosc.osc_server import BlockingOSCUDPServer
 from pythonosc.udp_client import SimpleUDPClient
 
 from modules.GlobalConfig import GlobalConfigSingleton
+from modules.LivenessService import LivenessHandle, LivenessService
 from utils.Logger import LoggerClass
 from utils.threadToStr import threadAsStr
 
 logger = LoggerClass.getSubLogger(__name__)
 config = GlobalConfigSingleton.getInstance()
 
+# seconds without any osc message until vrc counts as disconnected
+DATA_TIMEOUT = 3.0
+
 
 class IVrcConnector():
     """The interface for server <-> vrc communication."""
@@ -40,11 +43,11 @@ class IVrcConnector():
         """A generic send method to be reimplemented."""
         raise NotImplementedError
 
-    def addToFilter(self, relativePath: str):
+    def addToFilter(self, relativePath: str, liveness):
         """A generic addToFilter method to be reimplemented."""
         raise NotImplementedError
 
-    def removeFromFilter(self, relativePath: str):
+    def removeFromFilter(self, relativePath: str, liveness):
         """A generic removeFromFilter method to be reimplemented."""
         raise NotImplementedError
 
@@ -71,7 +74,11 @@ class VrcConnectionWorker(QObject):
         try:
             self._oscRx = BlockingOSCUDPServer(
                 ("", self._oscRxPort), self.dispatcher)
-            self._oscRx.serve_forever()
+            # block until a packet arrives instead of polling for the
+            # shutdown, closeOscServer() wakes us up
+            self._oscRx.timeout = None
+            while not QThread.currentThread().isInterruptionRequested():
+                self._oscRx.handle_request()
         except Exception as E:
             logger.exception(E)
         logger.debug("startOsc done, cleaning up...")
@@ -87,8 +94,16 @@ class VrcConnectionWorker(QObject):
         selfThread = self.thread()
         logger.debug(f"{threadAsStr(QThread.currentThread())=} "
                      f"{threadAsStr(selfThread)=}")
-        if hasattr(self, "_oscRx"):
-            self._oscRx.shutdown()
+        if selfThread:
+            selfThread.requestInterruption()
+        if oscRx := getattr(self, "_oscRx", None):
+            # an empty datagram is not dispatched, it only wakes us up
+            try:
+                oscRx.socket.sendto(
+                    b"", ("127.0.0.1", oscRx.server_address[1]))
+            except OSError:
+                # a packet woke it up first and it closed already
+                pass
         if selfThread:
             selfThread.quit()
             selfThread.wait()
@@ -109,8 +124,11 @@ class VrcConnectionWorker(QObject):
 class VrcConnectorImpl(IVrcConnector, QObject):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__()
-        self._lastVrcMessage: datetime | None = None
         self.currentDataState = False
+        # refreshed by the worker thread on every incoming packet
+        self.liveness = LivenessService.getInstance().register(
+            "vrc", DATA_TIMEOUT)
+        self.liveness.stateChanged.connect(self._handleConnectionChanged)
         self.worker = VrcConnectionWorker(self)
         self.worker.loadSettings()
         self.workerThread = QThread()
@@ -118,35 +136,24 @@ class VrcConnectorImpl(IVrcConnector, QObject):
         self.workerThread.started.connect(self.worker.startOscServer)
         self.worker.moveToThread(self.workerThread)
 
-        self._timer = QTimer(self)
-        self._timer.timeout.connect(self._timerEvent)
-        self._timer.start(1000)
-
         config.configRootUpdateDone.connect(self._oscGeneralConfigChanged)
 
     def _receivedOsc(self, client: tuple, addr: str, params: list) -> None:
         """Just a test function that prints if osc event was fired."""
         logger.info(f"osc from {str(client)}: addr={addr} msg={str(params)}")
 
-    @QSlot()
-    def _timerEvent(self) -> None:
-        """Handle calculation of the connection to vrc based on if data
-        is beeing received (with a timeout).
+    @QSlot(bool)
+    def _handleConnectionChanged(self, state: bool) -> None:
+        """Data from vrc started coming in or stopped for too long.
         This is not used for the Contact Groups.
+
+        Args:
+            state (bool): The new connection state
         """
-        # TODO: This could be improved to trigger instantly when data comes in
-        if not self.currentDataState and self._lastVrcMessage and \
-                (datetime.now() - self._lastVrcMessage).total_seconds() <= 3:
-            self.currentDataState = True
-            logger.debug("VRC connection state changed to "
-                         f"{self.currentDataState}")
-            self.onVrcConnectionStateChanged.emit(self.currentDataState)
-        elif self.currentDataState and self._lastVrcMessage and \
-                (datetime.now() - self._lastVrcMessage).total_seconds() > 3:
-            self.currentDataState = False
-            logger.debug("VRC connection state changed to "
-                         f"{self.currentDataState}")
-            self.onVrcConnectionStateChanged.emit(self.currentDataState)
+        self.currentDataState = state
+        logger.debug("VRC connection state changed to "
+                     f"{self.currentDataState}")
+        self.onVrcConnectionStateChanged.emit(self.currentDataState)
 
     def connect(self) -> None:
         """Start worker thread and osc sender"""
@@ -177,14 +184,39 @@ class VrcConnectorImpl(IVrcConnector, QObject):
         """
         self.worker.sendOsc(path, values)
 
-    def addToFilter(self, relativePath: str) -> None:
-        if relativePath not in self.worker.dispatcher.matchTopics:
-            self.worker.dispatcher.matchTopics.append(relativePath)
+    @QSlot(str, object)
+    def addToFilter(self, relativePath: str,
+                    liveness: LivenessHandle) -> None:
+        """Let a contact receiver through the filter.
+
+        Args:
+            relativePath (str): The receiver id
+            liveness (LivenessHandle): Refreshed when data for it comes in
+        """
+        topics = self.worker.dispatcher.matchTopics
+        if relativePath not in topics:
             logger.debug(f"Added {relativePath} to vrc osc filter")
+        # the worker thread iterates the tuple, never change it in place
+        topics[relativePath] = topics.get(relativePath, ()) + (liveness,)
 
-    def removeFromFilter(self, relativePath: str) -> None:
-        if relativePath in self.worker.dispatcher.matchTopics:
-            self.worker.dispatcher.matchTopics.remove(relativePath)
+    @QSlot(str, object)
+    def removeFromFilter(self, relativePath: str,
+                         liveness: LivenessHandle) -> None:
+        """Remove a contact receiver added with addToFilter().
+
+        Args:
+            relativePath (str): The receiver id
+            liveness (LivenessHandle): The handle it was added with
+        """
+        topics = self.worker.dispatcher.matchTopics
+        handles = list(topics.get(relativePath, ()))
+        if liveness not in handles:
+            return
+        handles.remove(liveness)
+        if handles:
+            topics[relativePath] = tuple(handles)
+        else:
+            del topics[relativePath]
             logger.debug(f"Removed {relativePath} from vrc osc filter")
 
     def _oscGeneralConfigChanged(self, root: str) -> None:
@@ -219,14 +251,17 @@ class VrcOscDispatcher(Dispatcher):
             connector (OSCWorker): The OSC connector.
         """
         self._connector: VrcConnectorImpl = connector
-        self.matchTopics = []
+        # receiver id -> LivenessHandles of the groups using it
+        self.matchTopics: dict[str, tuple[LivenessHandle, ...]] = {}
 
     def call_handlers_for_packet(self, data: bytes,
                                  client_address: tuple[str, int]) -> None:
         """Handles incoming OSC packets.
 
         Parses the incoming OSC packet and emits a signal if the message
-        address starts with "/avatar/parameters/". Logs a debug message
+        address starts with "/avatar/parameters/". The connection state
+        of vrc and of the contact groups is refreshed right here, so
+        their edges don't wait for the main thread. Logs a debug message
         for each incoming OSC message and if the OSC packet could not
         be parsed.
 
@@ -237,7 +272,10 @@ class VrcOscDispatcher(Dispatcher):
             packet = osc_packet.OscPacket(data)
             for msg in packet.messages:
                 if msg.message.address.startswith("/avatar/parameters/") \
-                        and msg.message.address[19:] in self.matchTopics:
+                        and (handles := self.matchTopics.get(
+                            msg.message.address[19:])):
+                    for liveness in handles:
+                        liveness.refresh()
                     # pid = threadAsStr(QThread.currentThread())
                     # logger.debug(
                     # f"{pid=} incoming osc: "
@@ -249,7 +287,7 @@ class VrcOscDispatcher(Dispatcher):
                         msg.message.address,
                         msg.message.params
                     )
-            self._connector._lastVrcMessage = datetime.now()
+            self._connector.liveness.refresh()
         except osc_packet.ParseError:
             logger.error("Could not parse osc message")
 
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+
+def _waitFor(condition, timeout=2.0):
+    """Poll a condition, delivering queued signals meanwhile"""
+    from PyQt6.QtCore import QCoreApplication
+    end = time.monotonic() + timeout
+    while not condition():
+        if app := QCoreApplication.instance():
+            app.processEvents()
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture()
+def waitFor():
+    return _waitFor
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Deleting the app would also delete the config singleton"""
+    from PyQt6.QtCore import QCoreApplication
+    yield QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture()
+def loadConfig(app):
+    """Load a config dict into the config singleton, creating it if
+    there is none yet"""
+    def load(data):
+        from modules.GlobalConfig import GlobalConfigSingleton
+        from utils.ConfigHandler import MemoryConfigHandler
+        handler = MemoryConfigHandler(data)
+        if config := GlobalConfigSingleton.getInstance():
+            config.reload(handler)
+        else:
+            config = GlobalConfigSingleton(handler)
+        return config, handler
+    return load
@@ -0,0 +1,32 @@
+class TestCircuitBreaker:
+    def test_backoff(self):
+        """Test that the breaker opens, probes with a growing backoff
+        and closes again"""
+        from modules.CircuitBreaker import (FAILURE_THRESHOLD, MIN_BACKOFF,
+                                            CircuitBreaker)
+        breaker = CircuitBreaker("test")
+        for _ in range(FAILURE_THRESHOLD):
+            assert breaker.allow()
+            breaker.record(False, "unreachable")
+        assert breaker.isOpen and breaker.trips == 1
+        assert not breaker.allow() and breaker.skipped == 1
+
+        # the probe is let through once the backoff passed
+        breaker._nextProbeTime -= MIN_BACKOFF
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record(False)
+        assert breaker._backoff == 2*MIN_BACKOFF
+
+        breaker._nextProbeTime = 0
+        assert breaker.allow()
+        breaker.record(True)
+        assert not breaker.isOpen and breaker.failures == 0
+
+    def test_reset(self):
+        from modules.CircuitBreaker import FAILURE_THRESHOLD, CircuitBreaker
+        breaker = CircuitBreaker("test")
+        for _ in range(FAILURE_THRESHOLD):
+            breaker.record(False)
+        breaker.reset()
+        assert not breaker.isOpen and breaker.allow()
@@ -0,0 +1,63 @@
+import pytest
+
+
+class TestCompactFrame:
+    @pytest.mark.parametrize("values", [[], [0], [1, 2, 3], [0, 70, 255],
+                                        [0, 70, 255, 1023], [65535, 0]])
+    def test_roundtrip(self, values):
+        """Test that the osc blob decodes to the encoded values"""
+        from pythonosc.osc_message import OscMessage
+
+        from modules.CompactFrame import (COMPACT_FRAME_ADDRESS,
+                                          CompactFrameEncoder,
+                                          decodeCompactFrame)
+        encoder = CompactFrameEncoder(len(values))
+        message = OscMessage(bytes(encoder.encode(values)))
+        assert message.address == COMPACT_FRAME_ADDRESS
+        frame = decodeCompactFrame(message.params[0])
+        assert frame.seq == 0 and frame.values == values
+
+    def test_width(self):
+        """Test that 16 bit values are only used when needed"""
+        from modules.CompactFrame import CompactFrameEncoder
+        encoder = CompactFrameEncoder(8)
+        narrow = len(encoder.encode([255]*8))
+        wide = len(encoder.encode([256] + [0]*7))
+        assert narrow < wide
+        # 8 values as "/m" would be 8 (address) + 12 (tags) + 32 bytes
+        assert narrow == 4 + 4 + 4 + 16
+
+    def test_seqWraps(self):
+        from pythonosc.osc_message import OscMessage
+
+        from modules.CompactFrame import (CompactFrameEncoder,
+                                          decodeCompactFrame)
+        encoder = CompactFrameEncoder(1)
+        encoder.seq = 0xFFFF
+        last = decodeCompactFrame(
+            OscMessage(bytes(encoder.encode([1]))).params[0])
+        first = decodeCompactFrame(
+            OscMessage(bytes(encoder.encode([1]))).params[0])
+        assert (last.seq, first.seq) == (0xFFFF, 0)
+
+    def test_clipsValues(self):
+        from pythonosc.osc_message import OscMessage
+
+        from modules.CompactFrame import (CompactFrameEncoder,
+                                          decodeCompactFrame)
+        packet = CompactFrameEncoder(2).encode([-5, 70000])
+        frame = decodeCompactFrame(OscMessage(bytes(packet)).params[0])
+        assert frame.values == [0, 65535]
+
+    @pytest.mark.parametrize("payload", [b"", b"\x02\x00\x00\x00\x00",
+                                         b"\x01\x00\x00\x00\x03\x01\x02",
+                                         b"\x01\x01\x00\x00\x01\x01"])
+    def test_invalid(self, payload):
+        from modules.CompactFrame import decodeCompactFrame
+        with pytest.raises(ValueError):
+            decodeCompactFrame(payload)
+
+    def test_tooManyChannels(self):
+        from modules.CompactFrame import CompactFrameEncoder
+        with pytest.raises(ValueError):
+            CompactFrameEncoder(256)
@@ -0,0 +1,108 @@
+import socket
+import time
+
+import pytest
+
+
+@pytest.fixture()
+def server():
+    """A socket standing in for the server's receive port"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 38872))
+    sock.settimeout(2)
+    yield sock
+    sock.close()
+
+
+class TestDeviceEmulator:
+    def test_discovery(self, server):
+        """Test that discovery is answered to the sender port + 1"""
+        from pythonosc.osc_message import OscMessage
+        from pythonosc.osc_message_builder import OscMessageBuilder
+
+        from modules.DeviceEmulator import DeviceEmulator
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sender.bind(("127.0.0.1", server.getsockname()[1] - 1))
+        with DeviceEmulator(3, numMotors=2, host="127.0.0.1",
+                            basePort=38800) as emulator:
+            device = emulator.devices[1]
+            sender.sendto(OscMessageBuilder("/patpatpat/discover").build()
+                          .dgram, device.address)
+            reply = OscMessage(server.recv(1024))
+            heartbeat = OscMessage(server.recv(1024))
+        sender.close()
+        assert reply.address == "/patpatpat/noticeme/senpai"
+        assert reply.params == [device.mac, device.hostname, 2,
+                                device.features]
+        assert heartbeat.address == "/patpatpat/heartbeat"
+        assert heartbeat.params[0] == device.mac
+
+    def test_frameStats(self, server, waitFor):
+        """Test that frames are recorded and lost compact frames found"""
+        from modules.CompactFrame import CompactFrameEncoder
+        from modules.OscEncoder import OscIntArrayEncoder
+        from modules.DeviceEmulator import DeviceEmulator
+        with DeviceEmulator(2, numMotors=3, host="127.0.0.1", basePort=38810,
+                            announceTo=server.getsockname(),
+                            keepValues=True) as emulator:
+            osc, compact = emulator.devices
+            encoder = OscIntArrayEncoder("/m", 3)
+            compactEncoder = CompactFrameEncoder(3)
+            for i in range(20):
+                server.sendto(encoder.encode([i, 0, 255]), osc.address)
+                packet = compactEncoder.encode([i, 1, 2])
+                # drop every 5th compact frame
+                if i % 5 != 4:
+                    server.sendto(packet, compact.address)
+                time.sleep(0.002)
+            assert waitFor(lambda: len(osc.receiveTimes) == 20
+                           and len(compact.receiveTimes) == 16)
+            oscStats, compactStats = emulator.stats()
+        assert osc.values[-1] == [19, 0, 255] and osc.pwm == [19, 0, 255]
+        assert oscStats.frames == 20 and oscStats.fps > 0
+        assert oscStats.lost == 0
+        # the last frame was dropped, so only 3 gaps can be seen
+        assert compactStats.frames == 16 and compactStats.lost == 3
+        assert compactStats.reordered == 0
+
+    def test_manyDevices(self):
+        from modules.DeviceEmulator import DeviceEmulator
+        with DeviceEmulator(64, host="127.0.0.1", basePort=38900) as emulator:
+            ports = {device.address for device in emulator.devices}
+        assert len(ports) == 64
+
+    def test_frameLoss(self, server, waitFor):
+        """Test that sequenced frames are counted like the firmware does"""
+        from pythonosc.osc_message import OscMessage
+
+        from modules.DeviceEmulator import DeviceEmulator
+        from modules.FrameSequence import SequencedFrameEncoder
+        with DeviceEmulator(1, numMotors=2, host="127.0.0.1", basePort=38830,
+                            announceTo=server.getsockname(),
+                            heartbeatInterval=0.2) as emulator:
+            device = emulator.devices[0]
+            encoder = SequencedFrameEncoder(2)
+            packets = [bytes(encoder.encode([i, i])) for i in range(10)]
+            # frame 3 is lost, 6 and 5 swap places
+            for i in (0, 1, 2, 4, 6, 5, 7, 8, 9):
+                server.sendto(packets[i], device.address)
+                time.sleep(0.002)
+            assert waitFor(lambda: len(device.receiveTimes) == 9)
+            # the outdated frame 5 was not applied
+            assert device.pwm == [9, 9]
+            while (msg := OscMessage(server.recv(1024))).address \
+                    != "/patpatpat/heartbeat" or msg.params[4] != 9:
+                pass
+        # the gap of 5 is counted as well, it arrived too late
+        assert msg.params[4:] == [9, 2, 1]
+
+    def test_sequenceRestart(self):
+        """Test that a restarted sequence is followed, not dropped"""
+        from modules.DeviceEmulator import VirtualDevice
+        device = VirtualDevice("FF:FF:FF:00:00:00", "ppp-000000", 1, 3,
+                               ("127.0.0.1", 0))
+        for seq in range(500, 600):
+            assert device.acceptSeq(seq)
+        assert not device.acceptSeq(590)
+        assert device.acceptSeq(0) and device.acceptSeq(1)
+        assert device.framesLost == 0 and device.framesReordered == 1
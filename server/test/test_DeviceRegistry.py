@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def fakeDevice(id, mac, address):
+    return SimpleNamespace(id=id, wifiMac=mac, address=address)
+
+
+class TestDeviceRegistry:
+    @pytest.fixture()
+    def registry(self):
+        from modules.DeviceRegistry import DeviceRegistry
+        registry = DeviceRegistry()
+        for i in range(3):
+            registry.add(fakeDevice(i, f"AA:AA:AA:AA:AA:0{i}", f"10.0.0.{i}"))
+        yield registry
+
+    def test_lookup(self, registry):
+        device = registry.byMac("AA:AA:AA:AA:AA:01")
+        assert device is registry.byAddress("10.0.0.1") is registry.byId(1)
+        assert registry.byMac("BB:BB:BB:BB:BB:BB") is None
+        assert len(registry.devices) == 3
+
+    def test_replace(self, registry):
+        """Test that replacing a device drops it's old keys"""
+        old = registry.byId(1)
+        new = fakeDevice(1, "CC:CC:CC:CC:CC:CC", "10.0.0.9")
+        assert registry.add(new) is old
+        assert registry.byMac("AA:AA:AA:AA:AA:01") is None
+        assert registry.byAddress("10.0.0.1") is None
+        assert registry.byMac("CC:CC:CC:CC:CC:CC") is new
+
+    def test_reindex(self, registry):
+        device = registry.byId(2)
+        device.address = "10.0.0.20"
+        registry.reindex(device)
+        assert registry.byAddress("10.0.0.2") is None
+        assert registry.byAddress("10.0.0.20") is device
+
+    def test_remove(self, registry):
+        device = registry.remove(0)
+        assert device.id == 0 and registry.byMac(device.wifiMac) is None
+        assert registry.remove(0) is None
+        assert list(registry.devices) == [1, 2]
+
+    def test_placeholderMac(self, registry):
+        """Test that devices without a real mac don't replace each other"""
+        from modules.DeviceRegistry import PLACEHOLDER_MAC
+        for i in (3, 4):
+            registry.add(fakeDevice(i, PLACEHOLDER_MAC, f"10.0.0.{i}"))
+        registry.add(fakeDevice(5, "", ""))
+        assert registry.byMac(PLACEHOLDER_MAC) is None
+        assert registry.byMac("") is None
+        assert registry.byAddress("10.0.0.3").id == 3
+        assert len(registry.devices) == 6
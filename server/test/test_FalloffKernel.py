@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+
+class TestFalloffKernel:
+    @pytest.fixture()
+    def distances(self):
+        return np.array([0.0, 0.05, 0.5, 1.0, 1.5])
+
+    def test_linearMatchesOldBehaviour(self, distances):
+        """Test that the default kernel keeps the old deadband"""
+        from modules.FalloffKernel import compileFalloffKernel
+        kernel = compileFalloffKernel({})
+        assert kernel(distances) == pytest.approx([0.9, 0.9, 0.5, 0, 0])
+
+    @pytest.mark.parametrize("name", ["Linear", "Smoothstep", "Gaussian",
+                                      "Inverse Square", "Custom Table"])
+    def test_kernelsAreBounded(self, name, distances):
+        """Test that every kernel is 0-1, falling and 0 out of range"""
+        from modules.FalloffKernel import compileFalloffKernel
+        kernel = compileFalloffKernel({
+            "MLAT_falloffKernel": name,
+            "MLAT_falloffTable": [[0, 1], [0.5, 0.2], [1, 0]]})
+        values = kernel(distances)
+        assert ((values >= 0) & (values <= 1)).all()
+        assert (np.diff(values) <= 0).all()
+        assert values[-1] == 0
+
+    def test_unknownKernelFallsBack(self, distances):
+        """Test that an unknown kernel name uses the linear kernel"""
+        from modules.FalloffKernel import compileFalloffKernel
+        kernel = compileFalloffKernel({"MLAT_falloffKernel": "nope"})
+        assert kernel(distances)[2] == pytest.approx(0.5)
+
+    @pytest.mark.parametrize("table", [None, [], [[0.5]], [[0, 1], [1]],
+                                       [[0, 1], [0, 0.5], [1, 0]],
+                                       [[1, 0], [0, 1]], "table"])
+    def test_invalidTableFallsBack(self, table, distances):
+        """Test that a malformed custom table uses the linear kernel"""
+        from modules.FalloffKernel import compileFalloffKernel
+        kernel = compileFalloffKernel({"MLAT_falloffKernel": "Custom Table",
+                                       "MLAT_falloffTable": table})
+        assert kernel(distances) == pytest.approx([0.9, 0.9, 0.5, 0, 0])
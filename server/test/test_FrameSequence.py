@@ -0,0 +1,46 @@
+import pytest
+
+
+class TestFrameSequence:
+    def test_encoder(self):
+        from pythonosc.osc_message import OscMessage
+
+        from modules.FrameSequence import SequencedFrameEncoder
+        encoder = SequencedFrameEncoder(3)
+        encoder.seq = 0xFFFF
+        first = OscMessage(bytes(encoder.encode([1, 2, 3])))
+        second = OscMessage(bytes(encoder.encode([4, 5, 6])))
+        assert first.address == "/ms" and first.params == [0xFFFF, 1, 2, 3]
+        assert second.params == [0, 4, 5, 6]
+
+    def test_tracker(self):
+        """Test rates from heartbeat counters, across a seq wrap and a
+        device restart"""
+        from modules.FrameSequence import FrameLossTracker
+        tracker = FrameLossTracker()
+        assert not tracker.stats().reported
+        tracker.update(-1, 0, 0)
+        assert not tracker.stats().reported
+        tracker.update(0xFF00, 0, 0)
+        tracker.update(0x0000, 4, 1)
+        stats = tracker.stats()
+        assert stats.reported and stats.frames == 256
+        assert stats.lossRate == pytest.approx(4/256)
+        assert stats.recentReorderRate == pytest.approx(1/256)
+        # after a restart the counters start over
+        tracker.update(100, 0, 0)
+        tracker.update(200, 10, 0)
+        stats = tracker.stats()
+        assert stats.frames == 356 and stats.lost == 14
+
+    def test_trackerSequenceRestart(self):
+        """Test that the server restarting the sequence isn't counted as
+        a wrap around"""
+        from modules.FrameSequence import FrameLossTracker
+        tracker = FrameLossTracker()
+        tracker.update(5000, 0, 0)
+        tracker.update(5160, 2, 0)
+        tracker.update(120, 2, 0)
+        tracker.update(280, 3, 0)
+        stats = tracker.stats()
+        assert stats.frames == 320 and stats.lost == 3
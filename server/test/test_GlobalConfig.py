@@ -0,0 +1,48 @@
+import pytest
+
+CONFIG = {
+    "configVersion": 1,
+    "program": {},
+    "esps": {},
+    "groups": {}
+}
+
+
+@pytest.fixture()
+def config(loadConfig):
+    config, handler = loadConfig(CONFIG)
+    changed = []
+    config.configPathHasChanged.connect(changed.append)
+    yield config, handler, changed
+    config.configPathHasChanged.disconnect(changed.append)
+
+
+class TestGlobalConfig:
+    def test_transaction(self, config):
+        """Test that a transaction writes once and signals afterwards"""
+        config, handler, changed = config
+        with config.transaction():
+            config.set("esps.esp0", {"id": 0}, True)
+            with config.transaction():
+                config.set("esps.esp1", {"id": 1}, True)
+            config.set("esps.esp0.id", 0, True)
+            config.set("esps.esp0.name", "a", True)
+            config.set("esps.esp0.name", "b", True)
+            assert config.get("esps.esp1.id") == 1
+            assert handler.read()["esps"] == {} and changed == []
+        assert handler.read()["esps"] == {"esp0": {"id": 0, "name": "b"},
+                                          "esp1": {"id": 1}}
+        assert changed == ["esps.esp0", "esps.esp1", "esps.esp0.id",
+                           "esps.esp0.name"]
+
+    def test_rollback(self, config):
+        config, handler, changed = config
+        with pytest.raises(ValueError):
+            with config.transaction():
+                config.set("esps.esp0", {"id": 0}, True)
+                raise ValueError
+        assert config.get("esps") == {} and handler.read()["esps"] == {}
+        assert changed == []
+        # a failed transaction doesn't leave one open
+        assert config.set("esps.esp0", {"id": 0}, True)
+        assert changed == ["esps.esp0"]
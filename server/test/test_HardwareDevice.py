@@ -0,0 +1,192 @@
+import pytest
+
+CONFIG = {
+    "configVersion": 1,
+    "program": {},
+    "esps": {
+        "esp0": {
+            "id": 0,
+            "name": "Test",
+            "connectionType": "OSC",
+            "lastIp": "127.0.0.1",
+            "wifiMac": "FF:FF:FF:AA:AA:AA",
+            "serialPort": "",
+            "numMotors": 3
+        }
+    },
+    "groups": {}
+}
+
+
+@pytest.fixture()
+def device(loadConfig):
+    loadConfig(CONFIG)
+
+    from modules.HardwareDevice import HardwareDevice
+    device = HardwareDevice("esp0")
+    device.currentConnectionState = True
+    yield device
+    device.close()
+
+
+class TestHardwareDevice:
+    def test_applyFrame(self, device):
+        """Test that only driven channels are taken from a frame"""
+        import numpy as np
+        requests = []
+        device.outputRequested.connect(lambda: requests.append(True))
+        device.setAndSendPinValues(2, 99)
+        # manual values are sent by the output thread
+        assert requests and device.hasPending and device.packetsSent == 0
+        device.applyFrame(np.array([10, 20, 30], np.int32),
+                          np.array([True, True, False]))
+        assert device.pinStates.tolist() == [10, 20, 99]
+
+    def test_deltaSend(self, device):
+        """Test that unchanged pin values are suppressed until the
+        keepalive is due"""
+        from pythonosc.osc_message import OscMessage
+        device.pinStates[0] = 5
+        packet = device.encodePinValues(60.0)
+        assert OscMessage(bytes(packet)).params == [5, 0, 0]
+        device.sendEncoded(packet)
+
+        assert device.encodePinValues(60.0) is None
+        assert device.packetsSuppressed == 1
+        assert device.encodePinValues(0.0) is not None
+        assert device.encodePinValues() is not None
+
+        device.pinStates[1] = 7
+        assert device.encodePinValues(60.0) is not None
+        assert device.packetsSent == 1
+
+    def test_notConnected(self, device):
+        device.currentConnectionState = False
+        device.setAndSendPinValues(0, 1)
+        assert device.encodePinValues(None, True) is None
+        assert not device.hasPending
+
+    def test_retarget(self, device):
+        """Test that a new ip from a heartbeat only changes the target"""
+        from modules.GlobalConfig import GlobalConfigSingleton
+        from modules.OscMessageTypes import HeartbeatMessage
+        config = GlobalConfigSingleton.getInstance()
+        adapter = device.hardwareCommunicationAdapter
+        sock = adapter._socket
+        changed = []
+        config.configPathHasChanged.connect(changed.append)
+        device.processHeartbeat(HeartbeatMessage(
+            "FF:FF:FF:AA:AA:AA", 1, 3.3, 0, sourceAddr="127.0.0.9"))
+        config.configPathHasChanged.disconnect(changed.append)
+        assert adapter._socket is sock
+        assert adapter._target == ("127.0.0.9", 8888)
+        assert config.get("esps.esp0.lastIp") == "127.0.0.9"
+        # no change signal, so the device is not recreated
+        assert changed == []
+
+    def test_discoveryResponse(self, device):
+        """Test that a discovery over the own link learns the mac and
+        the features at once"""
+        from modules.GlobalConfig import GlobalConfigSingleton
+        from modules.OscMessageTypes import DiscoveryResponseMessage
+        config = GlobalConfigSingleton.getInstance()
+        device.processDiscoveryResponse(DiscoveryResponseMessage(
+            "AA:AA:AA:AA:AA:AA", "ppp-aaaaaa", 3, 3, sourceAddr="COM3"))
+        assert config.get("esps.esp0.wifiMac") == "AA:AA:AA:AA:AA:AA"
+        assert config.get("esps.esp0.features") == 3
+
+    def test_sharedSocket(self, device):
+        from modules.HardwareDevice import OscCommunicationAdapterImpl
+        other = OscCommunicationAdapterImpl()
+        other.setup({"name": "other", "lastIp": "127.0.0.2",
+                     "numMotors": 1})
+        assert other._socket is device.hardwareCommunicationAdapter._socket
+        other.close()
+        assert device.hardwareCommunicationAdapter._socket._users == 1
+
+    def test_rateLimit(self, device):
+        """Test that the max frame rate holds back and coalesces frames"""
+        from modules.GlobalConfig import GlobalConfigSingleton
+        from modules.HardwareDevice import HardwareDevice
+        GlobalConfigSingleton.getInstance().set("esps.esp0.maxFrameRate", 1)
+        limited = HardwareDevice("esp0")
+        limited.currentConnectionState = True
+        try:
+            limited.sendEncoded(limited.encodePinValues(None, True))
+            for value in (1, 2, 3):
+                limited.pinStates[0] = value
+                assert limited.encodePinValues(None, True) is None
+            assert limited.hasPending and limited.framesCoalesced == 2
+            # manual sends are not limited
+            assert limited.encodePinValues() is not None
+            # once due, the newest values are sent
+            limited._lastSendTime -= 1
+            assert limited.encodePinValues(None, True) is not None
+            assert not limited.hasPending
+        finally:
+            limited.close()
+
+    def test_adaptivePacing(self, device):
+        """Test that a weak signal limits the rate and sends changes only"""
+        from modules.OscMessageTypes import HeartbeatMessage
+        device.processHeartbeat(HeartbeatMessage(
+            "FF:FF:FF:AA:AA:AA", 1, 3.3, -85, sourceAddr="127.0.0.1"))
+        assert device.pacer.deltaOnly
+        device.sendEncoded(device.encodePinValues(None, True))
+        # unchanged values are suppressed even without a keepalive
+        assert device.encodePinValues(None, True) is None
+        device.pinStates[0] = 1
+        assert device.encodePinValues(None, True) is None
+        assert device.hasPending
+        assert device.nextSendTime() > device._lastSendTime
+
+    def test_circuitBreaker(self, device):
+        """Test that failing sends stop until a heartbeat arrives"""
+        from modules.CircuitBreaker import FAILURE_THRESHOLD
+        from modules.OscMessageTypes import HeartbeatMessage
+        # broadcasts are not allowed on the socket, so sending fails
+        device.hardwareCommunicationAdapter.retarget("255.255.255.255")
+        for _ in range(FAILURE_THRESHOLD):
+            device.sendEncoded(device.encodePinValues())
+        assert device.breaker.isOpen and device.packetsSent == 0
+        assert device.encodePinValues() is None
+        # the heartbeat also moves the target back to a valid address
+        device.processHeartbeat(HeartbeatMessage(
+            "FF:FF:FF:AA:AA:AA", 1, 3.3, 0, sourceAddr="127.0.0.9"))
+        assert not device.breaker.isOpen
+        device.sendEncoded(device.encodePinValues())
+        assert device.packetsSent == 1
+
+    def test_applyConfig(self, device):
+        """Test that config changes are applied in place"""
+        from pythonosc.osc_message import OscMessage
+
+        from modules.GlobalConfig import GlobalConfigSingleton
+        from modules.HardwareDevice import SlipSerialCommunicationAdapterImpl
+        config = GlobalConfigSingleton.getInstance()
+        adapter = device.hardwareCommunicationAdapter
+        sock = adapter._socket
+        device.pinStates[1] = 7
+        config.set("esps.esp0.lastIp", "127.0.0.9")
+        config.set("esps.esp0.numMotors", 4)
+        config.set("esps.esp0.features", 0x02)
+        assert device.applyConfig()
+        assert device.hardwareCommunicationAdapter is adapter
+        assert adapter._target == ("127.0.0.9", 8888)
+        assert device.currentConnectionState
+        msg = OscMessage(bytes(device.encodePinValues()))
+        assert msg.address == "/ms" and msg.params[1:] == [0, 7, 0, 0]
+
+        # only a new connection type replaces the adapter
+        packet = device.encodePinValues()
+        config.set("esps.esp0.connectionType", "SlipSerial")
+        assert device.applyConfig()
+        assert isinstance(device.hardwareCommunicationAdapter,
+                          SlipSerialCommunicationAdapterImpl)
+        assert adapter._socket is None and sock._users == 0
+        # a packet of the old adapter is dropped, not counted as failed
+        device.sendEncoded(packet)
+        assert device.packetsSent == 0 and device.breaker.failures == 0
+
+        config.set("esps.esp0.id", 5)
+        assert not device.applyConfig()
@@ -0,0 +1,175 @@
+import threading
+
+import numpy as np
+import pytest
+
+CONFIG = {
+    "configVersion": 1,
+    "program": {},
+    "esps": {
+        "esp0": {
+            "id": 0,
+            "name": "Test0",
+            "connectionType": "OSC",
+            "lastIp": "127.0.0.1",
+            "wifiMac": "FF:FF:FF:AA:AA:AA",
+            "serialPort": "",
+            "numMotors": 3
+        },
+        "esp1": {
+            "id": 1,
+            "name": "Test1",
+            "connectionType": "OSC",
+            "lastIp": "127.0.0.1",
+            "wifiMac": "FF:FF:FF:BB:BB:BB",
+            "serialPort": "",
+            "numMotors": 2,
+            "maxFrameRate": 10
+        }
+    },
+    "groups": {}
+}
+
+
+def buildFrame(pwm: list[int]):
+    from modules.OutputFrame import OutputFrame, OutputLayout
+    layout = OutputLayout.fromDevices({0: 3, 1: 2})
+    return OutputFrame.build(0, 0.0, layout, np.array(pwm, np.int32),
+                             np.ones(len(pwm), bool))
+
+
+def params(packet) -> list[int]:
+    from pythonosc.osc_message import OscMessage
+    return OscMessage(bytes(packet)).params
+
+
+@pytest.fixture()
+def devices(loadConfig):
+    loadConfig(CONFIG)
+
+    from modules.HardwareDevice import HardwareDevice
+    devices = {i: HardwareDevice(f"esp{i}") for i in range(2)}
+    for device in devices.values():
+        device.currentConnectionState = True
+    yield devices
+    for device in devices.values():
+        device.close()
+
+
+@pytest.fixture()
+def worker(devices):
+    from modules.HwManager import HwOutputWorker
+    from modules.OutputFrame import FrameMailbox
+    worker = HwOutputWorker(FrameMailbox(), devices)
+    worker.setKeepalive(0)
+    return worker
+
+
+class TestHwOutputWorker:
+    def test_encodeThenSend(self, worker, devices):
+        """Test that all packets are encoded before the first send"""
+        worker._encode(buildFrame([1, 2, 3, 4, 5]))
+        assert [(device.id, params(packet))
+                for device, packet in worker._packets] == \
+            [(0, [1, 2, 3]), (1, [4, 5])]
+        assert all(device.packetsSent == 0 for device in devices.values())
+        worker._send()
+        assert all(device.packetsSent == 1 for device in devices.values())
+
+    def test_sendPolicy(self, worker):
+        """Test that burst sends at once and spread spaces the sends over
+        half a tick"""
+        from utils.Enums import OutputSendPolicy
+        # 50ms spread window, 25ms between the two devices
+        worker.setPolicy(OutputSendPolicy.SPREAD, 10)
+        worker._encode(buildFrame([1, 2, 3, 4, 5]))
+        worker._send()
+        assert worker.lastSendSpanNs >= 25e6
+
+        worker.setPolicy(OutputSendPolicy.BURST, 10)
+        worker._encode(buildFrame([1, 2, 3, 4, 5]))
+        worker._send()
+        assert worker.lastSendSpanNs < 25e6
+
+    def test_keepalive(self, worker, devices):
+        """Test that unchanged devices are skipped until the keepalive"""
+        worker.setKeepalive(500)
+        worker._encode(buildFrame([1, 2, 3, 4, 5]))
+        worker._send()
+        worker._encode(buildFrame([1, 2, 3, 4, 5]))
+        assert worker._packets == []
+        assert devices[0].packetsSuppressed == 1
+
+        devices[1]._lastSendTime -= 1
+        worker._encode(buildFrame([9, 2, 3, 4, 6]))
+        assert [device.id for device, _ in worker._packets] == [0, 1]
+
+        # without a keepalive every frame goes to every device
+        worker._send()
+        worker.setKeepalive(0)
+        devices[1]._lastSendTime -= 1
+        worker._encode(buildFrame([9, 2, 3, 4, 6]))
+        assert len(worker._packets) == 2
+
+    def test_heldBack(self, worker, devices):
+        """Test that rate limited values are sent once the device is due"""
+        worker._encode(buildFrame([1, 2, 3, 4, 5]))
+        worker._send()
+        assert worker._pendingTimeout() == 0.5
+
+        worker._encode(buildFrame([1, 2, 3, 4, 6]))
+        assert [device.id for device, _ in worker._packets] == [0]
+        worker._send()
+        assert devices[1].hasPending
+        assert 0.0 < worker._pendingTimeout() <= 0.1
+
+        # due now, only the held back device is sent
+        devices[1]._lastSendTime -= 1
+        assert worker._pendingTimeout() == 0.0
+        worker._encodePending()
+        assert [(device.id, params(packet))
+                for device, packet in worker._packets] == [(1, [4, 6])]
+        worker._send()
+        assert not devices[1].hasPending
+        assert worker._pendingTimeout() == 0.5
+
+    def test_manualSend(self, worker, devices):
+        """Test that a manual value is encoded by the output thread"""
+        devices[0].setAndSendPinValues(1, 7)
+        assert devices[0].hasPending and devices[0].packetsSent == 0
+        assert worker._pendingTimeout() == 0.0
+        worker._encodePending()
+        assert [(device.id, params(packet))
+                for device, packet in worker._packets] == [(0, [0, 7, 0])]
+
+    def test_disconnected(self, worker, devices):
+        """Test that values for a disconnected device don't keep the
+        thread awake"""
+        devices[0].currentConnectionState = False
+        devices[0].setAndSendPinValues(1, 7)
+        worker._encodePending()
+        assert worker._packets == []
+        assert not devices[0].hasPending
+        assert worker._pendingTimeout() == 0.5
+
+    def test_startOutput(self, worker, devices, waitFor):
+        """Test that the thread sends frames and wakes up for manual
+        values"""
+        mailbox = worker._mailbox
+        for device in devices.values():
+            device.outputRequested.connect(mailbox.wakeUp)
+        thread = threading.Thread(target=worker.startOutput)
+        thread.start()
+        try:
+            mailbox.publish(buildFrame([1, 2, 3, 4, 5]))
+            assert waitFor(lambda: all(
+                device.packetsSent == 1 for device in devices.values()))
+
+            devices[0].resetAllPinStates()
+            assert waitFor(lambda: devices[0].packetsSent == 2)
+            assert devices[0].pinStates.tolist() == [0, 0, 0]
+            assert devices[1].packetsSent == 1
+        finally:
+            worker.stop()
+            thread.join(1)
+        assert not thread.is_alive()
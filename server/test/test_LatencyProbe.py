@@ -0,0 +1,82 @@
+import socket
+
+import pytest
+
+
+@pytest.fixture()
+def server():
+    """A socket standing in for the server's receive port"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 38873))
+    sock.settimeout(2)
+    yield sock
+    sock.close()
+
+
+class TestLatencyProbe:
+    def test_offset(self):
+        """Test rtt and clock offset of a known exchange"""
+        from pythonosc.osc_message import OscMessage
+
+        from modules.LatencyProbe import LatencyProbe
+        from modules.OscMessageTypes import PongMessage
+
+        def int32(value):
+            value &= 0xFFFFFFFF
+            return value - 0x100000000 if value >= 0x80000000 else value
+
+        probe = LatencyProbe()
+        probeId = OscMessage(probe.ping()).params[0]
+        sendTime = probe._pending[probeId]
+        # 10ms round trip, 2ms of it spent in the device. The device
+        # clock wraps while answering.
+        rxTime = 0xFFFFFFFF - 500
+        rtt = probe.processPong(PongMessage(
+            "mac", probeId, int32(rxTime), int32(rxTime + 2000),
+            receivedNs=sendTime + 10_000_000))
+        assert rtt == pytest.approx(8.0)
+        stats = probe.stats()
+        # the ping took 4ms to arrive
+        offsetUs = rxTime - (sendTime/1000 + 4000)
+        assert stats.offsetMs == pytest.approx(offsetUs/1000)
+        assert stats.offsetErrorMs == pytest.approx(4.0)
+        assert stats.histogram[3] == 1 and sum(stats.histogram) == 1
+
+    def test_lost(self):
+        from modules.LatencyProbe import PROBE_TIMEOUT, LatencyProbe
+        probe = LatencyProbe()
+        probe.ping()
+        for probeId in probe._pending:
+            probe._pending[probeId] -= int(PROBE_TIMEOUT*1e9) + 1
+        stats = probe.stats()
+        assert stats.sent == 1 and stats.lost == 1 and stats.received == 0
+
+    def test_emulator(self, server):
+        """Test a probe against emulated devices, one of them slow"""
+        from pythonosc.osc_message import OscMessage
+
+        from modules.DeviceEmulator import DeviceEmulator
+        from modules.LatencyProbe import LatencyProbe
+        from modules.OscMessageTypes import PongMessage
+        with DeviceEmulator(2, host="127.0.0.1", basePort=38820,
+                            announceTo=server.getsockname()) as emulator:
+            # the discovery replies and first heartbeats
+            for _ in range(4):
+                server.recv(1024)
+            emulator.devices[1].replyDelay = 0.05
+            rtts = []
+            for device in emulator.devices:
+                probe = LatencyProbe()
+                for _ in range(3):
+                    server.sendto(probe.ping(), device.address)
+                    while (msg := OscMessage(server.recv(1024))).address \
+                            != "/patpatpat/pong":
+                        pass
+                    assert msg.params[0] == device.mac
+                    rtt = probe.processPong(PongMessage(*msg.params))
+                    assert rtt is not None
+                rtts.append(probe.stats())
+        fast, slow = rtts
+        assert fast.received == 3 and fast.lost == 0
+        assert fast.p50Ms < 50 <= slow.minMs
+        assert fast.offsetMs is not None
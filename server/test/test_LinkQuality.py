@@ -0,0 +1,37 @@
+class TestLinkQuality:
+    def test_degradeAndRecover(self):
+        """Test that a bad link is limited at once and recovers slowly"""
+        from modules.FrameSequence import FrameLossStats
+        from modules.LatencyProbe import LatencyStats
+        from modules.LinkQuality import (POOR_MAX_FRAME_RATE,
+                                         RECOVER_HEARTBEATS, AdaptivePacer)
+        from utils.Enums import LinkQuality
+        pacer = AdaptivePacer()
+        noLoss = FrameLossStats(reported=True)
+        fast = LatencyStats(received=1, recentMs=2.0)
+        assert not pacer.update(-50, noLoss, fast)
+        assert pacer.minFrameInterval == 0 and not pacer.deltaOnly
+
+        # lots of loss on a good signal is still a poor link
+        assert pacer.update(-50, FrameLossStats(reported=True,
+                                                recentLossRate=0.2), fast)
+        assert pacer.quality == LinkQuality.POOR and pacer.deltaOnly
+        assert pacer.minFrameInterval == 1/POOR_MAX_FRAME_RATE
+
+        # one level per RECOVER_HEARTBEATS good ratings
+        for _ in range(RECOVER_HEARTBEATS - 1):
+            assert not pacer.update(-50, noLoss, fast)
+        assert pacer.update(-50, noLoss, fast)
+        assert pacer.quality == LinkQuality.FAIR
+        # a fair rating in between starts the count over
+        pacer.update(-50, noLoss, LatencyStats(received=1, recentMs=50.0))
+        for _ in range(RECOVER_HEARTBEATS - 1):
+            pacer.update(-50, noLoss, fast)
+        assert pacer.quality == LinkQuality.FAIR
+        pacer.update(-50, noLoss, fast)
+        assert pacer.quality == LinkQuality.GOOD
+
+        pacer.update(-75, noLoss, fast)
+        assert pacer.quality == LinkQuality.FAIR
+        pacer.enabled = False
+        assert pacer.quality == LinkQuality.GOOD and not pacer.deltaOnly
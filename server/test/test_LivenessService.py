@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture()
+def service(app):
+    from modules.LivenessService import LivenessService
+    service = LivenessService()
+    yield service
+    service.close()
+
+
+class TestLivenessService:
+    def test_edges(self, service, waitFor):
+        """Test that refreshes only emit the first edge and the dead
+        edge comes once the timeout passed without one"""
+        handle = service.register("test", 0.3)
+        edges = []
+        handle.stateChanged.connect(edges.append)
+        start = time.monotonic()
+        for _ in range(20):
+            handle.refresh()
+        assert edges == [True] and handle.alive
+
+        # refreshing keeps it alive past the first deadline
+        while time.monotonic() - start < 0.5:
+            handle.refresh()
+            lastRefresh = time.monotonic()
+            time.sleep(0.02)
+        waitFor(lambda: False, 0.05)
+        assert edges == [True]
+
+        assert waitFor(lambda: len(edges) == 2)
+        assert edges == [True, False] and not handle.alive
+        assert time.monotonic() - lastRefresh >= 0.3
+
+        handle.refresh()
+        assert edges == [True, False, True]
+
+    def test_staggeredStops(self, service, waitFor):
+        """Test that handles going silent within one wheel resolution
+        of a wakeup still expire on time"""
+        from modules.LivenessService import WHEEL_RESOLUTION
+        handles = [service.register(str(i), 0.3) for i in range(40)]
+        start = time.monotonic()
+        # a new handle stops every 10ms, several per wheel slot
+        stops = [start + 0.3 + i*0.01 for i in range(len(handles))]
+        lastRefresh = [0.0]*len(handles)
+        while time.monotonic() < stops[-1]:
+            for i, handle in enumerate(handles):
+                if time.monotonic() < stops[i]:
+                    handle.refresh()
+                    lastRefresh[i] = time.monotonic()
+            time.sleep(0.002)
+
+        dead = [None]*len(handles)
+
+        def allDead():
+            for i, handle in enumerate(handles):
+                if dead[i] is None and not handle.alive:
+                    dead[i] = time.monotonic()
+            return None not in dead
+        assert waitFor(allDead)
+        lateness = max(d - r - 0.3 for d, r in zip(dead, lastRefresh))
+        assert lateness < 3*WHEEL_RESOLUTION
+
+    def test_idle(self, service, waitFor):
+        """Test that the wheel doesn't wake up per refresh or while idle"""
+        handles = [service.register(str(i), 0.2) for i in range(50)]
+        stop = time.monotonic() + 0.5
+
+        def feed():
+            while time.monotonic() < stop:
+                for handle in handles:
+                    handle.refresh()
+
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+        feeder.join()
+        assert all(handle.alive for handle in handles)
+        assert waitFor(lambda: not any(handle.alive for handle in handles))
+        wakeups = service.wakeups
+        # about one wakeup per timeout instead of one per refresh
+        assert wakeups < 20
+        time.sleep(0.3)
+        assert service.wakeups == wakeups
+
+    def test_close(self, service, waitFor):
+        handle = service.register("test", 0.1)
+        edges = []
+        handle.stateChanged.connect(edges.append)
+        handle.refresh()
+        handle.close()
+        waitFor(lambda: False, 0.3)
+        assert edges == [True] and service._count == 0
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+
+class TestMotorEnvelope:
+    def test_init(self):
+        """Test that the module imports and can be created"""
+        from modules.MotorEnvelope import MotorEnvelope
+        MotorEnvelope([255, 1023])
+
+    def test_instantByDefault(self):
+        """Test that targets are followed directly without attack"""
+        from modules.MotorEnvelope import MotorEnvelope
+        env = MotorEnvelope([255, 255], releaseMs=0)
+        assert list(env.process(np.array([100, 200]), 0.025)) == [100, 200]
+        assert list(env.process(np.array([50, 0]), 0.025)) == [50, 0]
+
+    @pytest.mark.parametrize("tps", [20, 40, 100])
+    def test_releaseIndependentOfTps(self, tps):
+        """Test that a stale fade takes the same time at any tick rate"""
+        from modules.MotorEnvelope import MotorEnvelope
+        env = MotorEnvelope([255], holdMs=100, releaseMs=500)
+        env.process(np.array([255]), 1/tps)
+        zero = np.zeros(1)
+        elapsed = 0.0
+        while env.process(zero, 1/tps, False)[0] > 0:
+            elapsed += 1/tps
+        assert elapsed == pytest.approx(0.6, abs=1.5/tps)
+
+    def test_attack(self):
+        """Test that rising values are limited by the attack time"""
+        from modules.MotorEnvelope import MotorEnvelope
+        env = MotorEnvelope([1000], attackMs=100)
+        assert env.process(np.array([1000]), 0.05)[0] == 500
+        assert env.process(np.array([1000]), 0.05)[0] == 1000
+        assert env.process(np.array([200]), 0.05)[0] == 200
+
+    def test_freshZeroStops(self):
+        """Test that a fresh 0 stops the motor once the hold time is over
+        and only stale data fades out"""
+        from modules.MotorEnvelope import MotorEnvelope
+        fresh = MotorEnvelope([255], holdMs=50)
+        stale = MotorEnvelope([255], holdMs=50)
+        zero = np.zeros(1)
+        for env in (fresh, stale):
+            env.process(np.array([200]), 0.025)
+        for _ in range(2):
+            assert fresh.process(zero, 0.025, True)[0] == 200
+            assert stale.process(zero, 0.025, False)[0] == 200
+        assert fresh.process(zero, 0.025, True)[0] == 0
+        assert stale.process(zero, 0.025, False)[0] == 194
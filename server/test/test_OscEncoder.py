@@ -0,0 +1,37 @@
+import pytest
+
+
+class TestOscIntArrayEncoder:
+    @pytest.mark.parametrize("values", [[], [0], [1, 2, 3], [0, 70, 255, 1023],
+                                        [-1, 2**31 - 1, 5, 6, 7, 8, 9, 10]])
+    def test_matchesPythonosc(self, values):
+        """Test that the output is identical to pythonosc's builder"""
+        from pythonosc.osc_message_builder import OscMessageBuilder
+
+        from modules.OscEncoder import OscIntArrayEncoder
+        builder = OscMessageBuilder("/m")
+        for value in values:
+            builder.add_arg(value)
+        encoder = OscIntArrayEncoder("/m", len(values))
+        assert bytes(encoder.encode(values)) == builder.build().dgram
+
+    def test_reusesBuffer(self):
+        """Test that encoding patches the same buffer in place"""
+        from array import array
+
+        import numpy as np
+        from pythonosc.osc_message import OscMessage
+
+        from modules.OscEncoder import OscIntArrayEncoder
+        encoder = OscIntArrayEncoder("/m", 3)
+        pins = array("i", [1, 2, 3])
+        first = encoder.encode(np.frombuffer(pins, dtype=np.int32))
+        pins[1] = 200
+        second = encoder.encode(np.frombuffer(pins, dtype=np.int32))
+        assert first is second
+        assert OscMessage(bytes(second)).params == [1, 200, 3]
+
+    def test_wrongCount(self):
+        from modules.OscEncoder import OscIntArrayEncoder
+        with pytest.raises(ValueError):
+            OscIntArrayEncoder("/m", 2).encode([1, 2, 3])
@@ -85,3 +85,24 @@ class TestOscMessageTypes:
         """Test if object is mutable"""
         with pytest.raises(FrozenInstanceError):
             m.numMotors = 123
+
+    def test_DiscoveryResponseMessageFeatures(self):
+        """Test the optional feature flags of newer firmware"""
+        from modules.OscMessageTypes import DiscoveryResponseMessage
+        params = ("AA:AA:AA:AA:AA:AA", "hostname", 1, 1)
+        assert DiscoveryResponseMessage.isType(
+            "/patpatpat/noticeme/senpai", params)
+        m = DiscoveryResponseMessage(*params, sourceType="osc",
+                                     sourceAddr="10.10.10.10")
+        assert m.features == 1 and m.sourceType == "osc"
+        assert DiscoveryResponseMessage(*params[:3]).features == 0
+
+    def test_HeartbeatMessageFrameLoss(self):
+        """Test the optional frame loss counters of newer firmware"""
+        from modules.OscMessageTypes import HeartbeatMessage
+        params = ("AA:AA:AA:AA:AA:AA", 1, 3.3, -50, 10, 2, 1)
+        assert HeartbeatMessage.isType("/patpatpat/heartbeat", params)
+        m = HeartbeatMessage(*params, sourceAddr="10.10.10.10")
+        assert m.lastSeq == 10 and m.framesLost == 2 \
+            and m.framesReordered == 1 and m.sourceAddr == "10.10.10.10"
+        assert HeartbeatMessage(*params[:4]).lastSeq == -1
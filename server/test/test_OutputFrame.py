@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+
+class TestOutputLayout:
+    def test_fromDevices(self):
+        """Test that devices are laid out sorted by id"""
+        from modules.OutputFrame import OutputLayout
+        layout = OutputLayout.fromDevices({3: 2, 0: 4})
+        assert layout.size == 6
+        assert layout.index(0, 3) == 3
+        assert layout.index(3, 1) == 5
+        assert layout.index(3, 2) == -1
+        assert layout.index(1, 0) == -1
+        assert layout.slice(3) == slice(4, 6)
+        assert layout.slice(1) == slice(0, 0)
+
+
+class TestOutputFrame:
+    def test_build(self):
+        """Test that frames are read-only and split per device"""
+        import numpy as np
+
+        from modules.OutputFrame import OutputFrame, OutputLayout
+        layout = OutputLayout.fromDevices({0: 2, 1: 3})
+        frame = OutputFrame.build(
+            1, 0.0, layout, np.arange(5, dtype=np.int32),
+            np.array([True, False, True, True, False]))
+        pwm, driven = frame.device(1)
+        assert pwm.tolist() == [2, 3, 4]
+        assert driven.tolist() == [True, True, False]
+        with pytest.raises(ValueError):
+            frame.pwm[0] = 1
+
+
+class TestFrameMailbox:
+    @pytest.fixture()
+    def frames(self):
+        import numpy as np
+
+        from modules.OutputFrame import OutputFrame, OutputLayout
+        return [OutputFrame.build(i, 0.0, OutputLayout(),
+                                  np.zeros(0, np.int32), np.zeros(0, bool))
+                for i in range(3)]
+
+    def test_newestWins(self, frames):
+        """Test that only the newest frame is handed out"""
+        from modules.OutputFrame import FrameMailbox
+        mailbox = FrameMailbox()
+        for frame in frames:
+            mailbox.publish(frame)
+        assert mailbox.take(0) is frames[2]
+        assert mailbox.take(0) is None
+        assert mailbox.published == 3 and mailbox.dropped == 2
+
+    def test_takeWaits(self, frames):
+        """Test that take() wakes up when a frame is published"""
+        from modules.OutputFrame import FrameMailbox
+        mailbox = FrameMailbox()
+        timer = threading.Timer(0.05, mailbox.publish, (frames[0],))
+        timer.start()
+        assert mailbox.take(5) is frames[0]
+        timer.join()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+
+class TestResponseCurve:
+    @pytest.fixture()
+    def motor(self):
+        return {"name": "Motor 1", "minPwm": 70, "maxPwm": 255}
+
+    def test_linearMatchesOldBehaviour(self, motor):
+        """Test that the default curve is the old linear mapping"""
+        from modules.ResponseCurve import compileResponseCurve
+        lut = compileResponseCurve(motor, 1024)
+        assert lut[0] == 0 and lut[1] == 70 and lut[-1] == 255
+        assert lut[512] == np.ceil(255*512/1023)
+
+    def test_gamma(self, motor):
+        """Test that a gamma curve stays below linear for gamma > 1"""
+        from modules.ResponseCurve import compileResponseCurve
+        linear = compileResponseCurve(motor)
+        gamma = compileResponseCurve(
+            motor | {"curve": "Gamma", "curveGamma": 2.2})
+        assert (gamma <= linear).all() and gamma[-1] == 255
+
+    def test_points(self, motor):
+        """Test that custom points get interpolated"""
+        from modules.ResponseCurve import compileResponseCurve
+        lut = compileResponseCurve(
+            motor | {"minPwm": 0, "maxPwm": 1023, "curve": "Points",
+                     "curvePoints": [[0, 0], [0.5, 0.9], [1, 1]]}, 3)
+        assert list(lut) == [0, 921, 1023]
+
+    def test_pointsMissing(self, motor):
+        """Test that a Points curve without points falls back to linear"""
+        from modules.ResponseCurve import compileResponseCurve
+        linear = compileResponseCurve(motor)
+        for points in (None, [], [[0.5]], [["a", 1]]):
+            lut = compileResponseCurve(
+                motor | {"curve": "Points", "curvePoints": points})
+            assert (lut == linear).all()
+
+    def test_table(self, motor):
+        """Test that all motors get converted with one lookup"""
+        from modules.ResponseCurve import ResponseCurveTable
+        table = ResponseCurveTable(
+            [motor, motor | {"minPwm": 0, "maxPwm": 1023}])
+        assert list(table.lookup(np.array([1e-6, 1.0]))) == [70, 1023]
+        assert list(table.lookup(np.array([0.0, 2.0]))) == [0, 1023]
@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+TRACES = Path(__file__).parent / "traces"
+
+
+class TestPwmMatrix:
+    @pytest.fixture()
+    def matrix(self):
+        from modules.SimulationHarness import PwmMatrix
+        return PwmMatrix(40, ("0.0:0.0", "0.1:0.1"),
+                         np.array([[0, 0], [70, 0], [255, 80]], np.int32))
+
+    def test_writeRead(self, matrix, tmp_path):
+        """Test that a written matrix reads back identically"""
+        from modules.SimulationHarness import PwmMatrix
+        matrix.write(tmp_path / "pwm.csv")
+        other = PwmMatrix.read(tmp_path / "pwm.csv")
+        assert other.tps == 40 and other.columns == matrix.columns
+        assert not matrix.diff(other)
+
+    def test_diff(self, matrix):
+        """Test that differences are reported per tick"""
+        from modules.SimulationHarness import PwmMatrix
+        rows = matrix.rows.copy()
+        rows[1, 1] = 5
+        assert matrix.diff(PwmMatrix(40, matrix.columns, rows)) == \
+            ["tick 1: 0.1:0.1: 5 -> 0"]
+        assert matrix.diff(PwmMatrix(20, matrix.columns, rows))
+
+    def test_loadContactTrace(self):
+        """Test that recordings are loaded sorted by time"""
+        from modules.SimulationHarness import loadContactTrace
+        trace = loadContactTrace(TRACES / "head.trace.json")
+        assert trace[0][1].startswith("/avatar/parameters/")
+        assert all(a[0] <= b[0] for a, b in zip(trace, trace[1:]))
+
+
+class TestSimulationHarness:
+    @pytest.fixture()
+    def harness(self):
+        pytest.importorskip("multilateration")
+        from modules.SimulationHarness import SimulationHarness
+        with open(TRACES / "head.conf.json") as f:
+            return SimulationHarness(json.load(f))
+
+    def test_deterministic(self, harness):
+        """Test that two runs give bit-identical results"""
+        from modules.SimulationHarness import loadContactTrace
+        trace = loadContactTrace(TRACES / "head.trace.json")
+        first = harness.run(trace)
+        second = harness.run(trace)
+        assert first.rows.any()
+        assert not first.diff(second)
+        assert np.array_equal(first.rows, second.rows)
+
+    def test_goldenTracesExist(self):
+        """Test that test_goldenTraces isn't skipped for lack of files"""
+        goldens = sorted(TRACES.glob("*.golden.csv"))
+        assert goldens
+        for golden in goldens:
+            name = golden.name.removesuffix(".golden.csv")
+            assert (TRACES / f"{name}.conf.json").is_file()
+            assert (TRACES / f"{name}.trace.json").is_file()
+
+    @pytest.mark.parametrize(
+        "golden", sorted(TRACES.glob("*.golden.csv")), ids=lambda p: p.name)
+    def test_goldenTraces(self, golden):
+        """Test the solvers against golden pwm matrices
+
+        Golden files are created from <name>.conf.json and
+        <name>.trace.json with:
+            python tools/simulateSolve.py run -c test/traces/<name>.conf.json
+                -t test/traces/<name>.trace.json
+                -o test/traces/<name>.golden.csv
+        """
+        pytest.importorskip("multilateration")
+        from modules.SimulationHarness import (PwmMatrix, SimulationHarness,
+                                               loadContactTrace)
+        name = golden.name.removesuffix(".golden.csv")
+        expected = PwmMatrix.read(golden)
+        with open(TRACES / f"{name}.conf.json") as f:
+            harness = SimulationHarness(json.load(f), expected.tps)
+        result = harness.run(loadContactTrace(TRACES / f"{name}.trace.json"),
+                             len(expected.rows)/expected.tps)
+        assert not result.diff(expected)
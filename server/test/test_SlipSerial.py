@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+
+import pytest
+
+needsPty = pytest.mark.skipif(sys.platform == "win32",
+                              reason="needs a pseudo-terminal")
+
+
+class DeviceSide:
+    """The device end of a pseudo-terminal."""
+
+    def __init__(self, waitFor):
+        from modules.SlipSerial import SlipDecoder
+        self.master, self.slave = os.openpty()
+        self.port = os.ttyname(self.slave)
+        self.decoder = SlipDecoder()
+        os.set_blocking(self.master, False)
+        self.waitFor = waitFor
+
+    def read(self, timeout=2.0):
+        packets = []
+
+        def poll():
+            try:
+                packets.extend(self.decoder.feed(os.read(self.master, 65536)))
+            except BlockingIOError:
+                pass
+            return packets
+        self.waitFor(poll, timeout)
+        return packets
+
+    def write(self, packet):
+        from modules.SlipSerial import slipEncode
+        os.write(self.master, slipEncode(packet))
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+@pytest.fixture()
+def device(waitFor):
+    device = DeviceSide(waitFor)
+    yield device
+    device.close()
+
+
+class TestSlip:
+    @pytest.mark.parametrize("packet", [b"\x01", b"\xc0", b"\xdb",
+                                        b"a\xc0b\xdbc\xdb\xdc", bytes(range(256))])
+    def test_roundtrip(self, packet):
+        from modules.SlipSerial import SlipDecoder, slipEncode
+        framed = slipEncode(packet)
+        assert framed.count(b"\xc0") == 2
+        decoder = SlipDecoder()
+        # feed byte by byte to test packets split over reads
+        packets = []
+        for i in range(len(framed)):
+            packets += decoder.feed(framed[i:i + 1])
+        assert packets == [packet]
+
+    def test_invalidEscape(self):
+        from modules.SlipSerial import SlipDecoder, slipEncode
+        decoder = SlipDecoder()
+        packets = decoder.feed(b"\xc0ab\xdb\x01c\xc0" + slipEncode(b"ok"))
+        assert packets == [b"ok"] and decoder.droppedPackets == 1
+
+
+@needsPty
+class TestSlipSerialLink:
+    def test_sendReceive(self, device, waitFor):
+        from modules.SlipSerial import SlipSerialLink
+        received = []
+        link = SlipSerialLink(device.port, received.append)
+        try:
+            assert waitFor(lambda: link.isOpen)
+            link.send(b"\xc0hello")
+            assert device.read() == [b"\xc0hello"]
+            device.write(b"world\xdb")
+            assert waitFor(lambda: received)
+            assert received == [b"world\xdb"]
+        finally:
+            link.close()
+
+    def test_coalesce(self, device, waitFor):
+        """Test that a blocked port only keeps the newest packet"""
+        from modules.SlipSerial import SlipSerialLink
+        link = SlipSerialLink(device.port, lambda _: None, writeTimeout=0.5)
+        try:
+            assert waitFor(lambda: link.isOpen)
+            # nobody reads the device side until the pty buffer is full
+            while not link.writeTimeouts:
+                link.send(bytes(4096))
+                time.sleep(0.001)
+            for i in range(10):
+                link.send(b"frame%d" % i)
+            assert link.packetsCoalesced >= 9
+            # drain, the last frame has to come through
+            assert waitFor(lambda: b"frame9" in device.read(0.1), 5)
+        finally:
+            link.close()
+
+
+@needsPty
+class TestSlipSerialCommunicationAdapterImpl:
+    def test_adapter(self, app, device, waitFor):
+        from pythonosc.osc_message import OscMessage
+        from pythonosc.osc_message_builder import OscMessageBuilder
+
+        from modules.HardwareDevice import SlipSerialCommunicationAdapterImpl
+
+        def build(address, *args):
+            builder = OscMessageBuilder(address)
+            for arg in args:
+                builder.add_arg(arg)
+            return builder.build().dgram
+
+        heartbeats, discoveries = [], []
+        adapter = SlipSerialCommunicationAdapterImpl()
+        adapter.heartbeat.connect(heartbeats.append)
+        adapter.discoveryResponse.connect(discoveries.append)
+        adapter.setup({"name": "pty", "serialPort": device.port,
+                       "numMotors": 3})
+        try:
+            # the device is asked for it's details once the port is open
+            discover = device.read()
+            assert OscMessage(discover[0]).address == "/patpatpat/discover"
+
+            device.write(build("/patpatpat/noticeme/senpai",
+                               "AA:AA:AA:AA:AA:AA", "pty", 3, 1))
+            device.write(build("/patpatpat/heartbeat",
+                               "AA:AA:AA:AA:AA:AA", 10, 3.3, 0))
+            assert waitFor(lambda: discoveries and heartbeats)
+            assert discoveries[0].features == 1
+            assert discoveries[0].sourceAddr == device.port
+            assert heartbeats[0].uptime == 10
+
+            assert adapter.sendEncoded(adapter.encodePinValues([1, 2, 3]))
+            message = OscMessage(device.read()[0])
+            assert message.address == "/m" and message.params == [1, 2, 3]
+        finally:
+            adapter.close()
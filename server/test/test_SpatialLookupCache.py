@@ -0,0 +1,60 @@
+import pytest
+
+
+class TestSpatialLookupCache:
+    def test_init(self):
+        """Test that the module imports and can be created"""
+        from modules.SpatialLookupCache import SpatialLookupCache
+        SpatialLookupCache(0.01)
+        with pytest.raises(ValueError):
+            SpatialLookupCache(0)
+
+    @pytest.fixture()
+    def cache(self):
+        from modules.SpatialLookupCache import SpatialLookupCache
+        return SpatialLookupCache(0.01, maxEntries=2)
+
+    def test_quantize(self, cache):
+        """Test that positions snap to the nearest cell"""
+        assert cache.quantize(0.0, 0.004, -0.006) == (0, 0, -1)
+        assert cache.cellCenter((1, 2, -1)) == pytest.approx(
+            (0.01, 0.02, -0.01))
+
+    def test_lookupComputesAtCellCenter(self, cache):
+        """Test that values are computed for the cell center and reused"""
+        calls = []
+
+        def compute(xyz):
+            calls.append(xyz)
+            return [xyz[0], xyz[1]]
+
+        first = cache.lookup(0.011, 0.0, 0.0, compute)
+        second = cache.lookup(0.009, 0.001, 0.0, compute)
+        assert len(calls) == 1
+        assert list(first) == pytest.approx([0.01, 0.0])
+        assert first is second
+        assert cache.hits == 1 and cache.misses == 1
+        assert cache.hitRate == 0.5
+
+    def test_readOnly(self, cache):
+        """Test that cached vectors can't be modified by accident"""
+        cached = cache.lookup(0.0, 0.0, 0.0, lambda xyz: [1.0, 2.0])
+        with pytest.raises(ValueError):
+            cached[0] = 1.0
+
+    def test_boundedLru(self, cache):
+        """Test that the least recently used cell gets evicted"""
+        def compute(xyz):
+            return [1.0]
+
+        cache.lookup(0.0, 0.0, 0.0, compute)
+        cache.lookup(0.1, 0.0, 0.0, compute)
+        cache.lookup(0.0, 0.0, 0.0, compute)
+        cache.lookup(0.2, 0.0, 0.0, compute)
+        assert cache.size == 2
+        assert cache.quantize(0.1, 0.0, 0.0) not in cache._entries
+
+        cache.clear()
+        assert cache.size == 0 and cache.hitRate == 0.0
+        # an empty cache must not look like no cache
+        assert cache
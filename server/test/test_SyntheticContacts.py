@@ -0,0 +1,46 @@
+import pytest
+
+
+class TestSyntheticContacts:
+    def test_proximity(self):
+        """Test that receivers report the closest touch"""
+        import numpy as np
+
+        from tools.syntheticContacts import RECEIVERS, proximity
+        center = np.array([RECEIVERS[0][2]])
+        values = proximity(center)
+        assert values[0] == 1.0
+        assert proximity(np.array([[10.0, 10.0, 10.0]])).tolist() == \
+            [0.0]*len(RECEIVERS)
+        assert proximity(
+            np.array([[10.0, 10.0, 10.0], RECEIVERS[0][2]]))[0] == 1.0
+
+    @pytest.mark.parametrize("scenario", ["single", "multi", "noisy",
+                                          "dropouts"])
+    def test_generateTrace(self, scenario):
+        """Test that traces are sorted, in range and reproducible"""
+        from tools.syntheticContacts import generateTrace
+        trace = generateTrace(scenario, duration=2.0, rate=50, seed=1)
+        assert trace == generateTrace(scenario, duration=2.0, rate=50, seed=1)
+        assert all(a[0] <= b[0] for a, b in zip(trace, trace[1:]))
+        assert all(0.0 <= value <= 1.0 for _, _, value in trace)
+        assert trace[0][1].startswith("/avatar/parameters/")
+        if scenario == "dropouts":
+            assert len(trace) < 2*50*4
+        else:
+            assert len(trace) == 2*50*4
+
+    def test_unknownScenario(self):
+        from tools.syntheticContacts import generateTrace
+        with pytest.raises(ValueError):
+            generateTrace("nope")
+
+    def test_syntheticGroupConfig(self):
+        """Test that generated groups look like configured groups"""
+        from tools.syntheticContacts import (syntheticConfig,
+                                               syntheticGroupConfig)
+        group = syntheticGroupConfig(3, 16, "MLat")
+        assert len(group["motors"]) == 16
+        assert group["motors"][5]["espAddr"] == [3, 5]
+        assert group["solver"]["solverType"] == "MLat"
+        assert syntheticConfig([group])["groups"]["group3"] is group
@@ -0,0 +1,52 @@
+import pytest
+
+
+class TestTickProfiler:
+    @pytest.fixture()
+    def profiler(self):
+        from modules.TickProfiler import SEND, SNAPSHOT, TickProfiler
+        profiler = TickProfiler(historySize=8, maxGroups=1)
+        # 10 ticks where group 7 needs 1ms to solve and group 3 0.5ms
+        for _ in range(10):
+            row = profiler.beginTick()
+            profiler.addPhase(row, SNAPSHOT, 10_000)
+            profiler.addGroup(row, 0, 7, 1_000_000, 20_000)
+            profiler.addGroup(row, 1, 3, 500_000, 20_000)
+            profiler.addPhase(row, SEND, 30_000)
+            profiler.endTick(row, 1_580_000)
+        return profiler
+
+    def test_summary(self, profiler):
+        """Test that phases add up per tick"""
+        summary = profiler.summary()
+        assert profiler.ticks == 10
+        assert summary["solve"][0] == pytest.approx(1.5)
+        assert summary["map"][0] == pytest.approx(0.04)
+        assert summary["total"][2] == pytest.approx(1.58)
+
+    def test_report(self, profiler):
+        """Test that an overrun is attributed to the slow group"""
+        from modules.TickProfiler import SEND, SNAPSHOT
+        row = profiler.beginTick()
+        profiler.addPhase(row, SNAPSHOT, 10_000)
+        profiler.addGroup(row, 0, 3, 500_000, 20_000)
+        profiler.addGroup(row, 1, 7, 30_000_000, 20_000)
+        profiler.addPhase(row, SEND, 30_000)
+        profiler.endTick(row, 30_580_000)
+
+        report = profiler.report(row, 25e6)
+        assert report.tick == 10
+        assert report.culprit == "group 7 solve"
+        assert report.culpritMs == pytest.approx(30.0)
+        assert report.culpritTypicalMs == pytest.approx(1.0)
+        assert report.groupsMs[3] == pytest.approx((0.5, 0.02))
+        assert report.budgetMs == 25.0
+        assert "group 7 solve" in str(report)
+
+    def test_reportPhase(self, profiler):
+        """Test that a slow send phase is reported as culprit"""
+        from modules.TickProfiler import SEND
+        row = profiler.beginTick()
+        profiler.addPhase(row, SEND, 40_000_000)
+        profiler.endTick(row, 40_000_000)
+        assert profiler.report(row, 25e6).culprit == "send"
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+CONFIG = {
+    "configVersion": 1,
+    "program": {
+        "vrcOscSendPort": 38890,
+        "vrcOscReceiveAddress": "127.0.0.1",
+        "vrcOscReceivePort": 38891
+    },
+    "esps": {},
+    "groups": {}
+}
+
+
+@pytest.fixture()
+def connector(loadConfig):
+    loadConfig(CONFIG)
+
+    from modules.VrcConnector import VrcConnectorImpl
+    connector = VrcConnectorImpl()
+    connector.connect()
+    yield connector
+    connector.close()
+
+
+class TestVrcConnector:
+    def test_edges(self, connector, waitFor):
+        """Test that the first packet refreshes the connection and the
+        contact group right on the receive thread"""
+        from pythonosc.udp_client import SimpleUDPClient
+
+        from modules.LivenessService import LivenessService
+        group = LivenessService.getInstance().register("group", 0.5)
+        connector.addToFilter("contact", group)
+        states = []
+        connector.onVrcConnectionStateChanged.connect(states.append)
+
+        vrc = SimpleUDPClient("127.0.0.1", 38890)
+        # the receive thread may not have bound the socket yet
+        assert waitFor(lambda: vrc.send_message(
+            "/avatar/parameters/other", 1.0) or connector.liveness.alive)
+        assert not group.alive
+        vrc.send_message("/avatar/parameters/contact", 1.0)
+        assert waitFor(lambda: group.alive)
+        assert waitFor(lambda: states == [True])
+
+        connector.removeFromFilter("contact", group)
+        assert connector.worker.dispatcher.matchTopics == {}
+        assert waitFor(lambda: not group.alive)
+        group.close()
+
+    def test_close(self, connector):
+        """Test that the blocking receive thread stops right away"""
+        start = time.monotonic()
+        connector.close()
+        assert time.monotonic() - start < 0.4
+        assert connector.workerThread.isFinished()
+        connector.connect()
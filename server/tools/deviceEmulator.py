@@ -0,0 +1,112 @@
+# a utility to emulate lots of hardware devices on one machine
+# the devices answer discovery, send heartbeats and record every motor
+# frame they receive. frame rate, jitter and loss are reported per device
+# help for command line options are available via -h
+#
+# examples (run from the server directory):
+#   python tools/deviceEmulator.py -n 50 --announce 127.0.0.1:8872 -d 30
+#   python tools/deviceEmulator.py -n 4 --base-port 9000 -o stats.json
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from dataclasses import asdict
+from pathlib import Path
+
+import numpy as np
+
+# make the server modules importable when run from anywhere
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.DeviceEmulator import (FIRMWARE_FEATURES,  # noqa: E402
+                                    DeviceEmulator)
+
+
+def parseAddress(value: str) -> tuple[str, int]:
+    host, port = value.rsplit(":", 1)
+    return host, int(port)
+
+
+def printStats(emulator: DeviceEmulator, expectedRate: float | None) -> list:
+    stats = emulator.stats(expectedRate)
+    for s in stats:
+        print(s)
+    active = [s for s in stats if s.frames >= 2]
+    if active:
+        print(f"{len(active)}/{len(stats)} devices receiving, "
+              f"mean {np.mean([s.fps for s in active]):.1f} fps, "
+              f"worst jitter {max(s.jitterMs for s in active):.2f}ms, "
+              f"worst gap {max(s.maxGapMs for s in active):.2f}ms, "
+              f"lost {sum(s.lost for s in active)} frames")
+    return stats
+
+
+def main() -> int:
+    parser = ArgumentParser(prog="deviceEmulator",
+                            description="Emulate hardware devices")
+    parser.add_argument("-n", "--count", type=int, default=1,
+                        help="Number of devices")
+    parser.add_argument("-m", "--motors", type=int, default=4,
+                        help="Motors per device")
+    parser.add_argument("--host", default="127.0.0.2",
+                        help="Address of the first device, the next ones "
+                        "count up from here unless --base-port is used")
+    parser.add_argument("--base-port", type=int,
+                        help="Put all devices on --host with their own port")
+    parser.add_argument("--features", type=int, default=FIRMWARE_FEATURES,
+                        help="Feature flags announced in discovery replies, "
+                        "defaults to the ones of the current firmware")
+    parser.add_argument("--heartbeat", type=float, default=4.0,
+                        help="Seconds between heartbeats")
+    parser.add_argument("--reply-delay", type=float, default=0.0,
+                        help="Seconds to hold back latency probe answers")
+    parser.add_argument("--announce", type=parseAddress,
+                        help="Send a discovery reply to this server on "
+                        "start, eg. 127.0.0.1:8872")
+    parser.add_argument("-d", "--duration", type=float, default=0,
+                        help="Seconds to run, 0 runs until ctrl+c")
+    parser.add_argument("-r", "--report", type=float, default=5.0,
+                        help="Seconds between printed reports, 0 is off")
+    parser.add_argument("--expected-rate", type=float,
+                        help="Frames per second the server sends, used "
+                        "to estimate the loss of /m frames")
+    parser.add_argument("-o", "--output",
+                        help="A json file to write the final stats to")
+    args = parser.parse_args()
+
+    emulator = DeviceEmulator(
+        args.count, args.motors, args.host, args.base_port, args.features,
+        args.heartbeat, args.announce)
+    for device in emulator.devices:
+        device.replyDelay = args.reply_delay
+    first, last = emulator.devices[0], emulator.devices[-1]
+    print(f"Emulating {args.count} devices from {first.address[0]}:"
+          f"{first.address[1]} to {last.address[0]}:{last.address[1]}")
+
+    start = lastReport = time.monotonic()
+    try:
+        with emulator:
+            while not args.duration \
+                    or time.monotonic() - start < args.duration:
+                time.sleep(0.1)
+                if args.report and \
+                        time.monotonic() - lastReport >= args.report:
+                    lastReport = time.monotonic()
+                    printStats(emulator, args.expected_rate)
+    except KeyboardInterrupt:
+        pass
+
+    print("Final stats:")
+    stats = printStats(emulator, args.expected_rate)
+    if args.output:
+        with open(args.output, mode="w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "duration": round(time.monotonic() - start, 3),
+                       "devices": [asdict(s) for s in stats]}, f, indent=4)
+        print(f"Wrote stats to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
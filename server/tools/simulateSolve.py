@@ -0,0 +1,78 @@
+# a utility to run the solve pipeline offline against a recorded contact
+# trace (recorded with oscRecReplayer.py) and to compare the resulting
+# motor pwm with a golden trace
+# help for command line options are available via -h
+#
+# examples (run from the server directory):
+#   python tools/simulateSolve.py run -c config.conf -t recording.json -o out.csv
+#   python tools/simulateSolve.py diff -c config.conf -t recording.json -g test/traces/x.golden.csv
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+# make the server modules importable when run from anywhere
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.SimulationHarness import (PwmMatrix,  # noqa: E402
+                                       SimulationHarness, loadContactTrace)
+
+
+def main() -> int:
+    parser = ArgumentParser(prog="simulateSolve",
+                            description="Run solvers offline on a contact trace")
+    parser.add_argument(
+        "mode", choices=["run", "diff"],
+        help="run: write the pwm matrix, diff: compare with a golden matrix")
+    parser.add_argument("-c", "--config", required=True,
+                        help="The config file to use")
+    parser.add_argument("-t", "--trace", required=True,
+                        help="The contact trace recorded with oscRecReplayer")
+    parser.add_argument("-o", "--output", default="pwm.csv",
+                        help="The file to write the pwm matrix to (run only)")
+    parser.add_argument("-g", "--golden",
+                        help="The golden pwm matrix to compare with (diff only)")
+    parser.add_argument("--tps", type=int, default=None,
+                        help="Ticks per second, defaults to the config's or "
+                        "the golden matrix's")
+    parser.add_argument("--tail", type=float, default=2.0,
+                        help="Seconds to simulate after the last event")
+    args = parser.parse_args()
+
+    with open(args.config, mode="r") as f:
+        configData = json.load(f)
+    trace = loadContactTrace(args.trace)
+
+    golden = None
+    if args.mode == "diff":
+        if not args.golden:
+            parser.error("diff needs --golden")
+        golden = PwmMatrix.read(args.golden)
+
+    harness = SimulationHarness(
+        configData, args.tps or (golden.tps if golden else None), args.tail)
+    startTime = time.perf_counter()
+    matrix = harness.run(
+        trace, len(golden.rows)/golden.tps if golden else None)
+    runTime = time.perf_counter() - startTime
+    simTime = len(matrix.rows)/matrix.tps
+    print(f"Simulated {len(matrix.rows)} ticks ({simTime:.1f}s) "
+          f"in {runTime:.2f}s")
+
+    if golden is None:
+        matrix.write(args.output)
+        print(f"Wrote pwm matrix to {args.output}")
+        return 0
+
+    differences = matrix.diff(golden)
+    for line in differences:
+        print(line)
+    print("Matches golden matrix" if not differences
+          else "Does NOT match golden matrix")
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
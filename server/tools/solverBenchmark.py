@@ -0,0 +1,257 @@
+# a utility to measure the per tick cost of the solvers
+# runs synthetic contact sweeps (single touch, multi-touch, noisy,
+# dropouts) against generated groups of configurable size and/or replays
+# recordings made with oscRecReplayer.py against a config file.
+# results are written as json so they can be compared between revisions
+# help for command line options are available via -h
+#
+# examples (run from the server directory):
+#   python tools/solverBenchmark.py -m 4 16 64 -o before.json
+#   python tools/solverBenchmark.py -m 4 16 64 -o after.json --compare before.json
+#   python tools/solverBenchmark.py -c config.conf -r recording.json -o rec.json
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+
+import numpy as np
+
+# make the server modules importable when run from anywhere
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.SimulationHarness import (SimulationHarness,  # noqa: E402
+                                       contactTrace, loadContactTrace)
+from tools.syntheticContacts import (SCENARIOS,  # noqa: E402
+                                     generateTrace, syntheticConfig,
+                                     syntheticGroupConfig)
+from utils.Enums import SolverType  # noqa: E402
+
+# solvers that have an implementation
+SOLVER_TYPES = (SolverType.MLAT, SolverType.SINGLEN2N)
+
+
+def percentiles(samples: np.ndarray) -> dict:
+    """Summarize timing samples in microseconds.
+
+    Args:
+        samples (np.ndarray): Durations in ns
+
+    Returns:
+        dict: p50, p90, p99, max and mean in us
+    """
+    us = samples/1000 if len(samples) else np.zeros(1)
+    p50, p90, p99 = np.percentile(us, (50, 90, 99)).tolist()
+    return {"p50": round(p50, 2), "p90": round(p90, 2),
+            "p99": round(p99, 2), "max": round(float(us.max()), 2),
+            "mean": round(float(us.mean()), 2)}
+
+
+def benchmark(configData: dict, trace: contactTrace, scenario: str,
+              tps: int | None, warmup: int) -> list[dict]:
+    """Run all groups of a config over a trace and measure them.
+
+    The trace is simulated twice: once for timing and once with
+    tracemalloc running, as tracemalloc slows everything down too much
+    to time at the same time. peakBytesPerTick is how far the traced
+    memory rose above it's level at the start of a tick, the most
+    memory a tick needs at once. It is not a count of allocations,
+    those freed within the tick can't be counted by tracemalloc.
+
+    Args:
+        configData (dict): The program config
+        trace (contactTrace): The contact events
+        scenario (str): Name of the scenario for the report
+        tps (int | None): Ticks per second, None for the config's
+        warmup (int): Ticks at the start that are not measured
+
+    Returns:
+        list[dict]: One result per group
+    """
+    harness = SimulationHarness(configData, tps, tail=0.0)
+    dt = 1/harness.tps
+
+    # timing pass
+    harness.setup()
+    numTicks = harness.numTicks(trace)
+    numGroups = len(harness.groups)
+    solveNs = np.zeros((numTicks, numGroups), dtype=np.int64)
+    mapNs = np.zeros((numTicks, numGroups), dtype=np.int64)
+    solved = np.zeros((numTicks, numGroups), dtype=bool)
+    for tick, now in harness.ticks(trace, numTicks):
+        for i, group in enumerate(harness.groups):
+            t0 = time.perf_counter_ns()
+            solved[tick, i] = group.solver.solve(now)
+            t1 = time.perf_counter_ns()
+            group.updateMotors(dt, solved[tick, i])
+            mapNs[tick, i] = time.perf_counter_ns() - t1
+            solveNs[tick, i] = t1 - t0
+    cacheHitRates = [getattr(group.solver, "lookupCache", None)
+                     for group in harness.groups]
+    cacheHitRates = [c.hitRate if c is not None else None
+                     for c in cacheHitRates]
+    harness.close()
+
+    # memory pass
+    harness.setup()
+    peakBytes = np.zeros((numTicks, numGroups), dtype=np.int64)
+    tracemalloc.start()
+    for tick, now in harness.ticks(trace, numTicks):
+        for i, group in enumerate(harness.groups):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            group.tick(dt, now)
+            peakBytes[tick, i] = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    harness.close()
+
+    # the harness creates the groups sorted by id
+    groupConfigs = sorted(configData["groups"].values(),
+                          key=lambda group: group["id"])
+    results = []
+    for i, groupConfig in enumerate(groupConfigs):
+        measured = slice(min(warmup, numTicks), None)
+        result = {
+            "scenario": scenario,
+            "group": groupConfig["name"],
+            "solverType": groupConfig["solver"]["solverType"],
+            "motors": len(groupConfig["motors"]),
+            "ticks": numTicks,
+            "solveUs": percentiles(solveNs[measured, i]),
+            "mapUs": percentiles(mapNs[measured, i]),
+            "peakBytesPerTick": {
+                "mean": round(float(peakBytes[measured, i].mean()), 1)
+                if numTicks > warmup else 0.0,
+                "max": int(peakBytes[measured, i].max(initial=0))},
+            "successRate": round(float(solved[:, i].mean()), 4)
+            if numTicks else 0.0
+        }
+        if cacheHitRates[i] is not None:
+            result["lookupCacheHitRate"] = round(cacheHitRates[i], 4)
+        results.append(result)
+    return results
+
+
+def compare(current: list[dict], baseline: list[dict]) -> list[str]:
+    """Compare results with the results of another revision.
+
+    Args:
+        current (list[dict]): The new results
+        baseline (list[dict]): The old results
+
+    Returns:
+        list[str]: One line per group found in both
+    """
+    old = {(r["scenario"], r["group"]): r for r in baseline}
+    lines = []
+    for result in current:
+        if not (before := old.get((result["scenario"], result["group"]))):
+            continue
+        changes = []
+        for key in ("p50", "p99"):
+            a, b = before["solveUs"].get(key), result["solveUs"].get(key)
+            if a and b:
+                changes.append(f"solve {key} {a:.1f}->{b:.1f}us "
+                               f"({(b - a)/a*100:+.0f}%)")
+        changes.append(f"peak {before['peakBytesPerTick']['mean']:.0f}->"
+                       f"{result['peakBytesPerTick']['mean']:.0f}B")
+        changes.append(f"success {before['successRate']:.3f}->"
+                       f"{result['successRate']:.3f}")
+        lines.append(f"{result['scenario']}/{result['group']}: "
+                     + ", ".join(changes))
+    return lines
+
+
+def main() -> int:
+    parser = ArgumentParser(
+        prog="solverBenchmark",
+        description="Measure the per tick solver cost",
+        epilog="Memory is reported as peakBytesPerTick, the most memory "
+        "a tick needs on top of what was in use before it, measured with "
+        "tracemalloc. It stands in for allocations per tick: tracemalloc "
+        "can't count allocations that are freed within the tick, so "
+        "there is no allocation count.")
+    parser.add_argument("-s", "--scenarios", nargs="*", choices=SCENARIOS,
+                        default=list(SCENARIOS),
+                        help="Synthetic scenarios to run")
+    parser.add_argument("--solvers", nargs="*",
+                        choices=[s.value for s in SOLVER_TYPES],
+                        default=[s.value for s in SOLVER_TYPES],
+                        help="Solver types of the synthetic groups")
+    parser.add_argument("-m", "--motors", nargs="*", type=int,
+                        default=[4, 16, 64],
+                        help="Motors per synthetic group")
+    parser.add_argument("--lookup-cache", type=float, default=0,
+                        help="MLat lookup cache resolution in mm, 0 is off")
+    parser.add_argument("-d", "--duration", type=float, default=10.0,
+                        help="Seconds of every synthetic scenario")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for noise and dropouts")
+    parser.add_argument("-c", "--config",
+                        help="A config file to replay recordings against")
+    parser.add_argument("-r", "--recordings", nargs="*", default=[],
+                        help="Recordings made with oscRecReplayer")
+    parser.add_argument("--tps", type=int, default=40,
+                        help="Ticks per second to simulate")
+    parser.add_argument("--warmup", type=int, default=10,
+                        help="Ticks at the start that are not measured")
+    parser.add_argument("-o", "--output", default="benchmark.json",
+                        help="The json file to write the results to")
+    parser.add_argument("--compare",
+                        help="A previous result file to compare with")
+    args = parser.parse_args()
+
+    if args.recordings and not args.config:
+        parser.error("replaying recordings needs --config")
+
+    results = []
+    groups = [syntheticGroupConfig(groupId, numMotors, solverType,
+                                   args.lookup_cache)
+              for groupId, (solverType, numMotors) in enumerate(
+                  (s, m) for s in args.solvers for m in args.motors)]
+    if groups:
+        configData = syntheticConfig(groups, args.tps)
+        for scenario in args.scenarios:
+            trace = generateTrace(scenario, args.duration, seed=args.seed)
+            results += benchmark(configData, trace, scenario, args.tps,
+                                 args.warmup)
+
+    if args.recordings:
+        with open(args.config, mode="r") as f:
+            configData = json.load(f)
+        for recording in args.recordings:
+            results += benchmark(configData, loadContactTrace(recording),
+                                 Path(recording).name, args.tps,
+                                 args.warmup)
+
+    for r in results:
+        print(f"{r['scenario']:>12} {r['group']:<20} "
+              f"solve p50 {r['solveUs']['p50']:8.1f}us "
+              f"p99 {r['solveUs']['p99']:8.1f}us "
+              f"map p50 {r['mapUs']['p50']:6.1f}us "
+              f"peak {r['peakBytesPerTick']['mean']:8.0f}B/tick "
+              f"success {r['successRate']:.1%}")
+
+    with open(args.output, mode="w") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "tps": args.tps,
+            "results": results
+        }, f, indent=4)
+    print(f"Wrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, mode="r") as f:
+            for line in compare(results, json.load(f)["results"]):
+                print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Generates synthetic contact groups and contact traces.
+
+The traces have the same format as recordings made with
+tools/oscRecReplayer.py, so they can be fed into the SimulationHarness.
+They are used to benchmark solvers without having to record anything
+in VRChat first.
+
+Every scenario moves one or more touches over a head sized half sphere
+that is covered by 4 contact receivers and a configurable amount of
+motors:
+
+    single:   One touch sweeping from left to right and back.
+    multi:    Two touches at the same time, the receivers report the
+              closest one like VRChat does.
+    noisy:    Like single but with gaussian noise on every value.
+    dropouts: Like single but with random gaps where no data comes in.
+
+All randomness is seeded so the same arguments give the same trace.
+"""
+
+from math import pi
+
+import numpy as np
+
+from modules.SimulationHarness import VRC_PARAMETER_PREFIX, contactTrace
+from utils.Enums import SolverType
+from utils.Logger import LoggerClass
+
+logger = LoggerClass.getSubLogger(__name__)
+
+SCENARIOS = ("single", "multi", "noisy", "dropouts")
+
+# The center and radius of the half sphere everything happens on
+SHELL_CENTER = (0.0, 0.14, 0.0)
+SHELL_RADIUS = 0.09
+
+# name, receiverId, xyz, radius of the contact receivers
+RECEIVERS = (
+    ("Center", "bench_center", (0.0, 0.14, 0.0), 0.26),
+    ("Back Left", "bench_1", (-0.0885, 0.2264, -0.0578), 0.26),
+    ("Back Right", "bench_2", (0.0885, 0.2264, -0.0578), 0.26),
+    ("Front Center", "bench_3", (0.0, 0.2264, 0.1398), 0.26),
+)
+
+
+def _shellPoints(azimuth: np.ndarray, elevation: np.ndarray) -> np.ndarray:
+    """Convert angles on the half sphere to xyz positions.
+
+    Args:
+        azimuth (np.ndarray): Angle around the y axis, 0 is the front.
+        elevation (np.ndarray): Angle above the horizon.
+
+    Returns:
+        np.ndarray: n x 3 positions
+    """
+    cosEl = np.cos(elevation)
+    return np.column_stack((
+        SHELL_CENTER[0] + SHELL_RADIUS*cosEl*np.sin(azimuth),
+        SHELL_CENTER[1] + SHELL_RADIUS*np.sin(elevation),
+        SHELL_CENTER[2] + SHELL_RADIUS*cosEl*np.cos(azimuth)))
+
+
+def motorPositions(numMotors: int) -> np.ndarray:
+    """Spread motors evenly over the half sphere (golden spiral).
+
+    Args:
+        numMotors (int): The amount of motors
+
+    Returns:
+        np.ndarray: numMotors x 3 positions
+    """
+    i = np.arange(numMotors) + 0.5
+    elevation = np.arcsin(1 - i/numMotors)
+    azimuth = i*pi*(3 - np.sqrt(5))
+    return _shellPoints(azimuth, elevation)
+
+
+def syntheticGroupConfig(groupId: int, numMotors: int,
+                         solverType: SolverType | str,
+                         lookupCacheResolution: float = 0) -> dict:
+    """Build the config of a contact group covering the half sphere.
+
+    Args:
+        groupId (int): The id of the group, also used as esp id
+        numMotors (int): The amount of motors
+        solverType (SolverType | str): The solver to use
+        lookupCacheResolution (float, optional): MLat lookup cache
+            resolution in mm, 0 is off. Defaults to 0.
+
+    Returns:
+        dict: A group config like in the "groups" section
+    """
+    # shrink the motor radius with more motors so they don't all overlap
+    radius = max(0.02, 0.12/np.sqrt(numMotors))
+    motors = [{
+        "name": f"Motor {i}",
+        "espAddr": [groupId, i],
+        "minPwm": 70,
+        "maxPwm": 255,
+        "curve": "Linear",
+        "curveGamma": 1.0,
+        "xyz": [round(v, 5) for v in xyz],
+        "r": round(float(radius), 5)
+    } for i, xyz in enumerate(motorPositions(numMotors).tolist())]
+    avatarPoints = [{
+        "name": name,
+        "receiverId": receiverId,
+        "xyz": list(xyz),
+        "r": r
+    } for name, receiverId, xyz, r in RECEIVERS]
+    return {
+        "id": groupId,
+        "name": f"{SolverType(solverType).value} x{numMotors}",
+        "envelopeAttackMs": 0,
+        "envelopeHoldMs": 0,
+        "envelopeReleaseMs": 1000,
+        "motors": motors,
+        "avatarPoints": avatarPoints,
+        "solver": {
+            "solverType": SolverType(solverType).value,
+            "strength": 100,
+            "contactOnly": False,
+            "MLAT_enableHalfSphereCheck": False,
+            "MLAT_lookupCacheResolution": lookupCacheResolution,
+            "MLAT_falloffKernel": "Linear",
+            "MLAT_falloffParam": 0.0,
+            "SINGLEN2N_minMaxMode": "Max"
+        }
+    }
+
+
+def syntheticConfig(groups: list[dict], tps: int = 40) -> dict:
+    """Wrap group configs into a full program config.
+
+    Args:
+        groups (list[dict]): Configs from syntheticGroupConfig()
+        tps (int, optional): The ticks per second. Defaults to 40.
+
+    Returns:
+        dict: The program config
+    """
+    return {
+        "configVersion": 1,
+        "program": {"mainTps": tps},
+        "esps": {},
+        "groups": {f"group{group['id']}": group for group in groups}
+    }
+
+
+def proximity(touches: np.ndarray) -> np.ndarray:
+    """Calculate what every receiver reports for a set of touches.
+
+    Like VRChat's proximity contacts a receiver reports 1.0 at it's
+    center down to 0.0 at it's radius, for the closest touch.
+
+    Args:
+        touches (np.ndarray): m x 3 touch positions
+
+    Returns:
+        np.ndarray: The value of every receiver
+    """
+    centers = np.array([r[2] for r in RECEIVERS])
+    radii = np.array([r[3] for r in RECEIVERS])
+    distance = np.linalg.norm(
+        touches[np.newaxis, :, :] - centers[:, np.newaxis, :], axis=2)
+    values = np.clip(1.0 - distance/radii[:, np.newaxis], 0.0, 1.0)
+    return values.max(axis=1)
+
+
+def _sweep(t: np.ndarray, period: float, offset: float,
+           elevation: float) -> np.ndarray:
+    """A touch going back and forth between left and right.
+
+    Args:
+        t (np.ndarray): The sample times
+        period (float): Seconds for one left-right-left cycle
+        offset (float): Azimuth offset of the sweep center
+        elevation (float): Elevation of the sweep
+
+    Returns:
+        np.ndarray: n x 3 positions
+    """
+    phase = np.abs(((t/period) % 1.0)*2 - 1)  # triangle 1..0..1
+    azimuth = offset + (phase - 0.5)*pi
+    return _shellPoints(azimuth, np.full_like(t, elevation))
+
+
+def generateTrace(scenario: str, duration: float = 5.0, rate: int = 50,
+                  seed: int = 0) -> contactTrace:
+    """Generate a synthetic contact trace.
+
+    Args:
+        scenario (str): One of SCENARIOS
+        duration (float, optional): Length in seconds. Defaults to 5.0.
+        rate (int, optional): Updates per second of every receiver.
+            Defaults to 50.
+        seed (int, optional): Seed for noise and dropouts.
+            Defaults to 0.
+
+    Raises:
+        ValueError: On an unknown scenario
+
+    Returns:
+        contactTrace: (time, osc address, value) sorted by time
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {scenario}")
+    rng = np.random.default_rng(seed)
+    t = np.arange(round(duration*rate))/rate
+
+    # samples x touches x 3
+    touches = _sweep(t, 4.0, 0.0, 0.6)[:, np.newaxis]
+    if scenario == "multi":
+        touches = np.concatenate(
+            (touches, _sweep(t, 3.0, pi, 1.0)[:, np.newaxis]), axis=1)
+    values = np.array([proximity(sample) for sample in touches])
+    if scenario == "noisy":
+        values = np.clip(values + rng.normal(0, 0.02, values.shape), 0, 1)
+
+    keep = np.ones(len(t), dtype=bool)
+    if scenario == "dropouts":
+        # drop whole 250 ms slots, long enough for data to go stale
+        slot = (t/0.25).astype(int)
+        dropped = rng.random(slot[-1] + 1 if len(slot) else 0) < 0.2
+        keep = ~dropped[slot]
+
+    addresses = [VRC_PARAMETER_PREFIX + r[1] for r in RECEIVERS]
+    return [(float(ts), addr, round(float(value), 4))
+            for ts, row in zip(t[keep].tolist(), values[keep].tolist())
+            for addr, value in zip(addresses, row)]
+
+
+if __name__ == "__main__":
+    print("There is no point running this file directly")
@@ -9,17 +9,18 @@ from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSize, Qt, QVariant
 from PyQt6.QtCore import pyqtSignal as QSignal
 from PyQt6.QtGui import QCloseEvent
 from PyQt6.QtWidgets import (QAbstractItemView, QAbstractScrollArea, QCheckBox,
-                             QComboBox, QDialogButtonBox, QFormLayout, QFrame,
-                             QHBoxLayout, QHeaderView, QLineEdit, QPushButton,
-                             QSizePolicy, QSpacerItem, QSpinBox, QTableView,
-                             QTabWidget, QVBoxLayout, QWidget)
+                             QComboBox, QDialogButtonBox, QDoubleSpinBox,
+                             QFormLayout, QFrame, QHBoxLayout, QHeaderView,
+                             QLineEdit, QPushButton, QSizePolicy, QSpacerItem,
+                             QSpinBox, QTableView, QTabWidget, QVBoxLayout,
+                             QWidget)
 
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.OptionAdapter import OptionAdapter
-from ui.Delegates import (LineEditMoreButtonDelegate, FloatSpinBoxDelegate,
-                          IntSpinBoxDelegate)
+from ui.Delegates import (ComboBoxDelegate, LineEditMoreButtonDelegate,
+                          FloatSpinBoxDelegate, IntSpinBoxDelegate)
 from ui.UiHelpers import handleClosePrompt, handleDeletePrompt
-from utils.Enums import SolverType
+from utils.Enums import FalloffKernelType, ResponseCurveType, SolverType
 from utils.Logger import LoggerClass
 from utils.PathReader import PathReader
 from utils.VrcAvatarsLoader import getVrcAvatars, vrcInternals
@@ -139,6 +140,29 @@ class TabGeneral(QWidget, OptionAdapter):
 
         self.selfLayout.addRow("Group Name:", self.le_groupName)
 
+        # the motor envelope times
+        self.sb_envelopeAttack = QSpinBox(self)
+        self.sb_envelopeAttack.setMaximum(5000)
+        self.sb_envelopeAttack.setSuffix(" ms")
+        self.addOpt("envelopeAttackMs", self.sb_envelopeAttack, int)
+        self.selfLayout.addRow("Motor attack:", self.sb_envelopeAttack)
+
+        self.sb_envelopeHold = QSpinBox(self)
+        self.sb_envelopeHold.setMaximum(5000)
+        self.sb_envelopeHold.setSuffix(" ms")
+        self.addOpt("envelopeHoldMs", self.sb_envelopeHold, int)
+        self.selfLayout.addRow("Motor hold:", self.sb_envelopeHold)
+
+        self.sb_envelopeRelease = QSpinBox(self)
+        self.sb_envelopeRelease.setMaximum(5000)
+        self.sb_envelopeRelease.setSuffix(" ms")
+        self.sb_envelopeRelease.setValue(1000)
+        self.sb_envelopeRelease.setToolTip(
+            "Fade out from full pwm to 0 when no more data comes in.\n"
+            "Motors the contact left stop at once.")
+        self.addOpt("envelopeReleaseMs", self.sb_envelopeRelease, int)
+        self.selfLayout.addRow("Motor release:", self.sb_envelopeRelease)
+
     def hasUnsavedOptions(self) -> bool:
         """Check if this tab has unsaved options.
 
@@ -164,6 +188,10 @@ class TabMotors(QWidget):
 
         self._configKey = configKey + ".motors"
         self._data = deepcopy(config.get(self._configKey))
+        # motors from older configs don't have a response curve yet
+        for motor in self._data:
+            motor.setdefault("curve", ResponseCurveType.LINEAR.value)
+            motor.setdefault("curveGamma", 1.0)
 
         self.buildUi()
 
@@ -194,21 +222,32 @@ class TabMotors(QWidget):
         self.motorsTableModel = SettingsTableModel(self._data)
         self.motorsTableModel.setHorizontalHeaderLabels(
             "Name", "ESP Id", "ESP Channel", "Min PWM", "Max PWM",
-            "Radius", "X", "Y", "Z")
+            "Curve", "Curve Param", "Radius", "X", "Y", "Z")
         self.motorsTableModel.setSettingsOrder(
             "name", "espAddr.0", "espAddr.1", "minPwm", "maxPwm",
-            "r", "xyz.0", "xyz.1", "xyz.2")
+            "curve", "curveGamma", "r", "xyz.0", "xyz.1", "xyz.2")
         self.motorsTableModel.setSettingsDataTypes(
-            str, int, int, int, int, float, float, float, float)
+            str, int, int, int, int, str, float, float, float, float, float)
 
         # Assign the right delegate to the columns
         self.floatSpinBoxDelegate = FloatSpinBoxDelegate(4, -20.0, 20.0)
-        self.pwmSpinBoxDelegate = IntSpinBoxDelegate(0, 255)
+        self.curveParamSpinBoxDelegate = FloatSpinBoxDelegate(2, 0.0, 5.0)
+        self.pwmSpinBoxDelegate = IntSpinBoxDelegate(0, 1023)
         self.espIdSpinBoxDelegate = IntSpinBoxDelegate(0, 20)
+        # "Points" needs curvePoints, which can only be set in the config
+        self.curveTypeDelegate = ComboBoxDelegate(
+            [curve.value for curve in ResponseCurveType
+             if curve != ResponseCurveType.POINTS])
         for i, (t, n) in enumerate(zip(
                 self.motorsTableModel.getSettingsDataTypes(),
                 self.motorsTableModel.getSettingsOrder())):
-            if t == float:
+            if n == "curve":
+                self.tv_motorsTable.setItemDelegateForColumn(
+                    i, self.curveTypeDelegate)
+            elif n == "curveGamma":
+                self.tv_motorsTable.setItemDelegateForColumn(
+                    i, self.curveParamSpinBoxDelegate)
+            elif t == float:
                 self.tv_motorsTable.setItemDelegateForColumn(
                     i, self.floatSpinBoxDelegate)
             elif n in ("espAddr.0", "espAddr.1"):
@@ -495,12 +534,53 @@ class MLATSolverSettings(BaseSolverSettingsRow):
                     self.cb_allowOnlyUpperSphereHalf, bool)
         self.selfLayout.addRow("", self.cb_allowOnlyUpperSphereHalf)
 
+        # the falloff kernel and it's parameter
+        self.cb_falloffKernel = QComboBox(self)
+        # "Custom Table" needs MLAT_falloffTable, which can only be set
+        # in the config
+        self.cb_falloffKernel.addItems(
+            [kernel.value for kernel in FalloffKernelType
+             if kernel != FalloffKernelType.TABLE])
+        self.addOpt("MLAT_falloffKernel", self.cb_falloffKernel)
+        self.selfLayout.addRow("Falloff:", self.cb_falloffKernel)
+
+        self.dsb_falloffParam = QDoubleSpinBox(self)
+        self.dsb_falloffParam.setDecimals(2)
+        self.dsb_falloffParam.setMaximum(100.0)
+        self.dsb_falloffParam.setSpecialValueText("Default")
+        self.dsb_falloffParam.setToolTip(
+            "Gaussian: sigma, Inverse Square: steepness")
+        self.addOpt("MLAT_falloffParam", self.dsb_falloffParam, float)
+        self.selfLayout.addRow("Falloff parameter:", self.dsb_falloffParam)
+
         # contact only (on/off instead of pwm, might be better in the contact point?)
         self.cb_contactOnly = QCheckBox(self)
         self.cb_contactOnly.setText("Contact only")
         self.addOpt("contactOnly", self.cb_contactOnly, bool)
         self.selfLayout.addRow("", self.cb_contactOnly)
 
+        # lookup cache grid size, 0 disables the cache
+        self.sb_lookupCacheResolution = QSpinBox(self)
+        self.sb_lookupCacheResolution.setMinimum(0)
+        self.sb_lookupCacheResolution.setMaximum(50)
+        self.sb_lookupCacheResolution.setSuffix(" mm")
+        self.sb_lookupCacheResolution.setSpecialValueText("Off")
+        self.addOpt("MLAT_lookupCacheResolution",
+                    self.sb_lookupCacheResolution, int)
+        self.selfLayout.addRow("Lookup cache grid",
+                               self.sb_lookupCacheResolution)
+
+        # the most cells the lookup cache keeps
+        self.sb_lookupCacheSize = QSpinBox(self)
+        self.sb_lookupCacheSize.setMinimum(1)
+        self.sb_lookupCacheSize.setMaximum(1 << 20)
+        self.sb_lookupCacheSize.setSuffix(" cells")
+        # kept if an older config doesn't have the option yet
+        self.sb_lookupCacheSize.setValue(4096)
+        self.addOpt("MLAT_lookupCacheSize", self.sb_lookupCacheSize, int)
+        self.selfLayout.addRow("Lookup cache size",
+                               self.sb_lookupCacheSize)
+
 
 class SINGLEN2NSolverSettings(BaseSolverSettingsRow):
     def buildUi(self):
@@ -9,6 +9,8 @@ float values within the view.
 The `IntSpinBoxDelegate` does the same as `FloatSpinBoxDelegate` just
 for ints.
 
+The `ComboBoxDelegate` lets the user pick one of a fixed list of strings.
+
 Additional classes may be added to this module in the future to handle
 other data types.
 
@@ -34,8 +36,9 @@ Note:
 
 from PyQt6.QtCore import Qt
 from PyQt6.QtCore import pyqtSignal as QSignal
-from PyQt6.QtWidgets import (QDoubleSpinBox, QHBoxLayout, QItemDelegate,
-                             QLineEdit, QPushButton, QSpinBox, QWidget)
+from PyQt6.QtWidgets import (QComboBox, QDoubleSpinBox, QHBoxLayout,
+                             QItemDelegate, QLineEdit, QPushButton, QSpinBox,
+                             QWidget)
 
 
 class FloatSpinBoxDelegate(QItemDelegate):
@@ -102,6 +105,31 @@ class IntSpinBoxDelegate(QItemDelegate):
         model.setData(index, value, Qt.ItemDataRole.EditRole)
 
 
+class ComboBoxDelegate(QItemDelegate):
+    """Custom Item Delegate using a QComboBox for a fixed set of strings."""
+
+    def __init__(self, items: list[str], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._items = items
+
+    def createEditor(self, parent, option, index):
+        """Create a QComboBox as the editor."""
+        editor = QComboBox(parent)
+        editor.setFrame(False)
+        editor.addItems(self._items)
+        return editor
+
+    def setEditorData(self, comboBox: QComboBox, index) -> None:
+        """Set the data for the editor."""
+        value = index.model().data(index, Qt.ItemDataRole.EditRole)
+        comboBox.setCurrentText(value)
+
+    def setModelData(self, comboBox: QComboBox, model, index) -> None:
+        """Write value from editor into models data."""
+        value = comboBox.currentText()
+        model.setData(index, value, Qt.ItemDataRole.EditRole)
+
+
 class LineEditMoreButtonEditWidget(QWidget):
     buttonClicked = QSignal(int)
 
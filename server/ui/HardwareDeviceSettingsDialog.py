@@ -8,9 +8,11 @@ from PyQt6.QtWidgets import (QComboBox, QDialogButtonBox, QFormLayout,
                              QLineEdit, QSizePolicy, QSpacerItem, QSpinBox,
                              QWidget)
 
+from modules.CompactFrame import FEATURE_COMPACT_FRAME
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.OptionAdapter import OptionAdapter
 from ui.UiHelpers import handleClosePrompt
+from utils.Enums import FrameFormat
 from utils.Logger import LoggerClass
 
 logger = LoggerClass.getSubLogger(__name__)
@@ -69,10 +71,32 @@ class HardwareDeviceSettingsDialog(QWidget, OptionAdapter):
 
         self.selfLayout.addRow("Number of motors:", self.sb_hwNumMotors)
 
-        # Serial port name
+        # Frame format, compact only if the firmware announced it
+        self.cb_frameFormat = QComboBox(self)
+        self.cb_frameFormat.addItems([f.value for f in FrameFormat])
+        supportsCompact = config.get(f"{self._configKey}.features", 0) \
+            & FEATURE_COMPACT_FRAME
+        self.cb_frameFormat.model().item(
+            self.cb_frameFormat.findText(FrameFormat.COMPACT)) \
+            .setEnabled(bool(supportsCompact))
+        self.addOpt("frameFormat", self.cb_frameFormat)
+
+        self.selfLayout.addRow("Frame Format:", self.cb_frameFormat)
+
+        # Max frame rate, eg. for esp8266 boards at a high tps
+        self.sb_maxFrameRate = QSpinBox(self)
+        self.sb_maxFrameRate.setMaximum(200)
+        self.sb_maxFrameRate.setSuffix(" fps")
+        self.sb_maxFrameRate.setSpecialValueText("Unlimited")
+        self.sb_maxFrameRate.setToolTip(
+            "Frames in between are skipped, the newest one is sent")
+        self.addOpt("maxFrameRate", self.sb_maxFrameRate, int)
+
+        self.selfLayout.addRow("Max Frame Rate:", self.sb_maxFrameRate)
+
+        # Serial port name, only used by SlipSerial devices
         self.le_serialPort = QLineEdit(self)
-        self.le_serialPort.setEnabled(False)
-        self.le_serialPort.setReadOnly(True)
+        self.le_serialPort.setPlaceholderText("eg. COM3 or /dev/ttyACM0")
         self.addOpt("serialPort", self.le_serialPort)
 
         self.selfLayout.addRow("Serial Port:", self.le_serialPort)
@@ -3,7 +3,7 @@
 import webbrowser
 from functools import partial
 
-from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtCore import QSize, Qt, QTimer
 from PyQt6.QtCore import pyqtSignal as QSignal
 from PyQt6.QtCore import pyqtSlot as QSlot
 from PyQt6.QtGui import QCloseEvent, QFont
@@ -14,6 +14,7 @@ from PyQt6.QtWidgets import (QFrame, QHBoxLayout, QLabel, QMainWindow,
 from modules.ContactGroup import ContactGroup
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.HardwareDevice import HardwareDevice
+from modules.LatencyProbe import RTT_BUCKETS_MS
 from modules.Server import ServerSingleton
 from ui.ContactGroupSettings import ContactGroupSettings
 from ui.CustomLabel import StatefulLabel, StaticLabel
@@ -197,25 +198,39 @@ class MainWindow(QMainWindow):
 
     def _handleHwListChange(self, devices: dict[int, HardwareDevice]) -> None:
         """Handle changes to the servers hardware list.
-        This could be a new device beeing added or
-        an existing one re-created.
+        This could be new devices beeing added, removed or
+        existing ones re-created. Only the rows of those are touched.
 
         Args:
             devices (dict[int, HardwareDevice]): The hardwareDevices dict.
         """
-        for id, row in self._hwRows.items():
+        for id in [id for id in self._hwRows if id not in devices]:
+            row = self._hwRows.pop(id)
             row.close()
             row.deleteLater()
-        self._hwRows = {}
         for id, device in devices.items():
-            newRow = HardwareDeviceRow(device._configKey,
-                                       self.server.hwManager.hardwareDevices[id],
+            oldRow = self._hwRows.get(id)
+            if oldRow and oldRow._deviceRef is device \
+                    and oldRow.numChannels == len(device.pinStates):
+                # changed in place or not at all
+                oldRow._updateStaticText()
+                continue
+            newRow = HardwareDeviceRow(device._configKey, device,
                                        self.hardwareAreaWidgetContent)
             device.uiBatteryStateChanged.connect(newRow.lb_hwBat.setFloat)
             device.uiRssiStateChanged.connect(newRow.lb_hwRssi.setNum)
             device.deviceConnectionChanged.connect(newRow.lb_hwCon.setState)
+            device.deviceAddressChanged.connect(newRow._updateStaticText)
             newRow.widgetExpansionStateChanged.connect(self._handleRowResize)
-            self.hardwareAreaWidgetContentLayout.addWidget(newRow)
+            if oldRow:
+                # keep the position of the re-created device
+                self.hardwareAreaWidgetContentLayout.insertWidget(
+                    self.hardwareAreaWidgetContentLayout.indexOf(oldRow),
+                    newRow)
+                oldRow.close()
+                oldRow.deleteLater()
+            else:
+                self.hardwareAreaWidgetContentLayout.addWidget(newRow)
             self._hwRows[id] = newRow
 
     def _pollCgList(self) -> None:
@@ -369,6 +384,8 @@ class HardwareDeviceRow(BaseRow):
         self._configKey = configKey
         super().__init__(parent)
         self._deviceRef = deviceRef
+        # the channel rows of the expanded widget are built for this
+        self.numChannels = len(deviceRef.pinStates)
 
         self._updateStaticText()
 
@@ -499,6 +516,27 @@ class HardwareDeviceMoreInfoWidget(QWidget):
         self.lb_motorsRow = StaticLabel("Motors: ", "", "", self)
         self.selfLayout.addWidget(self.lb_motorsRow)
 
+        # the packet counters
+        self.lb_packets = StaticLabel(
+            "Packets sent/suppressed/coalesced: ", "", "", self)
+        self.selfLayout.addWidget(self.lb_packets)
+
+        # the frame loss the device reports
+        self.lb_frameLoss = StaticLabel("Frame loss: ", "", "", self)
+        self.selfLayout.addWidget(self.lb_frameLoss)
+
+        # how the link quality limits the output
+        self.lb_linkQuality = StaticLabel("Link quality: ", "", "", self)
+        self.selfLayout.addWidget(self.lb_linkQuality)
+
+        # the round trip time and clock of the latency probe
+        self.lb_latency = StaticLabel("Round trip: ", "", "", self)
+        self.selfLayout.addWidget(self.lb_latency)
+        self.lb_latencyHistogram = StaticLabel("RTT histogram: ", "", "", self)
+        self.selfLayout.addWidget(self.lb_latencyHistogram)
+        self.lb_clock = StaticLabel("Clock offset: ", "", "", self)
+        self.selfLayout.addWidget(self.lb_clock)
+
         # a horizontal row for the buttons
         self.bottomButtonRow = QHBoxLayout()
         # the stop app button
@@ -525,6 +563,74 @@ class HardwareDeviceMoreInfoWidget(QWidget):
         device.motorDataSent.connect(self._handleMotorData)
         self.bt_stopAllMotors.clicked.connect(device.resetAllPinStates)
 
+        # suppressed packets don't trigger a signal, poll the counters
+        self._device = device
+        self._statsTimer = QTimer(self)
+        self._statsTimer.timeout.connect(self._updatePacketCounters)
+        self._statsTimer.timeout.connect(self._updateLatency)
+        self._statsTimer.start(1000)
+        self._updatePacketCounters()
+        self._updateLatency()
+
+    def _updatePacketCounters(self) -> None:
+        """Show the device's packet counters."""
+        packets = f"{self._device.packetsSent}/" \
+            f"{self._device.packetsSuppressed}/" \
+            f"{self._device.framesCoalesced}"
+        if self._device.breaker.isOpen:
+            packets += f" (sends failing, skipped {self._device.breaker.skipped})"
+        self.lb_packets.setText(packets)
+        loss = self._device.frameLoss.stats()
+        if not loss.reported:
+            self.lb_frameLoss.setText("Not reported by the device")
+        else:
+            self.lb_frameLoss.setText(
+                f"{loss.recentLossRate:.2%} lost, "
+                f"{loss.recentReorderRate:.2%} reordered recently "
+                f"({loss.lost}/{loss.reordered} of {loss.frames} in total)")
+        pacer = self._device.pacer
+        if not pacer.enabled:
+            self.lb_linkQuality.setText("Not adapted")
+        else:
+            rating = pacer.rating
+            text = f"{rating.quality.value} ({rating.rssi}dBm, " \
+                f"{rating.lossRate:.1%} lost"
+            if rating.rttMs is not None:
+                text += f", {rating.rttMs:.1f}ms"
+            text += ")"
+            if pacer.minFrameInterval:
+                text += f", max {round(1/pacer.minFrameInterval)} fps"
+            if pacer.deltaOnly:
+                text += ", changes only"
+            self.lb_linkQuality.setText(text)
+
+    def _updateLatency(self) -> None:
+        """Show the device's latency probe statistics."""
+        stats = self._device.latency.stats()
+        if not stats.received:
+            self.lb_latency.setText(f"No answer ({stats.sent} pings sent)")
+            self.lb_latencyHistogram.setText("")
+            self.lb_clock.setText("")
+            return
+        self.lb_latency.setText(
+            f"p50 {stats.p50Ms:.1f}ms, p99 {stats.p99Ms:.1f}ms, "
+            f"min {stats.minMs:.1f}ms, {stats.lost}/{stats.sent} lost")
+        # one bar per bucket, scaled to the fullest one
+        bars = " ▁▂▃▄▅▆▇█"
+        most = max(stats.histogram)
+        self.lb_latencyHistogram.setText("".join(
+            bars[round(count/most*(len(bars) - 1))]
+            for count in stats.histogram))
+        edges = [f"<{edge}ms" for edge in RTT_BUCKETS_MS] \
+            + [f">{RTT_BUCKETS_MS[-1]}ms"]
+        self.lb_latencyHistogram.setToolTip("\n".join(
+            f"{edge}: {count}"
+            for edge, count in zip(edges, stats.histogram)))
+        clock = f"{stats.offsetMs:.1f}ms ±{stats.offsetErrorMs:.1f}ms"
+        if stats.driftPpm is not None:
+            clock += f", drift {stats.driftPpm:+.1f}ppm"
+        self.lb_clock.setText(clock)
+
     def _handleMotorData(self, values: list[int]) -> None:
         """Writes the list of PWM values into the slider rows.
 
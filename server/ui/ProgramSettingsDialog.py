@@ -10,6 +10,7 @@ from PyQt6.QtWidgets import (QCheckBox, QComboBox, QDialogButtonBox,
 from modules.GlobalConfig import GlobalConfigSingleton
 from modules.OptionAdapter import OptionAdapter
 from ui.UiHelpers import handleClosePrompt
+from utils.Enums import OutputSendPolicy
 from utils.Logger import LoggerClass
 
 logger = LoggerClass.getSubLogger(__name__)
@@ -75,6 +76,53 @@ class ProgramSettingsDialog(QWidget, OptionAdapter):
 
         self.selfLayout.addRow("TPS:", self.sb_tps)
 
+        # how the hardware updates of a tick are sent
+        self.cb_outputSendPolicy = QComboBox(self)
+        for policy in OutputSendPolicy:
+            self.cb_outputSendPolicy.addItem(policy.value)
+        self.cb_outputSendPolicy.setToolTip(
+            "Burst: Send to all devices back-to-back\n"
+            "Spread: Spread the sends evenly over half a tick")
+        self.addOpt("outputSendPolicy", self.cb_outputSendPolicy)
+
+        self.selfLayout.addRow("Hardware Output:", self.cb_outputSendPolicy)
+
+        # resend unchanged motor values after
+        self.sb_outputKeepaliveMs = QSpinBox(self)
+        self.sb_outputKeepaliveMs.setRange(0, 900)
+        self.sb_outputKeepaliveMs.setSingleStep(50)
+        self.sb_outputKeepaliveMs.setSuffix("ms")
+        self.sb_outputKeepaliveMs.setSpecialValueText("Always send")
+        self.sb_outputKeepaliveMs.setToolTip(
+            "Unchanged motor values are only sent again after this time.\n"
+            "Has to stay below the hardware's 1000ms timeout.")
+        self.addOpt("outputKeepaliveMs", self.sb_outputKeepaliveMs,
+                    dataType=int)
+
+        self.selfLayout.addRow("Output Keepalive:", self.sb_outputKeepaliveMs)
+
+        # how often the round trip time to every device is measured
+        self.sb_latencyProbeIntervalMs = QSpinBox(self)
+        self.sb_latencyProbeIntervalMs.setRange(0, 60000)
+        self.sb_latencyProbeIntervalMs.setSingleStep(500)
+        self.sb_latencyProbeIntervalMs.setSuffix("ms")
+        self.sb_latencyProbeIntervalMs.setSpecialValueText("Off")
+        self.sb_latencyProbeIntervalMs.setToolTip(
+            "Time between two pings to a connected hardware device.")
+        self.addOpt("latencyProbeIntervalMs", self.sb_latencyProbeIntervalMs,
+                    dataType=int)
+
+        self.selfLayout.addRow("Latency Probe:",
+                               self.sb_latencyProbeIntervalMs)
+
+        self.cb_adaptivePacing = QCheckBox(self)
+        self.cb_adaptivePacing.setText("Lower the output rate on bad links")
+        self.cb_adaptivePacing.setToolTip(
+            "Devices with a weak signal, lost frames or a slow round trip\n"
+            "get less frames so they don't slow down the other devices.")
+        self.addOpt("adaptivePacing", self.cb_adaptivePacing, dataType=bool)
+        self.selfLayout.addRow("", self.cb_adaptivePacing)
+
         # log level
         self.cb_logLevel = QComboBox(self)
         for level in LoggerClass.getLoggingLevelStrings():
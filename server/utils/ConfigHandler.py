@@ -1,5 +1,6 @@
 import json
 from abc import ABC, abstractmethod
+from copy import deepcopy
 from pathlib import Path
 from typing import Any
 
@@ -104,5 +105,54 @@ class FileHelper(IConfigHandler):
         logger.info(f"Backup of {self._file} created at {backupFile}")
 
 
+class MemoryConfigHandler(IConfigHandler):
+    """A config handler that only keeps the data in memory.
+
+    Used to run the server modules headless without touching any file.
+    """
+
+    def __init__(self, data: dict, *args, **kwargs) -> None:
+        """Initialize the memory config handler.
+
+        Args:
+            data (dict): The initial configuration.
+        """
+        self._data = deepcopy(data)
+
+    def write(self, data: dict) -> bool:
+        """Keep a copy of the data.
+
+        Args:
+            data (dict): The data to keep.
+
+        Returns:
+            bool: Always True.
+        """
+        self._data = deepcopy(data)
+        return True
+
+    def read(self) -> dict[str, Any]:
+        """Return a copy of the data.
+
+        Returns:
+            dict: The stored configuration.
+        """
+        return deepcopy(self._data)
+
+    def hasData(self) -> bool:
+        """Check if there is any configuration.
+
+        Returns:
+            bool: True if the configuration is not empty.
+        """
+        return bool(self._data)
+
+    def initializeConfig(self) -> None:
+        pass
+
+    def createBackup(self) -> None:
+        pass
+
+
 if __name__ == "__main__":
     print("There is no point running this file directly")
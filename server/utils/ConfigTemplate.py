@@ -12,6 +12,10 @@ class ConfigTemplate:
             "vrcOscReceiveAddress": "127.0.0.1",
             "enableOscDiscovery": True,
             "mainTps": 40,
+            "outputSendPolicy": "Burst",
+            "outputKeepaliveMs": 500,
+            "latencyProbeIntervalMs": 2000,
+            "adaptivePacing": True,
             "logLevel": "DEBUG"
         },
         "esps": {
@@ -22,13 +26,19 @@ class ConfigTemplate:
                 "lastIp": "127.0.0.1",
                 "wifiMac": "FF:FF:FF:AA:AA:AA",
                 "serialPort": "",
-                "numMotors": 0
+                "numMotors": 0,
+                "features": 0,
+                "frameFormat": "OSC /m",
+                "maxFrameRate": 0
             }
         },
         "groups": {
             "group0": {
                 "id": 0,
                 "name": "Group 1",
+                "envelopeAttackMs": 0,
+                "envelopeHoldMs": 0,
+                "envelopeReleaseMs": 1000,
                 "motors": [
                     {
                         "name": "Motor 1",
@@ -38,6 +48,8 @@ class ConfigTemplate:
                         ],
                         "minPwm": 70,
                         "maxPwm": 255,
+                        "curve": "Linear",
+                        "curveGamma": 1.0,
                         "xyz": [
                             1.0,
                             2.0,
@@ -63,6 +75,10 @@ class ConfigTemplate:
                     "strength": 100,
                     "contactOnly": False,
                     "MLAT_enableHalfSphereCheck": True,
+                    "MLAT_lookupCacheResolution": 0,
+                    "MLAT_lookupCacheSize": 4096,
+                    "MLAT_falloffKernel": "Linear",
+                    "MLAT_falloffParam": 0.0,
                     "SINGLEN2N_minMaxMode": "Max"
                 }
             }
@@ -73,7 +89,11 @@ class ConfigTemplate:
         "solverType": "MLat",
         "strength": 100,
         "contactOnly": False,
-        "MLAT_enableHalfSphereCheck": False
+        "MLAT_enableHalfSphereCheck": False,
+        "MLAT_lookupCacheResolution": 0,
+        "MLAT_lookupCacheSize": 4096,
+        "MLAT_falloffKernel": "Linear",
+        "MLAT_falloffParam": 0.0
     }
 
     SOLVER_SINGLEN2N = {
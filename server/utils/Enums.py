@@ -7,6 +7,22 @@ class HardwareConnectionType(str, Enum):
     SLIPSERIAL = "SlipSerial"
 
 
+class OutputSendPolicy(str, Enum):
+    BURST = "Burst"
+    SPREAD = "Spread"
+
+
+class FrameFormat(str, Enum):
+    OSC = "OSC /m"
+    COMPACT = "Compact"
+
+
+class LinkQuality(str, Enum):
+    GOOD = "Good"
+    FAIR = "Fair"
+    POOR = "Poor"
+
+
 class SolverType(str, Enum):
     MLAT = "MLat"
     SINGLEN2N = "Single n:n"
@@ -17,3 +33,18 @@ class SolverType(str, Enum):
 class VisualizerType(str, Enum):
     NONE = None
     MLAT = 0
+
+
+class ResponseCurveType(str, Enum):
+    LINEAR = "Linear"
+    GAMMA = "Gamma"
+    SCURVE = "S-Curve"
+    POINTS = "Points"
+
+
+class FalloffKernelType(str, Enum):
+    LINEAR = "Linear"
+    SMOOTHSTEP = "Smoothstep"
+    GAUSSIAN = "Gaussian"
+    INVERSESQUARE = "Inverse Square"
+    TABLE = "Custom Table"